@@ -9,6 +9,12 @@ import os
 import json
 import uuid
 import re
+from profile_session import ProfileSession
+from virtual_list import VirtualList
+import card_indexer
+import atexit
+from index_store import IndexStore
+from card_render import CardRenderer
 
 # Constants
 CARD_WIDTH = 400
@@ -29,6 +35,7 @@ display_info = pygame.display.Info()
 WINDOW_WIDTH = display_info.current_w
 WINDOW_HEIGHT = display_info.current_h
 CARD_SCALE = min((WINDOW_WIDTH - 40) / CARD_WIDTH, (WINDOW_HEIGHT - 200) / CARD_HEIGHT)
+card_renderer = CardRenderer(CARD_SCALE)
 
 # Custom theme (unchanged)
 THEME_JSON = {
@@ -92,6 +99,21 @@ if not os.path.exists(INDEX_FILE):
     with open(INDEX_FILE, 'w') as f:
         json.dump({}, f)
 
+# Card saves and deletes are journaled; the journal is folded into card_index.json on exit
+card_index = IndexStore(INDEX_FILE)
+atexit.register(card_index.checkpoint)
+
+
+def load_index():
+    """The card index as it stands, including unsaved-to-snapshot journal changes."""
+    return card_index.index
+
+
+def card_list_rect():
+    """Where CardViewer and CardEditor put their card list: a centred column under the title."""
+    return pygame.Rect((WINDOW_WIDTH - 200) // 2, 80, 200, WINDOW_HEIGHT - 100)
+
+
 # Load range options from Range Maker
 RANGE_INDEX_FILE = "ranges/range_index.json"
 RANGE_OPTIONS = ["None"]  # Default option
@@ -114,6 +136,7 @@ class CardPreview:
         self.card_id = card_id
         self.back_action = back_action
         self.edit_action = edit_action
+        self.card_surface = None
         
         manager.clear_and_reset()
         
@@ -171,71 +194,10 @@ class CardPreview:
 
     def draw(self):
         screen.fill(DARK_INDIGO)
-        
-        card_surface = pygame.Surface((CARD_WIDTH, CARD_HEIGHT))
-        card_surface.fill(LIGHT_TEAL)  # Card background
-        
-        bg_path = self.card_data["data"].get("Background Image", 
-                                           self.card_data["data"].get("Background Image File Path", ""))
-        if bg_path and os.path.exists(bg_path):
-            try:
-                bg_image = pygame.image.load(bg_path).convert_alpha()
-                bg_image = pygame.transform.scale(bg_image, (CARD_WIDTH, CARD_HEIGHT))
-                card_surface.blit(bg_image, (0, 0))
-            except pygame.error:
-                pass
-
-        image_key = {
-            "Junk Card": "Junk Image" if "Junk Image" in self.card_data["data"] else "Junk Image File Path",
-            "Enemy Card": "Enemy Image File Path",
-            "Boss Card": "Boss Image File Path",
-            "NPC Card": "NPC Image File Path",
-            "Location Card": "Location Image File Path",
-            "Document Card": "Background Image",
-            "Transition Card": "Background Image"
-        }.get(self.card_data["card_type"], "Background Image")
-        image_path = self.card_data["data"].get(image_key, "")
-        if image_path and os.path.exists(image_path):
-            try:
-                image = pygame.image.load(image_path).convert_alpha()
-                image_scaled = pygame.transform.scale(image, (CARD_WIDTH//2, CARD_HEIGHT//2))
-                image_rect = image_scaled.get_rect(center=(CARD_WIDTH//2, CARD_HEIGHT//2))
-                card_surface.blit(image_scaled, image_rect)
-            except pygame.error:
-                pass
-
-        font = pygame.font.Font(None, int(72 * CARD_SCALE))
-        y_pos = int(20 * CARD_SCALE)
-        name = self.card_data["data"].get("Name", 
-                                        self.card_data["data"].get("Default Name", "Unnamed"))
-        name_surface = font.render(name, True, DARK_BRONZE)
-        name_rect = name_surface.get_rect(center=(CARD_WIDTH//2, y_pos))
-        card_surface.blit(name_surface, name_rect)
-        y_pos += int(120 * CARD_SCALE)
-
-        for key, value in self.card_data["data"].items():
-            if key not in ["Name", "Default Name", "Background Image", "Background Image File Path", 
-                           "Junk Image", "Junk Image File Path", "Enemy Image File Path", 
-                           "Boss Image File Path", "NPC Image File Path", 
-                           "Location Image File Path",
-                           "2nd_state_Weapon Image", "2nd_state_Tool Image", "2nd_state_Item Image",
-                           "Book Image", "Pamphlet Image"]:
-                if key in ["Upgraded Type (Weapon, Tool, Consumable, Armor)", "Upgraded Name"]:
-                    value = value or "N/A"
-                text = f"{key}: {value}"
-                text_surface = font.render(text, True, DARK_BRONZE)
-                text_rect = text_surface.get_rect(center=(CARD_WIDTH//2, y_pos))
-                if text_rect.width > CARD_WIDTH - 20:
-                    while text_rect.width > CARD_WIDTH - 20 and len(text) > 0:
-                        text = text[:-1]
-                        text_surface = font.render(text + "...", True, DARK_BRONZE)
-                        text_rect = text_surface.get_rect(center=(CARD_WIDTH//2, y_pos))
-                card_surface.blit(text_surface, text_rect)
-                y_pos += int(90 * CARD_SCALE)
-
-        scaled_card = pygame.transform.scale(card_surface, 
-                                           (self.card_rect.width, self.card_rect.height))
-        screen.blit(scaled_card, self.card_rect)
+        if self.card_surface is None:
+            # Composited once per preview (and reused across previews of the same card)
+            self.card_surface = card_renderer.render(self.card_data, self.card_rect.size)
+        screen.blit(self.card_surface, self.card_rect)
 
 class CardEditor:
     def __init__(self, card_type, back_action):
@@ -245,7 +207,7 @@ class CardEditor:
         self.max_scroll = 0
         self.selected_card = None
         self.ui_elements = []
-        self.card_buttons = []
+        self.card_list = None
         self.input_boxes = []
         self.file_inputs = []
         self.dropdown_inputs = []
@@ -256,7 +218,6 @@ class CardEditor:
     def load_cards(self):
         manager.clear_and_reset()
         self.ui_elements = []
-        self.card_buttons = []
         self.submit_button = None
         self.delete_button = None
         
@@ -277,29 +238,12 @@ class CardEditor:
         )
         self.ui_elements.append(self.back_button)
         
-        with open(INDEX_FILE, 'r') as f:
-            index = json.load(f)
-        
-        self.cards = []
-        for card_id, info in index.items():
-            if info['type'] == self.card_type:
-                self.cards.append((card_id, info))
-        self.cards.sort(key=lambda x: x[1]['name'].lower())
-
-        y_start = 80
-        for i, (card_id, info) in enumerate(self.cards):
-            y_pos = y_start + i * 60
-            button = UIButton(
-                relative_rect=pygame.Rect((WINDOW_WIDTH - 200) // 2, y_pos, 200, 40),
-                text=info['name'],
-                manager=manager,
-                object_id=f"#card_{card_id}"
-            )
-            self.card_buttons.append((button, card_id))
-            self.ui_elements.append(button)
-
-        total_list_height = len(self.cards) * 60 + 100
-        self.max_scroll = max(0, total_list_height - WINDOW_HEIGHT)
+        self.card_list = VirtualList(
+            card_list_rect(),
+            manager,
+            [(card_id, info['name']) for card_id, info in load_index().items() if info['type'] == self.card_type],
+            wheel_anywhere=True
+        )
 
     def get_field_type(self, field, card_data):
         if field == "2nd_state_Type" and (card_data.get("subclass") in ["Junk_to_Weapon"] or 
@@ -320,6 +264,7 @@ class CardEditor:
 
     def load_card_for_edit(self, card_id):
         self.selected_card = card_id
+        self.card_list = None
         manager.clear_and_reset()
         self.ui_elements = []
         self.input_boxes = []
@@ -693,14 +638,7 @@ class CardEditor:
         with open(card_file, 'w') as f:
             json.dump(card_data, f, indent=2)
         
-        with open(INDEX_FILE, 'r') as f:
-            index = json.load(f)
-        
-        index[self.selected_card]["name"] = card_data["data"].get("Name", 
-                                                               card_data["data"].get("Default Name", "Unnamed"))
-        
-        with open(INDEX_FILE, 'w') as f:
-            json.dump(index, f, indent=2)
+        card_index.put(self.selected_card, card_indexer.index_entry(card_data))
         
         print(f"Card updated: {self.selected_card}")
         self.preview_card(card_data)
@@ -713,14 +651,7 @@ class CardEditor:
         if os.path.exists(card_file):
             os.remove(card_file)
         
-        with open(INDEX_FILE, 'r') as f:
-            index = json.load(f)
-        
-        if self.selected_card in index:
-            del index[self.selected_card]
-        
-        with open(INDEX_FILE, 'w') as f:
-            json.dump(index, f, indent=2)
+        card_index.delete(self.selected_card)
         
         print(f"Card deleted: {self.selected_card}")
         self.back_to_list()
@@ -752,10 +683,10 @@ class CardEditor:
             elif self.delete_button and event.ui_element == self.delete_button and self.selected_card:
                 self.delete_card()
             else:
-                for button, card_id in self.card_buttons:
-                    if event.ui_element == button:
-                        self.load_card_for_edit(card_id)
-                        break
+                card_id = self.card_list.handle_event(event) if self.card_list else None
+                if card_id:
+                    self.load_card_for_edit(card_id)
+                    return
                 for entry, browse, field in self.file_inputs:
                     if event.ui_element == browse:
                         root = tk.Tk()
@@ -771,6 +702,8 @@ class CardEditor:
                             except pygame.error:
                                 print(f"Error: Cannot load image file: {file_path}")
                                 entry.set_text("")
+        elif self.card_list:
+            self.card_list.handle_event(event)
         elif event.type == pygame.MOUSEWHEEL and self.selected_card:
             self.scroll_offset += event.y * 20
             self.scroll_offset = max(min(self.scroll_offset, 0), -self.max_scroll)
@@ -784,18 +717,15 @@ class CardViewer:
     def __init__(self, card_type, back_action):
         self.card_type = card_type
         self.back_action = back_action
-        self.scroll_offset = 0
-        self.max_scroll = 0
         self.selected_card = None
         self.preview = None
         self.ui_elements = []
-        self.card_buttons = []
+        self.card_list = None
         self.load_cards()
 
     def load_cards(self):
         manager.clear_and_reset()
         self.ui_elements = []
-        self.card_buttons = []
         self.preview = None
         
         self.title = UILabel(
@@ -815,29 +745,12 @@ class CardViewer:
         )
         self.ui_elements.append(self.back_button)
         
-        with open(INDEX_FILE, 'r') as f:
-            index = json.load(f)
-        
-        self.cards = []
-        for card_id, info in index.items():
-            if info['type'] == self.card_type:
-                self.cards.append((card_id, info))
-        self.cards.sort(key=lambda x: x[1]['name'].lower())
-
-        y_start = 80
-        for i, (card_id, info) in enumerate(self.cards):
-            y_pos = y_start + i * 60
-            button = UIButton(
-                relative_rect=pygame.Rect((WINDOW_WIDTH - 200) // 2, y_pos, 200, 40),
-                text=info['name'],
-                manager=manager,
-                object_id=f"#card_{card_id}"
-            )
-            self.card_buttons.append((button, card_id))
-            self.ui_elements.append(button)
-
-        total_list_height = len(self.cards) * 60 + 100
-        self.max_scroll = max(0, total_list_height - WINDOW_HEIGHT)
+        self.card_list = VirtualList(
+            card_list_rect(),
+            manager,
+            [(card_id, info['name']) for card_id, info in load_index().items() if info['type'] == self.card_type],
+            wheel_anywhere=True
+        )
 
     def show_card_details(self, card_id):
         self.selected_card = card_id
@@ -866,15 +779,11 @@ class CardViewer:
             if event.ui_element == self.back_button:
                 self.back_to_list()
             else:
-                for button, card_id in self.card_buttons:
-                    if event.ui_element == button:
-                        self.show_card_details(card_id)
-                        break
-        elif event.type == pygame.MOUSEWHEEL and not self.selected_card:
-            self.scroll_offset += event.y * 20
-            self.scroll_offset = max(min(self.scroll_offset, 0), -self.max_scroll)
-            for element in self.ui_elements:
-                element.rect.y = element.relative_rect.y - self.scroll_offset
+                card_id = self.card_list.handle_event(event)
+                if card_id:
+                    self.show_card_details(card_id)
+        elif not self.selected_card:
+            self.card_list.handle_event(event)
 
     def draw(self):
         screen.fill(DARK_INDIGO)
@@ -1732,20 +1641,7 @@ class CardCreationScreen:
         with open(card_file, 'w') as f:
             json.dump(card_data, f, indent=2)
         
-        with open(INDEX_FILE, 'r') as f:
-            index = json.load(f)
-        
-        index[card_id] = {
-            "type": self.card_type,
-            "subclass": card_data["subclass"],
-            "blueprint_subclass": card_data["blueprint_subclass"],
-            "states": self.state,
-            "name": card_data["data"].get("Name", 
-                                        card_data["data"].get("Default Name", "Unnamed"))
-        }
-        
-        with open(INDEX_FILE, 'w') as f:
-            json.dump(index, f, indent=2)
+        card_index.put(card_id, card_indexer.index_entry(card_data))
         
         print(f"Card saved with ID: {card_id}")
         self.preview_card(card_data, card_id)
@@ -1802,22 +1698,17 @@ class DeckMaker:
         y_start = 80
         list_height = WINDOW_HEIGHT - y_start - 150
 
-        with open(INDEX_FILE, 'r') as f:
-            index = json.load(f)
-
-        self.cards = [(card_id, info) for card_id, info in index.items()]
-        self.cards.sort(key=lambda x: x[1]['name'].lower())
-        available_cards_dict = {info['name']: card_id for card_id, info in self.cards}
+        self.cards = sorted(load_index().items(), key=lambda x: x[1]['name'].lower())
+        self.card_names = {card_id: info['name'] for card_id, info in self.cards}
 
-        self.available_cards_list = pygame_gui.elements.UISelectionList(
-            relative_rect=pygame.Rect(20, y_start, column_width - 40, list_height),
-            item_list=list(available_cards_dict.keys()),
-            manager=manager,
-            allow_multi_select=True,
-            object_id="#available_cards_list"
+        self.available_cards_list = VirtualList(
+            pygame.Rect(20, y_start, column_width - 40, list_height),
+            manager,
+            list(self.card_names.items()),
+            row_height=45,
+            button_height=40,
+            multi_select=True
         )
-        self.ui_elements.append(self.available_cards_list)
-        self.available_cards_dict = available_cards_dict
 
         deck_info_x = column_width
         self.deck_name_label = UILabel(
@@ -1902,30 +1793,16 @@ class DeckMaker:
         ])
 
     def update_selected_cards(self):
-        selected_names = self.available_cards_list.get_multi_selection()
-        self.selected_cards = [self.available_cards_dict[name] for name in selected_names 
-                             if name in self.available_cards_dict]
-        
-        selected_names_list = [info['name'] for card_id, info in self.cards 
-                             if card_id in self.selected_cards]
-        self.selected_cards_list.set_item_list(selected_names_list)
+        self.selected_cards = self.available_cards_list.selected_in_order()
+        self.selected_cards_list.set_item_list([self.card_names[card_id] for card_id in self.selected_cards])
 
     def remove_selected_cards(self):
-        selected_names_to_remove = self.selected_cards_list.get_multi_selection()
+        selected_names_to_remove = set(self.selected_cards_list.get_multi_selection())
         if not selected_names_to_remove:
             return
-        
-        self.selected_cards = [card_id for card_id in self.selected_cards 
-                             if next(info['name'] for cid, info in self.cards if cid == card_id) 
-                             not in selected_names_to_remove]
-        
-        selected_names_list = [info['name'] for card_id, info in self.cards 
-                             if card_id in self.selected_cards]
-        self.selected_cards_list.set_item_list(selected_names_list)
-        
-        current_selections = self.available_cards_list.get_multi_selection()
-        all_cards = [info['name'] for _, info in self.cards]
-        self.available_cards_list.set_item_list(all_cards)
+        self.available_cards_list.deselect([card_id for card_id in self.selected_cards
+                                            if self.card_names[card_id] in selected_names_to_remove])
+        self.update_selected_cards()
 
     def create_deck(self):
         deck_name = self.deck_name_entry.get_text().strip()
@@ -1980,9 +1857,10 @@ class DeckMaker:
                     self.back_image_entry.set_text(file_path)
             elif event.ui_element == self.remove_button:
                 self.remove_selected_cards()
-        elif event.type == pygame_gui.UI_SELECTION_LIST_NEW_SELECTION:
-            if event.ui_element == self.available_cards_list:
+            elif self.available_cards_list.handle_event(event):
                 self.update_selected_cards()
+        else:
+            self.available_cards_list.handle_event(event)
 
     def draw(self):
         screen.fill(DARK_INDIGO)
@@ -2201,30 +2079,13 @@ class CardManager:
         self.deck_maker_screen = None
 
     def update_card_index(self):
-        index = {}
-        for filename in os.listdir("cards"):
-            if filename.endswith(".json") and filename != "card_index.json":
-                card_id = os.path.splitext(filename)[0]
-                try:
-                    with open(os.path.join("cards", filename), 'r') as f:
-                        card_data = json.load(f)
-                    if "card_type" in card_data and "data" in card_data:
-                        name = card_data["data"].get("Name", card_data["data"].get("Default Name", "Unnamed"))
-                        index[card_id] = {
-                            "type": card_data["card_type"],
-                            "subclass": card_data.get("subclass"),
-                            "blueprint_subclass": card_data.get("blueprint_subclass"),
-                            "states": card_data.get("states"),
-                            "name": name
-                        }
-                    else:
-                        print(f"Skipping {filename}: missing 'card_type' or 'data'")
-                except json.JSONDecodeError:
-                    print(f"Error decoding JSON in {filename}")
-                except Exception as e:
-                    print(f"Error processing {filename}: {e}")
-        with open(INDEX_FILE, 'w') as f:
-            json.dump(index, f, indent=2)
+        try:
+            report = card_indexer.update_index(store=card_index)
+        except Exception as e:
+            print(f"Error updating card index: {e}")
+            return
+        for line in report.lines():
+            print(line)
         print("Card index updated.")
 
     def handle_event(self, event):
@@ -2294,11 +2155,12 @@ def main():
     pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT), pygame.FULLSCREEN)
     
     card_manager = CardManager()
-    clock = pygame.time.Clock()
+    session = ProfileSession("CardMaker21")  # --profile / --record-input / --replay-input
+    clock = session.clock()
 
     while True:
         time_delta = clock.tick(60) / 1000.0
-        for e in event.get():
+        for e in session.events():
             if e.type == pygame.QUIT:
                 pygame.quit()
                 sys.exit()
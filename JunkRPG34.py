@@ -7,15 +7,24 @@ import math
 from heapq import heappush, heappop
 import os
 import json
-import datetime
 import random
 from collections import deque
 import tkinter as tk
 from tkinter import filedialog
 from player import Player  # Import Player from player.py
+import combat
 from unit import Unit      # Import Unit from unit.py
 from hexgrid import HexGrid  # Import HexGrid from hexgrid.py
 from inventory_card import InventoryCard
+import savegame
+import crafting_solver
+import game_log
+import replay
+from turn_engine import TurnEngine
+from card_manager import CardManager, INDEX_FILE
+from profiler import PROFILER
+from profile_session import ProfileSession
+from screen_manager import ScreenManager
 
 # Initialize Pygame and Pygame-GUI
 pygame.init()
@@ -44,14 +53,13 @@ LIGHT_GREEN = (144, 238, 144)  # Card-drawing hex border
 PURPLE = (128, 0, 128)  # Linked level hex border
 
 # Animation constants
-MOVE_SPEED = 5
 ATTACK_FLASH_DURATION = 500
 
 # Directories
 os.makedirs("cards", exist_ok=True)
 os.makedirs("levels", exist_ok=True)
 os.makedirs("campaigns", exist_ok=True)
-INDEX_FILE = "cards/card_index.json"
+os.makedirs(savegame.SAVE_DIR, exist_ok=True)
 if not os.path.exists(INDEX_FILE):
     with open(INDEX_FILE, 'w') as f:
         json.dump({}, f)
@@ -63,108 +71,6 @@ CHARACTER_CLASSES = {
     "Tank": {"hp": 150, "movement": 3, "projectile_range": 3, "attacks": {"Spit": 4, "Head-butt": 8}, "special_attack": "Spin Punch"}
 }
 
-# CardManager class
-class CardManager:
-    def __init__(self):
-        self.card_types = ["Junk Card", "Document Card", "Enemy Card", "NPC Card", "Location Card", "Quest Card", "Instance Card", "Boss Card"]
-
-    def get_cards_for_game(self, card_type=None, filters=None):
-        try:
-            with open(INDEX_FILE, 'r') as f:
-                index = json.load(f)
-        except Exception as e:
-            print(f"Error loading card index: {e}")
-            return []
-
-        cards = []
-        for card_id, info in index.items():
-            if card_type and info['type'] != card_type:
-                continue
-            card_file = os.path.join("cards", f"{card_id}.json")
-            try:
-                with open(card_file, 'r') as cf:
-                    card_data = json.load(cf)
-            except Exception as e:
-                print(f"Error loading card {card_id}: {e}")
-                continue
-            if filters and not self._apply_filters(card_data, filters):
-                continue
-            is_valid, _ = self.validate_card_for_game(card_data)
-            if is_valid:
-                card_data["id"] = card_id
-                cards.append(card_data)
-        return cards
-
-    def _apply_filters(self, card_data, filters):
-        for field, condition in filters.items():
-            if field not in card_data['data']:
-                return False
-            value = card_data['data'][field]
-            if isinstance(condition, str) and condition.startswith(('>', '<', '=')):
-                try:
-                    operator = condition[0]
-                    threshold = float(condition[1:])
-                    value = float(value)
-                    if operator == '>' and value <= threshold:
-                        return False
-                    elif operator == '<' and value >= threshold:
-                        return False
-                    elif operator == '=' and value != threshold:
-                        return False
-                except ValueError:
-                    return False
-            elif value != condition:
-                return False
-        return True
-
-    def validate_card_for_game(self, card_data):
-        required_fields = {
-            "Enemy Card": ["Name", "Health", "Movement", "Melee Damage"],
-            "Boss Card": ["Name", "Health", "Movement", "Melee Damage"],
-            "NPC Card": ["Name", "Health", "Movement", "Melee Damage", "Allegiance (Hostile, Neutral, Allied)"],
-            "Location Card": ["Name"],
-            "Junk Card": ["Name"],
-            "Document Card": ["Name"]
-        }
-        card_type = card_data.get("card_type")
-        if card_type not in required_fields:
-            return False, f"Unsupported card type: {card_type}"
-        data = card_data.get("data", {})
-        missing_fields = [field for field in required_fields[card_type] if field not in data or not data[field]]
-        if missing_fields:
-            return False, f"Missing fields: {', '.join(missing_fields)}"
-        numeric_fields = {
-            "Enemy Card": ["Health", "Movement", "Melee Damage", "Projectile Damage", "Projectile Range"],
-            "Boss Card": ["Health", "Movement", "Melee Damage", "Projectile Damage", "Projectile Range"],
-            "NPC Card": ["Health", "Movement", "Melee Damage", "Projectile Damage", "Projectile Range"]
-        }
-        if card_type in numeric_fields:
-            for field in numeric_fields[card_type]:
-                if field in data and data[field]:
-                    try:
-                        value = float(data[field])
-                        if value < 0:
-                            return False, f"Invalid {field}: must be non-negative"
-                    except ValueError:
-                        return False, f"Invalid numeric {field}"
-        return True, "Valid"
-
-    def track_card_usage(self, card_id, usage_context):
-        usage_log = os.path.join("cards", "usage_log.json")
-        try:
-            if os.path.exists(usage_log):
-                with open(usage_log, 'r') as f:
-                    usage_data = json.load(f)
-            else:
-                usage_data = {}
-            if card_id not in usage_data:
-                usage_data[card_id] = []
-            usage_data[card_id].append({"timestamp": datetime.datetime.now().isoformat(), "context": usage_context})
-            with open(usage_log, 'w') as f:
-                json.dump(usage_data, f, indent=2)
-        except Exception as e:
-            print(f"Error with usage log: {e}")
-
 # InventoryScreen class
 class InventoryScreen:
     def __init__(self):
@@ -180,49 +86,49 @@ class InventoryScreen:
         self.info_text = None
         self.close_button = None
         self.selected_card = None
+        self.lists = {}
+        self.shown_inventory = None
+        self.shown_versions = {}
 
-    def initialize_screen(self):
-        manager.clear_and_reset()
+    def build(self, container):
         window_rect = pygame.Rect((WINDOW_WIDTH - 1200) // 2, (WINDOW_HEIGHT - 800) // 2, 1200, 800)
         self.window = UIWindow(window_rect, manager, "Inventory")
         self.header_label = UILabel(pygame.Rect(0, 0, 1200, 50), "Inventory", manager, container=self.window)
         column_width = 300
         column_height = 700
 
-        junk_cards = [card for card in game.player.inventory if card.current_state == 1 and card.card_data["card_type"] == "Junk Card"]
         self.junk_list = UISelectionList(pygame.Rect(0, 50, column_width, column_height), 
-                                         [card.get_current_data().get("Name", "Unnamed") for card in junk_cards], 
-                                         manager, container=self.window)
-        documents_cards = [card for card in game.player.inventory if card.current_state == 1 and card.card_data["card_type"] == "Document Card"]
+                                         [], manager, container=self.window)
         self.documents_list = UISelectionList(pygame.Rect(column_width, 50, column_width, column_height), 
-                                              [card.get_current_data().get("Name", "Unnamed") for card in documents_cards], 
-                                              manager, container=self.window)
-        weapons_cards = [card for card in game.player.inventory if card.current_state == 2 and card.get_current_data().get("Type") in ["Melee", "Projectile"]]
+                                              [], manager, container=self.window)
         self.weapons_list = UISelectionList(pygame.Rect(2 * column_width, 50, column_width, 300), 
-                                            [card.get_current_data().get("Name", "Unnamed") for card in weapons_cards], 
-                                            manager, container=self.window)
+                                            [], manager, container=self.window)
         self.equip_button = UIButton(pygame.Rect(2 * column_width, 350, column_width, 50), "Equip", manager, container=self.window)
-        consumables_cards = [card for card in game.player.inventory if card.current_state == 2 and card.get_current_data().get("Type") == "Consumable"]
         self.consumables_list = UISelectionList(pygame.Rect(2 * column_width, 400, column_width, 300), 
-                                                [card.get_current_data().get("Name", "Unnamed") for card in consumables_cards], 
-                                                manager, container=self.window)
+                                                [], manager, container=self.window)
         self.use_button = UIButton(pygame.Rect(2 * column_width, 700, column_width, 50), "Use", manager, container=self.window)
-        tools_cards = [card for card in game.player.inventory if card.current_state == 2 and card.get_current_data().get("Type") == "Tool"]
         self.tools_list = UISelectionList(pygame.Rect(3 * column_width, 50, column_width, column_height), 
-                                          [card.get_current_data().get("Name", "Unnamed") for card in tools_cards], 
-                                          manager, container=self.window)
+                                          [], manager, container=self.window)
+        self.lists = {"junk": self.junk_list, "documents": self.documents_list, "weapons": self.weapons_list,
+                      "consumables": self.consumables_list, "tools": self.tools_list}
+        self.shown_inventory = None
         self.info_text = UITextBox("Select an item to view details", pygame.Rect(2 * column_width, 750, column_width * 2, 50), manager, container=self.window)
         self.close_button = UIButton(pygame.Rect(1050, 720, 100, 30), "Close", manager, container=self.window)
         self.selected_card = None
+        return self.window
+
+    def refresh(self):
+        self.refresh_lists()
+        if self.selected_card not in game.player.inventory:
+            self.select(None)
 
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
             if event.ui_element == self.close_button:
-                game.current_screen = "game"
-                game_screen.initialize_screen()
+                game.show_screen("game")
             elif event.ui_element == self.equip_button and self.selected_card and self.weapons_list.get_single_selection():
                 game.player.equip_weapon(self.selected_card)
-                game_screen.player_info_label.set_text(game_screen.get_player_info())
+                game_screen.update_player_info()
             elif event.ui_element == self.use_button and self.selected_card and self.consumables_list.get_single_selection():
                 current_data = self.selected_card.get_current_data()
                 if current_data.get("Type") == "Consumable":
@@ -237,29 +143,35 @@ class InventoryScreen:
                             game.player.hp = min(game.player.max_hp, game.player.hp + hp_change)
                             game_screen.add_to_log(f"Used {current_data.get('Name', 'Unnamed')} to restore {hp_change} HP ({old_hp} -> {game.player.hp})")
                             game.player.inventory.remove(self.selected_card)
-                            self.initialize_screen()
-                            game_screen.player_info_label.set_text(game_screen.get_player_info())
+                            self.refresh_lists()
+                            self.select(None)
+                            game_screen.update_player_info()
                         else:
                             game_screen.add_to_log(f"{current_data.get('Name', 'Unnamed')} has no HP effect")
                     except (ValueError, AttributeError) as e:
                         game_screen.add_to_log(f"Invalid HP effect for {current_data.get('Name', 'Unnamed')}: {hp_effect} ({str(e)})")
         elif event.type == pygame_gui.UI_SELECTION_LIST_NEW_SELECTION:
-            selected_name = event.text
-            if event.ui_element == self.junk_list:
-                self.selected_card = next((card for card in game.player.inventory if card.current_state == 1 and card.card_data["card_type"] == "Junk Card" and card.get_current_data().get("Name") == selected_name), None)
-            elif event.ui_element == self.documents_list:
-                self.selected_card = next((card for card in game.player.inventory if card.current_state == 1 and card.card_data["card_type"] == "Document Card" and card.get_current_data().get("Name") == selected_name), None)
-            elif event.ui_element == self.weapons_list:
-                self.selected_card = next((card for card in game.player.inventory if card.current_state == 2 and card.get_current_data().get("Type") in ["Melee", "Projectile"] and card.get_current_data().get("Name") == selected_name), None)
-            elif event.ui_element == self.consumables_list:
-                self.selected_card = next((card for card in game.player.inventory if card.current_state == 2 and card.get_current_data().get("Type") == "Consumable" and card.get_current_data().get("Name") == selected_name), None)
-            elif event.ui_element == self.tools_list:
-                self.selected_card = next((card for card in game.player.inventory if card.current_state == 2 and card.get_current_data().get("Type") == "Tool" and card.get_current_data().get("Name") == selected_name), None)
-            if self.selected_card:
-                info_text = "<br>".join(f"{k}: {v}" for k, v in self.selected_card.get_current_data().items() if v)
-                self.info_text.set_text(info_text)
-            else:
-                self.info_text.set_text("Select an item to view details")
+            category = next((category for category, ui_list in self.lists.items() if ui_list == event.ui_element), None)
+            if category:
+                self.select(game.player.inventory.first(category, event.text))
+
+    def select(self, card):
+        self.selected_card = card
+        if card:
+            self.info_text.set_text("<br>".join(f"{k}: {v}" for k, v in card.get_current_data().items() if v))
+        else:
+            self.info_text.set_text("Select an item to view details")
+
+    def refresh_lists(self):
+        """Rebuild only the lists whose category changed since they were last shown."""
+        inventory = game.player.inventory
+        if inventory is not self.shown_inventory:  # New game or loaded save
+            self.shown_inventory = inventory
+            self.shown_versions = {}
+        for category, ui_list in self.lists.items():
+            if self.shown_versions.get(category) != inventory.versions[category]:
+                ui_list.set_item_list(inventory.labels(category))
+                self.shown_versions[category] = inventory.versions[category]
 
     def draw(self):
         screen.fill(DARK_INDIGO)
@@ -281,41 +193,90 @@ class CraftingScreen:
         self.close_button = None
         self.selected_to_craft = None
         self.selected_materials = set()
-        self.REQUIREMENT_TO_VALUE = {
-            "Requirements: Raw Materials": "Raw Material Value",
-            "Requirements: Refined Materials": "Refined Material Value",
-            "Requirements: Wood": "Wood Value",
-            "Requirements: Metal": "Metal Value"
-        }
-
-    def initialize_screen(self):
-        manager.clear_and_reset()
+        self.material_cards = {}  # The card behind each materials_list row, by the row's object id
+        self.auto_fill_button = None
+        self.craftable_info = None
+        self.shown_inventory = None
+        self.shown_versions = {}
+        self.shown_craftable_version = None
+        self.REQUIREMENT_TO_VALUE = crafting_solver.REQUIREMENT_TO_VALUE
+
+    def build(self, container):
         self.window = UIWindow(pygame.Rect((WINDOW_WIDTH - 1380) // 2, (WINDOW_HEIGHT - 900) // 2, 1380, 900), manager, "Crafting")
-        junk_cards = [card for card in game.player.inventory if card.card_data["card_type"] == "Junk Card" and card.is_two_state() and card.current_state == 1]
-        self.junk_list = UISelectionList(pygame.Rect(15, 75, 330, 300), 
-                                         [card.get_current_data().get("Name", "Unnamed") for card in junk_cards], 
-                                         manager, container=self.window)
-        blueprint_cards = [card for card in game.player.inventory if card.card_data["card_type"] == "Document Card" and card.card_data.get("subclass", "") == "Blueprint" and card.is_two_state() and card.current_state == 1]
-        self.blueprint_list = UISelectionList(pygame.Rect(15, 390, 330, 300), 
-                                              [card.get_current_data().get("Name", "Unnamed") for card in blueprint_cards], 
-                                              manager, container=self.window)
-        self.materials_list = UISelectionList(pygame.Rect(360, 75, 330, 750), 
-                                              [], manager, container=self.window, allow_multi_select=True)
-        self.update_materials_list()
+        self.junk_list = UISelectionList(pygame.Rect(15, 75, 330, 300), [], manager, container=self.window)
+        self.blueprint_list = UISelectionList(pygame.Rect(15, 390, 330, 300), [], manager, container=self.window)
+        self.materials_list = None
+        self.create_materials_list([])
         self.to_craft_info = UITextBox("<font color='#FFFFFF' size=4>To Craft</font>", pygame.Rect(705, 75, 330, 250), manager, container=self.window)
         self.selected_material_info = UITextBox("<font color='#FFFFFF' size=4>Selected Material</font>", pygame.Rect(705, 335, 330, 250), manager, container=self.window)
         self.state2_info = UITextBox("<font color='#FFFFFF' size=4>State 2 Info</font>", pygame.Rect(705, 595, 330, 250), manager, container=self.window)
         self.requirements_info = UITextBox("<font color='#FFFFFF' size=4>Requirements</font>", pygame.Rect(1050, 75, 330, 200), manager, container=self.window)
         self.craft_button = UIButton(pygame.Rect(1060, 375, 100, 30), "Craft", manager, container=self.window)
         self.close_button = UIButton(pygame.Rect(1170, 375, 100, 30), "Close", manager, container=self.window)
+        self.auto_fill_button = UIButton(pygame.Rect(1060, 335, 210, 30), "Auto-fill", manager, container=self.window)
         self.success_label = UILabel(pygame.Rect(1060, 415, 310, 30), "", manager, container=self.window)
+        self.craftable_info = UITextBox("<font color='#FFFFFF' size=4>Craftable Now</font>",
+                                        pygame.Rect(1050, 455, 330, 390), manager, container=self.window)
+        self.shown_inventory = None
+        self.shown_craftable_version = None
+        return self.window
+
+    def refresh(self):
+        self.success_label.set_text("")
+        self.refresh_lists()
+
+    def refresh_lists(self):
+        """Bring the lists and the craftable summary up to date with the inventory, rebuilding only what changed."""
+        inventory = game.player.inventory
+        if inventory is not self.shown_inventory:  # New game or loaded save
+            self.shown_inventory = inventory
+            self.shown_versions = {}
+            self.shown_craftable_version = None
+            self.selected_to_craft = None
+            self.selected_materials = set()
+        if self.selected_to_craft and (self.selected_to_craft not in inventory or self.selected_to_craft.current_state != 1):
+            self.selected_to_craft = None
+            self.to_craft_info.set_text("<font color='#FFFFFF' size=4>To Craft</font>")
+            self.state2_info.set_text("<font color='#FFFFFF' size=4>State 2 Info</font>")
+        changed = {category for category in ("junk", "documents") if self.shown_versions.get(category) != inventory.versions[category]}
+        if "junk" in changed:
+            junk_cards = [card for card in inventory.cards_in("junk") if card.is_two_state()]
+            self.junk_list.set_item_list([card.get_current_data().get("Name", "Unnamed") for card in junk_cards])
+            self.update_materials_list()
+        if "documents" in changed:
+            blueprint_cards = [card for card in inventory.cards_in("documents") if card.card_data.get("subclass", "") == "Blueprint" and card.is_two_state()]
+            self.blueprint_list.set_item_list([card.get_current_data().get("Name", "Unnamed") for card in blueprint_cards])
+        for category in changed:
+            self.shown_versions[category] = inventory.versions[category]
+        index = game.player.crafting_index
+        if self.shown_craftable_version != index.version:
+            self.shown_craftable_version = index.version
+            craftable = [card.get_state_data(1).get("Name", "Unnamed") for card in index.craftable()]
+            self.craftable_info.set_text("<font color='#FFFFFF' size=4>Craftable Now:<br>" + ("<br>".join(craftable) or "Nothing yet") + "</font>")
         self.update_requirements_display()
 
     def update_materials_list(self):
-        materials_cards = [card for card in game.player.inventory if card.card_data["card_type"] == "Junk Card" and card.current_state == 1]
+        materials_cards = game.player.inventory.cards_in("junk")
         if self.selected_to_craft and self.selected_to_craft.card_data["card_type"] == "Junk Card":
             materials_cards = [card for card in materials_cards if card != self.selected_to_craft]
-        self.materials_list.set_item_list([card.get_current_data().get("Name", "Unnamed") for card in materials_cards])
+        self.materials_list.set_item_list(self.material_rows(materials_cards))
+        self.selected_materials.clear()  # The rebuilt list has nothing selected
+
+    def material_rows(self, cards):
+        """materials_list items for cards; each row gets its own object id so copies with the same name are told apart."""
+        self.material_cards = {f"#material_{index}": card for index, card in enumerate(cards)}
+        return [(card.get_current_data().get("Name", "Unnamed"), object_id) for object_id, card in self.material_cards.items()]
+
+    def create_materials_list(self, rows, selected=None):
+        """(Re)create materials_list with rows, the ones in selected already selected."""
+        if self.materials_list:
+            self.materials_list.kill()
+        self.materials_list = UISelectionList(pygame.Rect(360, 75, 330, 750), rows, manager, container=self.window,
+                                              allow_multi_select=True, default_selection=selected or None)
+
+    def selected_rows(self):
+        """The cards of the selected materials_list rows, in row order."""
+        return [self.material_cards[object_id] for _, object_id in self.materials_list.get_multi_selection(include_object_id=True)]
 
     def update_requirements_display(self):
         if not self.selected_to_craft:
@@ -353,27 +314,27 @@ class CraftingScreen:
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
             if event.ui_element == self.close_button:
-                game.current_screen = "game"
-                game_screen.initialize_screen()
+                game.show_screen("game")
+            elif event.ui_element == self.auto_fill_button:
+                self.auto_fill()
             elif event.ui_element == self.craft_button:
                 if self.selected_to_craft and self.check_requirements():
                     for material in self.selected_materials:
                         game.player.inventory.remove(material)
-                    self.selected_to_craft.toggle_state()
+                    game.player.inventory.toggle_state(self.selected_to_craft)
                     crafted_name = self.selected_to_craft.get_state_data(2).get("2nd_state_Name", "Unnamed Item")
-                    self.success_label.set_text(f"Crafted {crafted_name}")
-                    self.selected_to_craft = None
                     self.selected_materials.clear()
-                    self.initialize_screen()
+                    self.refresh_lists()
+                    self.success_label.set_text(f"Crafted {crafted_name}")
                 else:
                     self.success_label.set_text("Requirements not met or no item selected")
         elif event.type == pygame_gui.UI_SELECTION_LIST_NEW_SELECTION:
             if event.ui_element in [self.junk_list, self.blueprint_list]:
                 selected_name = event.text
                 cards = (
-                    [card for card in game.player.inventory if card.card_data["card_type"] == "Junk Card" and card.is_two_state() and card.current_state == 1]
+                    [card for card in game.player.inventory.cards_in("junk") if card.is_two_state()]
                     if event.ui_element == self.junk_list else
-                    [card for card in game.player.inventory if card.card_data["card_type"] == "Document Card" and card.card_data.get("subclass", "") == "Blueprint" and card.is_two_state() and card.current_state == 1]
+                    [card for card in game.player.inventory.cards_in("documents") if card.card_data.get("subclass", "") == "Blueprint" and card.is_two_state()]
                 )
                 self.selected_to_craft = next((card for card in cards if card.get_state_data(1).get("Name") == selected_name), None)
                 self.update_materials_list()
@@ -386,18 +347,35 @@ class CraftingScreen:
                     self.state2_info.set_text(state2_text)
                     self.update_requirements_display()
             elif event.ui_element == self.materials_list:
-                selected_names = self.materials_list.get_multi_selection()
-                materials_cards = [card for card in game.player.inventory if card.card_data["card_type"] == "Junk Card" and card.current_state == 1]
-                if self.selected_to_craft and self.selected_to_craft.card_data["card_type"] == "Junk Card":
-                    materials_cards = [card for card in materials_cards if card != self.selected_to_craft]
-                self.selected_materials = {card for card in materials_cards if card.get_current_data().get("Name") in selected_names}
-                if selected_names:
-                    last_material = next((card for card in materials_cards if card.get_current_data().get("Name") == selected_names[-1]), None)
-                    if last_material:
-                        data = last_material.get_current_data()
-                        info_text = f"<font color='#FFFFFF' size=4>Selected Material: {data.get('Name', 'Unnamed')}<br>" + "<br>".join(f"{k}: {v}" for k, v in data.items() if k != "Name" and v) + "</font>"
-                        self.selected_material_info.set_text(info_text)
+                selected = self.selected_rows()
+                self.selected_materials = set(selected)
+                if selected:
+                    data = selected[-1].get_current_data()
+                    info_text = f"<font color='#FFFFFF' size=4>Selected Material: {data.get('Name', 'Unnamed')}<br>" + "<br>".join(f"{k}: {v}" for k, v in data.items() if k != "Name" and v) + "</font>"
+                    self.selected_material_info.set_text(info_text)
                 self.update_requirements_display()
+        elif event.type == pygame_gui.UI_SELECTION_LIST_DROPPED_SELECTION and event.ui_element == self.materials_list:
+            self.selected_materials = set(self.selected_rows())
+            self.update_requirements_display()
+
+    def auto_fill(self):
+        """Select the least wasteful materials that meet the selected item's requirements."""
+        if not self.selected_to_craft:
+            self.success_label.set_text("Select an item to craft first")
+            return
+        plan = crafting_solver.solve(self.selected_to_craft, game.player.inventory.cards_in("junk"))
+        if not plan.feasible:
+            self.success_label.set_text("Cannot craft: " + "; ".join(plan.problems))
+            return
+        self.selected_materials = set(plan.materials)
+        # The list can only be given a selection when it is created, so it is recreated with the plan's rows
+        # selected; rows are matched by object id, so of several copies of a name only those in the plan are selected
+        rows = self.material_rows(list(self.material_cards.values()))
+        self.create_materials_list(rows, [row for row in rows if self.material_cards[row[1]] in self.selected_materials])
+        self.selected_material_info.set_text("<font color='#FFFFFF' size=4>Selected Materials:<br>" +
+                                             "<br>".join(material.get_current_data().get("Name", "Unnamed") for material in plan.materials) + "</font>")
+        self.success_label.set_text(f"Auto-filled {len(plan.materials)} materials, {plan.waste} wasted")
+        self.update_requirements_display()
 
     def check_requirements(self):
         if not self.selected_to_craft:
@@ -424,32 +402,36 @@ class CraftingScreen:
 class MainMenu:
     def __init__(self):
         self.ui_elements = []
-        self.initialize_buttons()
 
-    def initialize_buttons(self):
-        manager.clear_and_reset()
+    def build(self, container):
         self.ui_elements = [
-            UILabel(pygame.Rect(0, 50, WINDOW_WIDTH, 50), "Hex-Grid RPG", manager, object_id="#title_label", anchors={'centerx': 'centerx'}),
-            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 200, 200, 50), "New Campaign", manager),
-            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 270, 200, 50), "Load Campaign", manager),
-            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 340, 200, 50), "Load Level", manager),
-            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 410, 200, 50), "Settings", manager),
-            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 480, 200, 50), "Quit", manager)
+            UILabel(pygame.Rect(0, 50, WINDOW_WIDTH, 50), "Hex-Grid RPG", manager, container=container, object_id="#title_label", anchors={'centerx': 'centerx'}),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 200, 200, 50), "New Campaign", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 270, 200, 50), "Load Campaign", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 340, 200, 50), "Load Level", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 410, 200, 50), "Settings", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 480, 200, 50), "Quit", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 130, 200, 50), "Continue", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2 + 220, 130, 200, 50), "Load Game", manager, container=container)
         ]
 
+    def refresh(self):
+        if os.path.exists(savegame.AUTOSAVE_FILE):
+            self.ui_elements[6].enable()
+        else:
+            self.ui_elements[6].disable()
+
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
             if event.ui_element == self.ui_elements[1]:  # New Campaign
-                game.current_screen = "character_creation"
-                character_creation_screen.initialize_screen()
+                game.show_screen("character_creation")
             elif event.ui_element == self.ui_elements[2]:  # Load Campaign
                 root = tk.Tk()
                 root.withdraw()
                 file_path = filedialog.askopenfilename(initialdir="campaigns", filetypes=[("JSON files", "*.json")])
                 root.destroy()
                 if file_path:
-                    game.current_screen = "character_creation"
-                    character_creation_screen.initialize_screen(campaign_file=file_path)
+                    game.show_screen("character_creation", campaign_file=file_path)
                 else:
                     print("No campaign file selected")
             elif event.ui_element == self.ui_elements[3]:  # Load Level
@@ -458,16 +440,25 @@ class MainMenu:
                 file_path = filedialog.askopenfilename(initialdir="levels", filetypes=[("JSON files", "*.json")])
                 root.destroy()
                 if file_path:
-                    game.current_screen = "character_creation"
-                    character_creation_screen.initialize_screen(level_file=file_path)
+                    game.show_screen("character_creation", level_file=file_path)
                 else:
                     print("No level file selected")
             elif event.ui_element == self.ui_elements[4]:  # Settings
-                game.current_screen = "settings"
-                settings_screen.initialize_screen()
+                game.show_screen("settings")
             elif event.ui_element == self.ui_elements[5]:  # Quit
                 pygame.quit()
                 sys.exit()
+            elif event.ui_element == self.ui_elements[6]:  # Continue from autosave
+                game_screen.load_saved_game(savegame.AUTOSAVE_FILE)
+            elif event.ui_element == self.ui_elements[7]:  # Load Game
+                root = tk.Tk()
+                root.withdraw()
+                file_path = filedialog.askopenfilename(initialdir=savegame.SAVE_DIR, filetypes=[("Save files", "*.sav")])
+                root.destroy()
+                if file_path:
+                    game_screen.load_saved_game(file_path)
+                else:
+                    print("No save file selected")
 
     def draw(self):
         screen.fill(DARK_INDIGO)
@@ -481,35 +472,34 @@ class CharacterCreationScreen:
         self.level_file = None
         self.campaign_file = None
 
-    def initialize_screen(self, level_file=None, campaign_file=None):
-        self.level_file = level_file
-        self.campaign_file = campaign_file
-        manager.clear_and_reset()
+    def build(self, container):
         self.ui_elements = [
-            UILabel(pygame.Rect(0, 50, WINDOW_WIDTH, 50), "Choose Your Class", manager, anchors={'centerx': 'centerx'}),
-            UIButton(pygame.Rect(20, 20, 100, 50), "Back", manager)
+            UILabel(pygame.Rect(0, 50, WINDOW_WIDTH, 50), "Choose Your Class", manager, container=container, anchors={'centerx': 'centerx'}),
+            UIButton(pygame.Rect(20, 20, 100, 50), "Back", manager, container=container)
         ]
         self.class_buttons = []
         for i, (class_name, stats) in enumerate(CHARACTER_CLASSES.items()):
             y_pos = 150 + i * 100
-            button = UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, y_pos, 200, 50), class_name, manager)
+            button = UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, y_pos, 200, 50), class_name, manager, container=container)
             self.class_buttons.append((button, class_name))
             self.ui_elements.append(button)
             desc = f"{stats['hp']} HP, {stats['movement']} Movement, {stats['projectile_range']} Range, " \
                    f"{list(stats['attacks'].keys())[0]} ({list(stats['attacks'].values())[0]} dmg), " \
                    f"{list(stats['attacks'].keys())[1]} ({list(stats['attacks'].values())[1]} dmg), {stats['special_attack']}"
-            self.ui_elements.append(UILabel(pygame.Rect((WINDOW_WIDTH - 600) // 2, y_pos + 60, 600, 30), desc, manager))
+            self.ui_elements.append(UILabel(pygame.Rect((WINDOW_WIDTH - 600) // 2, y_pos + 60, 600, 30), desc, manager, container=container))
+
+    def refresh(self, level_file=None, campaign_file=None):
+        self.level_file = level_file
+        self.campaign_file = campaign_file
 
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
             if event.ui_element == self.ui_elements[1]:
-                game.current_screen = "main_menu"
-                main_menu.initialize_buttons()
+                game.show_screen("main_menu")
             else:
                 for button, class_name in self.class_buttons:
                     if event.ui_element == button:
                         game.player = Player(class_name)
-                        game.current_screen = "game"
                         game_screen.start_new_game(level_file=self.level_file, campaign_file=self.campaign_file)
                         break
 
@@ -522,17 +512,18 @@ class SettingsScreen:
     def __init__(self):
         self.ui_elements = []
 
-    def initialize_screen(self):
-        manager.clear_and_reset()
+    def build(self, container):
         self.ui_elements = [
-            UILabel(pygame.Rect(0, 50, WINDOW_WIDTH, 50), "Settings", manager, anchors={'centerx': 'centerx'}),
-            UIButton(pygame.Rect(20, 20, 150, 50), "Back to Main Menu", manager)
+            UILabel(pygame.Rect(0, 50, WINDOW_WIDTH, 50), "Settings", manager, container=container, anchors={'centerx': 'centerx'}),
+            UIButton(pygame.Rect(20, 20, 150, 50), "Back to Main Menu", manager, container=container)
         ]
 
+    def refresh(self):
+        pass
+
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED and event.ui_element == self.ui_elements[1]:
-            game.current_screen = "main_menu"
-            main_menu.initialize_buttons()
+            game.show_screen("main_menu")
 
     def draw(self):
         screen.fill(DARK_INDIGO)
@@ -547,7 +538,7 @@ class GameScreen:
         self.right_panel_buttons = []
         self.selected_unit = None
         self.card_manager = None
-        self.log = []
+        self.log = game_log.GameLog(transcript=game_log.TranscriptWriter())
         self.is_player_turn = True
         self.selected_attack = None
         self.turn_phase = "player"
@@ -558,12 +549,16 @@ class GameScreen:
         self.player_info_label = None
         self.game_started = False
         self.campaign = None
+        self.campaign_file = None
         self.current_level_idx = 0
         self.current_level_file = None
         self.initial_inventory = []
         self.initial_melee_weapon = None
         self.initial_projectile_weapon = None
         self.player_class = None  # Store player's class for reset
+        self.autosaver = savegame.Autosaver()
+        self.recorder = None  # Replay of the current battle
+        self.turn_engine = TurnEngine(self.resolve_unit)
         self.colors = {
             'BLUE': BLUE,
             'DARK_RED_ALPHA': DARK_RED_ALPHA,
@@ -583,7 +578,9 @@ class GameScreen:
     def start_new_game(self, level_file=None, campaign_file=None):
         # Reset game state
         self.hex_grid = HexGrid(16, 24, 30, WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.turn_engine.cancel()
         self.current_level_file = level_file
+        self.campaign_file = campaign_file
         self.log.clear()
         self.turn_phase = "player"
         self.is_player_turn = True
@@ -595,6 +592,12 @@ class GameScreen:
         if not self.player_class and game.player:
             self.player_class = game.player.class_name
         
+        # Seed the RNG per match so the replay can reproduce deck draws and AI choices
+        seed = random.randrange(2 ** 32)
+        random.seed(seed)
+        self.recorder = replay.ReplayRecorder(seed, game.player.class_name)
+        self.hex_grid.recorder = self.recorder
+        
         # Load campaign or level
         if campaign_file:
             try:
@@ -615,8 +618,10 @@ class GameScreen:
                 self.hex_grid.place_unit(game.player, self.hex_grid.rows // 2, self.hex_grid.cols // 2)
                 self.log.append("Failed to load level. Starting default level.")
         else:
+            self.recorder.record_level(self.hex_grid)
             self.hex_grid.place_unit(game.player, self.hex_grid.rows // 2, self.hex_grid.cols // 2)
             self.log.append("Started default level.")
+        self.recorder.record_phase("player")
         
         # Store initial state after loading
         self.initial_inventory = game.player.inventory.copy()
@@ -644,7 +649,38 @@ class GameScreen:
             unit.current_state = 1  # Reset to initial state if applicable
         
         self.game_started = True
-        self.initialize_screen()
+        game.show_screen("game")
+
+    def load_saved_game(self, save_file):
+        try:
+            player, hex_grid, state = savegame.load_game(save_file, WINDOW_WIDTH, WINDOW_HEIGHT)
+        except Exception as e:
+            print(f"Error loading save '{save_file}': {e}")
+            return False
+        game.player = player
+        self.hex_grid = hex_grid
+        self.turn_engine.cancel()
+        self.turn_phase = state.get("turn_phase", "player")
+        self.is_player_turn = state.get("is_player_turn", True)
+        self.current_level_idx = state.get("current_level_idx", 0)
+        self.current_level_file = state.get("current_level_file")
+        self.campaign_file = state.get("campaign_file")
+        self.campaign = state.get("campaign")
+        self.player_class = state.get("player_class") or player.class_name
+        # Seeded from the restored RNG, so loading the same save plays out (and replays) the same way
+        seed = random.randrange(2 ** 32)
+        random.seed(seed)
+        self.recorder = replay.ReplayRecorder(seed, player.class_name)
+        self.recorder.record_board(hex_grid)
+        self.recorder.record_phase(self.turn_phase)
+        hex_grid.recorder = self.recorder
+        self.log.reset(state.get("log", []))
+        self.log.append(f"Loaded save: {os.path.basename(save_file)}")
+        self.selected_attack = None
+        self.player_mode = "movement"
+        self.game_started = True
+        game.show_screen("game")
+        return True
 
     def load_campaign_level(self):
         if self.campaign and self.current_level_idx < len(self.campaign["levels"]):
@@ -663,111 +699,109 @@ class GameScreen:
             return False
         transition = self.campaign["levels"][self.current_level_idx].get("transition_to_next")
         if not transition:  # Final level, assume defeat all enemies
-            return len([u for u in self.hex_grid.units if u.allegiance == "Hostile"]) == 0
+            return self.hex_grid.units.count("Hostile") == 0
         if "Defeat Boss" in transition:
             boss_name = transition.split("'")[1] if "'" in transition else None
             if boss_name:
-                return not any(u.name == boss_name and u.allegiance == "Hostile" for u in self.hex_grid.units)
+                return not any(u.name == boss_name for u in self.hex_grid.units.of_allegiance("Hostile"))
         elif "Collect" in transition:
             item_name = transition.split("'")[1] if "'" in transition else None
             if item_name:
-                return any(card.get_current_data().get("Name") == item_name for card in game.player.inventory)
-        return len([u for u in self.hex_grid.units if u.allegiance == "Hostile"]) == 0
+                return game.player.inventory.has_named(item_name)
+        return self.hex_grid.units.count("Hostile") == 0
+
+    def set_phase(self, phase):
+        self.turn_phase = phase
+        self.recorder.record_phase(phase, self.turn_engine.fast_ai)
 
     def advance_turn(self):
         if self.turn_phase == "player":
             game.player.movement_used = game.player.action_used = False
-            self.turn_phase = "allied"
+            self.set_phase("allied")
             self.execute_turn("Allied")
         elif self.turn_phase == "allied":
-            self.turn_phase = "neutral"
+            self.set_phase("neutral")
             self.execute_turn("Neutral")
         elif self.turn_phase == "neutral":
-            self.turn_phase = "hostile"
+            self.set_phase("hostile")
             self.execute_turn("Hostile")
         elif self.turn_phase == "hostile":
             if self.check_level_completion():
                 self.current_level_idx += 1
                 if self.campaign and self.current_level_idx < len(self.campaign["levels"]):
                     self.load_campaign_level()
-                    self.turn_phase = "player"
+                    self.set_phase("player")
                     self.is_player_turn = True
+                    self.autosaver.request(savegame.AUTOSAVE_FILE, self, game.player)
                 else:
                     self.add_to_log("Campaign Completed!")
-                    game.current_screen = "main_menu"
-                    main_menu.initialize_buttons()
+                    game.show_screen("main_menu")
             else:
-                self.turn_phase = "player"
+                self.set_phase("player")
                 self.is_player_turn = True
+                self.autosaver.request(savegame.AUTOSAVE_FILE, self, game.player)
         self.update_turn_label()
-        self.animating = self.check_animations()
+        self.animating = self.hex_grid.animations.busy
 
     def execute_turn(self, allegiance):
-        units_to_process = [unit for unit in self.hex_grid.units if unit.allegiance == allegiance]
-        for unit in units_to_process[:]:
-            for entry in unit.take_turn(self.hex_grid):
-                self.add_to_log(entry)
-            if isinstance(self.hex_grid.player, Player) and self.hex_grid.player.hp <= 0:
-                self.add_to_log("Player defeated!")
-                return  # Exit early; game over handled in draw()
-            if unit.states == 2 and unit.hp < unit.max_hp * 0.3:
-                switch_msg = unit.switch_state()
-                if switch_msg:
-                    self.add_to_log(switch_msg)
-            if unit.hp <= 0:
-                self.hex_grid.grid[unit.position[0]][unit.position[1]]["unit"] = None
-                self.hex_grid.units.remove(unit)
-                self.add_to_log(f"{unit.name} defeated")
-                self.card_manager.track_card_usage(unit.card_id, {"action": "defeated", "screen": "game"})
-        self.player_info_label.set_text(self.get_player_info())
-        self.animating = self.check_animations()
-
-    def initialize_screen(self):
-        manager.clear_and_reset()
+        # Units act one at a time over the following frames; see TurnEngine and draw()
+        self.turn_engine.start_phase(self.hex_grid, allegiance)
+
+    def resolve_unit(self, unit, log_entries):
+        for entry in log_entries:
+            self.add_to_log(entry)
+        if isinstance(self.hex_grid.player, Player) and self.hex_grid.player.hp <= 0:
+            self.add_to_log("Player defeated!")
+            return False  # End the phase; game over handled in draw()
+        switch_msg, defeated = combat.settle_unit(self.hex_grid, unit)
+        if switch_msg:
+            self.add_to_log(switch_msg)
+        if defeated:
+            self.add_to_log(f"{unit.name} defeated")
+            self.card_manager.track_card_usage(unit.card_id, {"action": "defeated", "screen": "game"})
+        if log_entries:
+            self.update_player_info()
+        return True
+
+    def build(self, container):
         self.ui_elements = [
             UITextBox("<font color='#FFFFFF' size=4>Game Log</font>", 
                       pygame.Rect((WINDOW_WIDTH - 600) // 2, WINDOW_HEIGHT - 150, 600, 140), 
-                      manager, object_id="#log_textbox"),
+                      manager, container=container, object_id="#log_textbox"),
             UITextBox("<font color='#FFFFFF' size=4>Stats</font>", 
                       pygame.Rect(WINDOW_WIDTH - 300, WINDOW_HEIGHT - 175, 290, 175), 
-                      manager, object_id="#stats_panel", visible=False),
+                      manager, container=container, object_id="#stats_panel", visible=False),
             UITextBox("<font color='#FFFFFF' size=4>Player's Turn</font>", 
                       pygame.Rect((WINDOW_WIDTH - 200) // 2, 10, 200, 30), 
-                      manager, object_id="#turn_label")
+                      manager, container=container, object_id="#turn_label")
         ]
         
         left_panel_width = WINDOW_WIDTH // 4
         button_width = (left_panel_width - 20) // 2
-        self.player_info_label = UITextBox(
-            f"<font color='#FFFFFF'>{self.get_player_info().replace('\n', '<br>')}</font>",
-            pygame.Rect(10, 0, button_width + 10, 188),
-            manager
-        )
+        self.player_info_label = UITextBox("", pygame.Rect(10, 0, button_width + 10, 188), manager, container=container)
         self.ui_elements.append(self.player_info_label)
         
+        # Every class has a projectile and a melee attack plus its special; refresh() labels them
         y_pos = 200
-        attacks_list = list(game.player.attacks.values())
-        self.left_panel_buttons = [
-            UIButton(pygame.Rect(10, y_pos + 40 * i, button_width, 30), 
-                     f"{attack['name']} ({attack['damage']} dmg)", manager) 
-            for i, attack in enumerate(attacks_list)
-        ]
+        self.attack_buttons = [UIButton(pygame.Rect(10, y_pos + 40 * i, button_width, 30), "", manager, container=container)
+                               for i in range(3)]
+        self.left_panel_buttons = list(self.attack_buttons)
         y_pos += 40 * len(self.left_panel_buttons) + 40
-        self.movement_toggle_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "Movement", manager)
+        self.movement_toggle_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "Movement", manager, container=container)
         self.left_panel_buttons.append(self.movement_toggle_button)
         y_pos += 40
-        self.crafting_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "Crafting", manager)
+        self.crafting_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "Crafting", manager, container=container)
         self.left_panel_buttons.append(self.crafting_button)
         y_pos += 40
-        self.inventory_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "Inventory", manager)
+        self.inventory_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "Inventory", manager, container=container)
         self.left_panel_buttons.append(self.inventory_button)
         
         # Move "Draw Card" and "End Turn" below Inventory, with spacing
         y_pos += 60  # Add extra spacing to avoid overlap
-        self.draw_card_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "Draw Card", manager)
+        self.draw_card_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "Draw Card", manager, container=container)
         self.left_panel_buttons.append(self.draw_card_button)
         y_pos += 40
-        self.end_turn_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "End Turn", manager)
+        self.end_turn_button = UIButton(pygame.Rect(10, y_pos, button_width, 30), "End Turn", manager, container=container)
         self.left_panel_buttons.append(self.end_turn_button)
         
         self.ui_elements.extend(self.left_panel_buttons)
@@ -776,17 +810,32 @@ class GameScreen:
         right_button_width = 150
         right_panel_x = WINDOW_WIDTH - right_button_width - 10
         y_pos = 60
-        right_controls = ["Main Menu", "Restart Match", "Settings"]
+        right_controls = ["Main Menu", "Restart Match", "Settings", "Save Game"]
         self.right_panel_buttons = [
-            UIButton(pygame.Rect(right_panel_x, y_pos + 40 * i, right_button_width, 30), control, manager) 
+            UIButton(pygame.Rect(right_panel_x, y_pos + 40 * i, right_button_width, 30), control, manager, container=container) 
             for i, control in enumerate(right_controls)
         ]
         self.ui_elements.extend(self.right_panel_buttons)
-        
-        self.ui_elements[0].set_text("<font color='#FFFFFF' size=4>" + "<br>".join(self.log) + "</font>")
+        self.log.attach(self.ui_elements[0])
+
+    def refresh(self):
+        """Update what the game screen shows of the player and the turn (after a new game, a load or another screen)."""
+        labels = [f"{attack['name']} ({attack['damage']} dmg)" for attack in game.player.attacks.values()]
+        labels.append(f"{game.player.special_attack} (special)")
+        for button, label in zip(self.attack_buttons, labels):
+            if button.text != label:
+                button.set_text(label)
+        self.update_player_info()
+        self.crafting_badge_version = None
+        self.update_crafting_badge()
         self.update_turn_label()
         self.show_stats(None)
 
+    def update_player_info(self):
+        text = f"<font color='#FFFFFF'>{self.get_player_info().replace('\n', '<br>')}</font>"
+        if self.player_info_label.html_text != text:
+            self.player_info_label.set_text(text)
+
     def get_player_info(self):
         p = game.player
         pos = p.position
@@ -795,11 +844,7 @@ class GameScreen:
         return f"Class: {p.class_name}\nHP: {p.hp}/{p.max_hp}\nMovement: {p.movement}\nRange: {p.projectile_range}\nPosition: ({pos[0]}, {pos[1]})\nMelee: {melee}\nProj: {proj}"
 
     def add_to_log(self, message):
-        if message:
-            self.log.append(message)
-            if len(self.log) > 10:
-                self.log.pop(0)
-            self.ui_elements[0].set_text("<font color='#FFFFFF' size=4>" + "<br>".join(self.log) + "</font>")
+        self.log.append(message)  # Shown on the next draw(), together with the rest of the frame's messages
 
     def show_stats(self, unit):
         if unit:
@@ -808,21 +853,24 @@ class GameScreen:
         else:
             self.ui_elements[1].hide()
 
+    def update_crafting_badge(self):
+        """Show how many items are craftable right now on the Crafting button."""
+        index = game.player.crafting_index
+        if self.crafting_badge_version != index.version:
+            self.crafting_badge_version = index.version
+            self.crafting_button.set_text(f"Crafting ({len(index)})" if len(index) else "Crafting")
+
     def update_turn_label(self):
         phases = {"player": "Player's Turn", "allied": "Allied Turn", "neutral": "Neutral Turn", "hostile": "Enemies' Turn"}
         self.ui_elements[2].set_text(f"<font color='#FFFFFF' size=4>{phases[self.turn_phase]}</font>")
 
-    def check_animations(self):
-        animating = False
-        if self.hex_grid.player and self.hex_grid.player.animating:
-            self.hex_grid.player.update_animation(self.hex_grid)  # Pass grid
-            animating = True
+    def check_animations(self, time_delta):
+        self.hex_grid.animations.update(time_delta)
+        if self.hex_grid.player:
+            self.hex_grid.player.update_animation(self.hex_grid)  # Flash and damage text timers
         for unit in self.hex_grid.units:
-            if unit.animating:
-                unit.update_animation(self.hex_grid)  # Pass grid
-                animating = True
-            unit.update_animation(self.hex_grid)  # Pass grid for damage text
-        return animating
+            unit.update_animation(self.hex_grid)
+        return self.hex_grid.animations.busy
 
     def handle_event(self, event):
         if self.animating:
@@ -835,23 +883,26 @@ class GameScreen:
                 unit = self.hex_grid.grid[hex_pos[0]][hex_pos[1]]["unit"]
                 self.show_stats(unit)
                 if self.player_mode == "attack" and self.selected_attack and unit and isinstance(unit, Unit):
-                    message, defeated = game.player.attack(unit, self.selected_attack, self.hex_grid)
-                    self.add_to_log(message)
-                    if message:
-                        unit.attack_flash = True
-                        unit.flash_start = pygame.time.get_ticks()
-                        if defeated:
-                            self.hex_grid.grid[hex_pos[0]][hex_pos[1]]["unit"] = None
-                            self.hex_grid.units.remove(unit)
-                            self.add_to_log(f"{unit.name} defeated")
-                            self.card_manager.track_card_usage(unit.card_id, {"action": "defeated", "screen": "game"})
-                            self.show_stats(None)
-                        self.player_info_label.set_text(self.get_player_info())
+                    events = game.player.attack(unit, self.selected_attack, self.hex_grid)
+                    for result in events:
+                        if result.kind == combat.HIT:
+                            self.add_to_log(result.message)
+                            result.target.attack_flash = True
+                            result.target.flash_start = pygame.time.get_ticks()
+                        elif result.kind == combat.DEFEATED:
+                            target = result.target
+                            combat.remove_defeated(self.hex_grid, target)
+                            self.add_to_log(result.message)
+                            self.card_manager.track_card_usage(target.card_id, {"action": "defeated", "screen": "game"})
+                            if target is unit:
+                                self.show_stats(None)
+                    if combat.hit_messages(events):
+                        self.update_player_info()
                         self.selected_attack = None
                 elif self.player_mode == "movement" and not game.player.movement_used and not unit:
                     path = self.hex_grid.find_path(game.player.position, hex_pos)
                     if path and len(path) - 1 <= game.player.movement:
-                        success, msg = self.hex_grid.move_unit(game.player, *hex_pos)
+                        success, msg = self.hex_grid.move_unit(game.player, *hex_pos, path=path)
                         if success:
                             self.add_to_log(msg)
                             game.player.movement_used = True
@@ -872,19 +923,19 @@ class GameScreen:
                                             player_start = self.hex_grid.player.position
                                             game.player.teleport(self.hex_grid, *player_start)
                                             # Teleport allied NPCs
-                                            allied_units = [u for u in self.hex_grid.units if u.allegiance == "Allied"]
+                                            allied_units = self.hex_grid.units.of_allegiance("Allied")
                                             for i, ally in enumerate(allied_units):
                                                 neighbors = self.hex_grid.get_neighbors(*player_start)
                                                 if i < len(neighbors):
                                                     ally.teleport(self.hex_grid, *neighbors[i])
-                                            self.initialize_screen()
+                                            self.refresh()
                                             game.player.movement_used = False
                                             game.player.action_used = False
                                             break
                                         else:
                                             self.add_to_log(f"Linked level file not found: {hex_data['linked_level']}")
                                     break  # Exit loop after handling this hex
-                            self.player_info_label.set_text(self.get_player_info())
+                            self.update_player_info()
                     else:
                         self.add_to_log("No valid path within movement range")
             elif event.button == 3 and hex_pos:
@@ -938,12 +989,10 @@ class GameScreen:
         elif event.type == pygame_gui.UI_BUTTON_PRESSED:
             if event.ui_element in self.left_panel_buttons:
                 text = event.ui_element.text
-                if text == "Crafting" and self.turn_phase == "player":
-                    game.current_screen = "crafting"
-                    crafting_screen.initialize_screen()
+                if event.ui_element == self.crafting_button and self.turn_phase == "player":
+                    game.show_screen("crafting")
                 elif text == "Inventory" and self.turn_phase == "player":
-                    game.current_screen = "inventory"
-                    inventory_screen.initialize_screen()
+                    game.show_screen("inventory")
                 elif text == "Movement" and self.turn_phase == "player":
                     self.player_mode = "movement"
                     self.selected_attack = None
@@ -957,7 +1006,7 @@ class GameScreen:
                     self.advance_turn()
                 elif self.turn_phase == "player":
                     attack_text = text.split(' (')[0]
-                    if attack_text in [game.player.attacks["projectile"]["name"], game.player.attacks["melee"]["name"]]:
+                    if game.player.attack_kind(attack_text):
                         self.selected_attack = attack_text
                         self.player_mode = "attack"
                         self.hex_grid.selected_hex = None
@@ -965,53 +1014,64 @@ class GameScreen:
             elif event.ui_element in self.right_panel_buttons:
                 text = event.ui_element.text
                 if text == "Main Menu":
-                    game.current_screen = "main_menu"
-                    main_menu.initialize_buttons()
+                    game.show_screen("main_menu")
                 elif text == "Restart Match":
-                    game.current_screen = "character_creation"
-                    character_creation_screen.initialize_screen()
+                    game.show_screen("character_creation")
                 elif text == "Settings":
-                    game.current_screen = "game_settings"
-                    game_settings_screen.initialize_screen()
+                    game.show_screen("game_settings")
+                elif text == "Save Game" and self.turn_phase == "player":
+                    self.autosaver.request(savegame.QUICKSAVE_FILE, self, game.player)
+                    self.add_to_log("Game saved")
 
     def draw(self):
         screen.fill(DARK_INDIGO)
-        movement_range = self.hex_grid.get_valid_moves(game.player.position, game.player.movement) if self.turn_phase == "player" and self.player_mode == "movement" and not game.player.movement_used else None
-        attack_range = (
-            self.hex_grid.get_attack_range(game.player.position, game.player.projectile_range, is_projectile=True) 
-            if self.selected_attack == game.player.attacks["projectile"]["name"] and self.turn_phase == "player" and not game.player.action_used 
-            else self.hex_grid.get_attack_range(game.player.position, 1, is_projectile=False) 
-            if self.selected_attack == game.player.attacks["melee"]["name"] and self.turn_phase == "player" and not game.player.action_used 
-            else None
-        )
-        self.hex_grid.draw(screen, movement_range, attack_range, self.colors)
+        self.log.refresh()
+        self.update_crafting_badge()
+        with PROFILER.section("ranges"):
+            movement_range = self.hex_grid.get_valid_moves(game.player.position, game.player.movement) if self.turn_phase == "player" and self.player_mode == "movement" and not game.player.movement_used else None
+            attack_kind = game.player.attack_kind(self.selected_attack) if self.turn_phase == "player" and not game.player.action_used else None
+            attack_range = game.player.get_attack_range(attack_kind, self.hex_grid) if attack_kind else None
+        with PROFILER.section("board"):
+            self.hex_grid.draw(screen, movement_range, attack_range, self.colors)
         for rect in (self.ui_elements[0].rect, self.ui_elements[1].rect if self.ui_elements[1].visible else None, self.ui_elements[2].rect):
             if rect:
                 pygame.draw.rect(screen, GRAY, rect)
-        manager.draw_ui(screen)
-        self.animating = self.check_animations()
-        if not self.animating and self.turn_phase != "player":
+        with PROFILER.section("draw_ui"):
+            manager.draw_ui(screen)
+        with PROFILER.section("animations"):
+            self.animating = self.check_animations(clock.get_time() / 1000.0)
+        if self.turn_engine.busy:
+            with PROFILER.section("ai"):
+                self.turn_engine.update()
+        elif not self.animating and self.turn_phase != "player":
             self.advance_turn()
         if self.hex_grid.game_over:
-            game.current_screen = "defeat"
-            defeat_screen.initialize_screen()
+            game.show_screen("defeat")
 
 # Game Settings screen
 class GameSettingsScreen:
     def __init__(self):
         self.ui_elements = []
 
-    def initialize_screen(self):
-        manager.clear_and_reset()
+    def build(self, container):
         self.ui_elements = [
-            UILabel(pygame.Rect(0, 50, WINDOW_WIDTH, 50), "Settings", manager, anchors={'centerx': 'centerx'}),
-            UIButton(pygame.Rect(20, 20, 150, 50), "Return to Game", manager)
+            UILabel(pygame.Rect(0, 50, WINDOW_WIDTH, 50), "Settings", manager, container=container, anchors={'centerx': 'centerx'}),
+            UIButton(pygame.Rect(20, 20, 150, 50), "Return to Game", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, 150, 200, 50), self.fast_ai_text(), manager, container=container)
         ]
 
+    def refresh(self):
+        self.ui_elements[2].set_text(self.fast_ai_text())
+
+    def fast_ai_text(self):
+        return f"Fast AI: {'On' if game_screen.turn_engine.fast_ai else 'Off'}"
+
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED and event.ui_element == self.ui_elements[1]:
-            game.current_screen = "game"
-            game_screen.initialize_screen()
+            game.show_screen("game")
+        elif event.type == pygame_gui.UI_BUTTON_PRESSED and event.ui_element == self.ui_elements[2]:
+            game_screen.turn_engine.fast_ai = not game_screen.turn_engine.fast_ai
+            self.ui_elements[2].set_text(self.fast_ai_text())
 
     def draw(self):
         screen.fill(DARK_INDIGO)
@@ -1028,53 +1088,115 @@ class DefeatScreen:
             "You’ve been sent to the respawn realm!"
         ]
 
-    def initialize_screen(self):
-        manager.clear_and_reset()
-        message = random.choice(self.humorous_messages)
+    def build(self, container):
         self.ui_elements = [
-            UILabel(pygame.Rect(0, WINDOW_HEIGHT // 4, WINDOW_WIDTH, 50), message, manager, anchors={'centerx': 'centerx'}),
-            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, WINDOW_HEIGHT // 2, 200, 50), "Restart Level", manager),
-            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, WINDOW_HEIGHT // 2 + 70, 200, 50), "Main Menu", manager)
+            UILabel(pygame.Rect(0, WINDOW_HEIGHT // 4, WINDOW_WIDTH, 50), "", manager, container=container, anchors={'centerx': 'centerx'}),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, WINDOW_HEIGHT // 2, 200, 50), "Restart Level", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, WINDOW_HEIGHT // 2 + 70, 200, 50), "Main Menu", manager, container=container),
+            UIButton(pygame.Rect((WINDOW_WIDTH - 200) // 2, WINDOW_HEIGHT // 2 + 140, 200, 50), "Watch Final Moment", manager, container=container)
         ]
 
+    def refresh(self):
+        self.ui_elements[0].set_text(random.choice(self.humorous_messages))
+        if game_screen.recorder:
+            try:
+                game_screen.recorder.save()
+            except Exception as e:
+                print(f"Error saving replay: {e}")
+
     def handle_event(self, event):
         if event.type == pygame_gui.UI_BUTTON_PRESSED:
             if event.ui_element == self.ui_elements[1]:  # Restart Level
-                game.current_screen = "game"
                 game_screen.start_new_game(level_file=game_screen.current_level_file, 
                                            campaign_file=game_screen.campaign_file if game_screen.campaign else None)
-                game_screen.initialize_screen()
             elif event.ui_element == self.ui_elements[2]:  # Main Menu
-                game.current_screen = "main_menu"
-                main_menu.initialize_buttons()
+                game.show_screen("main_menu")
+            elif event.ui_element == self.ui_elements[3] and game_screen.recorder:  # Watch Final Moment
+                game.show_screen("replay", replay_data=game_screen.recorder.to_data(), final_moment=True)
 
     def draw(self):
         screen.fill(DARK_INDIGO)
         manager.draw_ui(screen)
 
+# ReplayScreen class
+class ReplayScreen:
+    def __init__(self):
+        self.ui_elements = []
+        self.replay_player = None
+        self.status_label = None
+
+    def build(self, container):
+        controls = ["Back", "Restart", "Slower", "Faster", "Next Turn", "Final Moment"]
+        self.ui_elements = [
+            UIButton(pygame.Rect(10, 10 + 40 * i, 150, 30), control, manager, container=container)
+            for i, control in enumerate(controls)
+        ]
+        self.status_label = UITextBox("", pygame.Rect((WINDOW_WIDTH - 400) // 2, 10, 400, 30), manager, container=container)
+        self.ui_elements.append(self.status_label)
+
+    def refresh(self, replay_data, final_moment=False):
+        self.replay_player = replay.ReplayPlayer(replay_data, WINDOW_WIDTH, WINDOW_HEIGHT)
+        if final_moment:
+            self.replay_player.seek_final_moment()
+
+    def handle_event(self, event):
+        if event.type == pygame_gui.UI_BUTTON_PRESSED:
+            text = event.ui_element.text
+            if text == "Back":
+                game.show_screen("main_menu")
+            elif text == "Restart":
+                self.replay_player.reset()
+                self.replay_player.speed = 1.0
+            elif text == "Slower":
+                self.replay_player.speed = max(0.125, self.replay_player.speed / 2)
+            elif text == "Faster":
+                self.replay_player.speed = min(16.0, self.replay_player.speed * 2)
+            elif text == "Next Turn":
+                self.replay_player.seek_turn(self.replay_player.turn + 1)
+            elif text == "Final Moment":
+                self.replay_player.seek_final_moment()
+
+    def draw(self):
+        screen.fill(DARK_INDIGO)
+        self.replay_player.update(clock.get_time())
+        self.replay_player.grid.draw(screen, colors=game_screen.colors)
+        status = f"Turn {self.replay_player.turn} ({self.replay_player.phase}) - {self.replay_player.speed:g}x"
+        if self.replay_player.finished:
+            status += " - End"
+        if self.status_label.html_text != status:
+            self.status_label.set_text(status)
+        manager.draw_ui(screen)
+
 # Main Game class
 class Game:
     def __init__(self):
-        self.current_screen = "main_menu"
         self.player = None
         self.card_manager = CardManager()
-        self.screens = {
-            "main_menu": main_menu,
-            "character_creation": character_creation_screen,
-            "settings": settings_screen,
-            "game": game_screen,
-            "game_settings": game_settings_screen,
-            "crafting": crafting_screen,
-            "inventory": inventory_screen,
-            "defeat": defeat_screen
-        }
+        self.screens = ScreenManager(manager, pygame.Rect(0, 0, WINDOW_WIDTH, WINDOW_HEIGHT))
+        self.screens.register("main_menu", main_menu)
+        self.screens.register("character_creation", character_creation_screen)
+        self.screens.register("settings", settings_screen)
+        self.screens.register("game", game_screen)
+        self.screens.register("game_settings", game_settings_screen)
+        self.screens.register("crafting", crafting_screen)
+        self.screens.register("inventory", inventory_screen)
+        self.screens.register("defeat", defeat_screen)
+        self.screens.register("replay", replay_screen)
         game_screen.set_card_manager(self.card_manager)
 
+    @property
+    def current_screen(self):
+        return self.screens.current
+
+    def show_screen(self, name, **kwargs):
+        """Switch screens; the screen's UI is built the first time and kept after that."""
+        self.screens.show(name, **kwargs)
+
     def handle_event(self, event):
-        self.screens[self.current_screen].handle_event(event)
+        self.screens.active().handle_event(event)
 
     def draw(self):
-        self.screens[self.current_screen].draw()
+        self.screens.active().draw()
 
 # Instantiate screens and game
 main_menu = MainMenu()
@@ -1085,20 +1207,35 @@ game_settings_screen = GameSettingsScreen()
 crafting_screen = CraftingScreen()
 inventory_screen = InventoryScreen()
 defeat_screen = DefeatScreen()
+replay_screen = ReplayScreen()
 game = Game()
+game.show_screen("main_menu")
 
 # Main game loop
-clock = pygame.time.Clock()
+session = ProfileSession("JunkRPG34")  # --profile / --record-input / --replay-input
+clock = session.clock()
+if session.scripted:
+    # Scripted input is keyed by frame, so the AI must not spread its work over frames by wall-clock time,
+    # neither while recording nor while replaying
+    game_screen.turn_engine.budget_ms = None
 running = True
 while running:
     time_delta = clock.tick(60) / 1000.0
-    for e in event.get():
-        if e.type == pygame.QUIT or (e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE):
-            running = False
-        game.handle_event(e)
-        manager.process_events(e)
-    manager.update(time_delta)
-    game.draw()
+    PROFILER.begin_frame()
+    with PROFILER.section("events"):
+        for e in session.events():
+            if e.type == pygame.QUIT or (e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE):
+                running = False
+            if PROFILER.handle_event(e):
+                continue
+            game.handle_event(e)
+            manager.process_events(e)
+    with PROFILER.section("ui_update"):
+        manager.update(time_delta)
+    with PROFILER.section("screen"):
+        game.draw()
+    PROFILER.end_frame()
+    PROFILER.draw(screen)
     display.flip()
 
 pygame.quit()
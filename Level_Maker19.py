@@ -8,6 +8,9 @@ import os
 import json
 import tkinter as tk
 from tkinter import filedialog
+import chunked_map
+import index_store
+from profile_session import ProfileSession
 
 # Initialize Pygame
 pygame.init()
@@ -234,8 +237,7 @@ class LevelEditor:
             self.status_label.set_text("Card index not found. Run Card Maker first.")
             return
         try:
-            with open(index_file, 'r') as f:
-                index = json.load(f)
+            index = index_store.read_index(index_file)
             self.unit_cards = {
                 "Enemy": [(card_id, info['name']) for card_id, info in index.items() if info['type'] == "Enemy Card"],
                 "Boss": [(card_id, info['name']) for card_id, info in index.items() if info['type'] == "Boss Card"],
@@ -295,6 +297,8 @@ class LevelEditor:
                                     text="Load Level", manager=manager)
         self.exit_button = UIButton(relative_rect=pygame.Rect(230, WINDOW_HEIGHT - 40, 100, 30), 
                                     text="Exit", manager=manager)
+        self.export_chunked_button = UIButton(relative_rect=pygame.Rect(340, WINDOW_HEIGHT - 40, 130, 30), 
+                                              text="Export Chunked", manager=manager)
         self.info_label = UILabel(relative_rect=pygame.Rect(WINDOW_WIDTH - 200, 310, 190, 30), 
                                   text="No hex selected", manager=manager)
         self.status_label = UILabel(relative_rect=pygame.Rect(10, WINDOW_HEIGHT - 70, 300, 30), 
@@ -314,8 +318,7 @@ class LevelEditor:
                     elif hex_data["deck_file"]:
                         deck_name = self.filename_to_deck_data.get(hex_data["deck_file"], {}).get("deck_name", "Unknown")
                         if hex_data["card_id"]:
-                            with open(os.path.join("cards", "card_index.json"), 'r') as f:
-                                index = json.load(f)
+                            index = index_store.read_index()
                             card_name = index.get(hex_data["card_id"], {}).get("name", "Unknown")
                             text += f", Card={card_name}"
                         else:
@@ -337,8 +340,7 @@ class LevelEditor:
                     deck_data = self.filename_to_deck_data[filename]
                     card_ids = deck_data["cards"]
                     card_names = []
-                    with open(os.path.join("cards", "card_index.json"), 'r') as f:
-                        index = json.load(f)
+                    index = index_store.read_index()
                     for card_id in card_ids:
                         card_names.append(index.get(card_id, {}).get("name", "Unknown"))
                     self.card_list.set_item_list(card_names or ["No cards in deck"])
@@ -429,8 +431,7 @@ class LevelEditor:
                     for _, filename in self.deck_files:
                         if self.filename_to_deck_data[filename]["deck_name"] == selected_deck:
                             deck_data = self.filename_to_deck_data[filename]
-                            with open(os.path.join("cards", "card_index.json"), 'r') as f:
-                                index = json.load(f)
+                            index = index_store.read_index()
                             card_id = next((cid for cid in deck_data["cards"] 
                                           if index.get(cid, {}).get("name") == selected_card), None)
                             if card_id:
@@ -518,6 +519,8 @@ class LevelEditor:
                         self.status_label.set_text("No card selected")
             elif event.ui_element == self.save_button:
                 self.save_level()
+            elif event.ui_element == self.export_chunked_button:
+                self.export_chunked()
             elif event.ui_element == self.load_button:
                 self.load_level()
             elif event.ui_element == self.exit_button:
@@ -530,6 +533,32 @@ class LevelEditor:
         elif event.type == pygame_gui.UI_SELECTION_LIST_NEW_SELECTION and event.ui_element == self.deck_list:
             self.update_card_list()
 
+    def build_level_data(self):
+        inaccessible_hexes = [{"row": r, "column": c} for r in range(self.grid.rows) 
+                              for c in range(self.grid.cols) if not self.accessible[r][c]]
+        return {
+            "grid": {"rows": self.grid.rows, "columns": self.grid.cols},
+            "player_start": {"row": self.player_start[0], "column": self.player_start[1]} if self.player_start else None,
+            "terrain": self.terrain,
+            "inaccessible_hexes": inaccessible_hexes,
+            "units": [{"card_id": u["card_id"], "position": {"row": u["position"][0], "column": u["position"][1]}} 
+                     for u in self.units],
+            "card_drawing_hexes": self.card_drawing_hexes
+        }
+
+    def export_chunked(self):
+        """Write the level as a chunked world directory (levels/<name>/world.json + chunks/) for large maps."""
+        root = tk.Tk()
+        root.withdraw()
+        world_dir = filedialog.askdirectory(initialdir="levels", mustexist=False)
+        root.destroy()
+        if world_dir:
+            try:
+                chunked_map.split_level(self.build_level_data(), world_dir)
+                self.status_label.set_text(f"Exported world to {os.path.basename(world_dir)}")
+            except Exception as e:
+                self.status_label.set_text(f"Error exporting world: {e}")
+
     def save_level(self):
         root = tk.Tk()
         root.withdraw()
@@ -538,17 +567,7 @@ class LevelEditor:
                                                 filetypes=[("JSON files", "*.json")])
         root.destroy()
         if file_path:
-            inaccessible_hexes = [{"row": r, "column": c} for r in range(self.grid.rows) 
-                                  for c in range(self.grid.cols) if not self.accessible[r][c]]
-            level_data = {
-                "grid": {"rows": self.grid.rows, "columns": self.grid.cols},
-                "player_start": {"row": self.player_start[0], "column": self.player_start[1]} if self.player_start else None,
-                "terrain": self.terrain,
-                "inaccessible_hexes": inaccessible_hexes,
-                "units": [{"card_id": u["card_id"], "position": {"row": u["position"][0], "column": u["position"][1]}} 
-                         for u in self.units],
-                "card_drawing_hexes": self.card_drawing_hexes
-            }
+            level_data = self.build_level_data()
             try:
                 with open(file_path, 'w') as f:
                     json.dump(level_data, f, indent=2)
@@ -566,6 +585,9 @@ class LevelEditor:
             try:
                 with open(file_path, 'r') as f:
                     level_data = json.load(f)
+                if level_data.get("chunked"):
+                    # Chunked worlds are edited as one dense grid and re-exported
+                    level_data = chunked_map.merge_world(os.path.dirname(file_path))
                 rows = level_data["grid"]["rows"]
                 cols = level_data["grid"]["columns"]
                 self.grid = EditorHexGrid(rows, cols, 30, WINDOW_WIDTH, WINDOW_HEIGHT)
@@ -597,11 +619,12 @@ class LevelEditor:
 
 # Main loop
 editor = LevelEditor()
-clock = pygame.time.Clock()
+session = ProfileSession("Level_Maker19")  # --profile / --record-input / --replay-input
+clock = session.clock()
 running = True
 while running:
     time_delta = clock.tick(60) / 1000.0
-    for e in event.get():
+    for e in session.events():
         if e.type == pygame.QUIT or (e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE):
             running = False
         # Process UI events first, then pass to editor
@@ -0,0 +1,138 @@
+from array import array
+
+# Movement speed in hexes per second, independent of frame rate and zoom
+MOVE_SPEED = 6.0
+
+# Tween slot states
+FREE = 0
+PAUSED = 1
+RUNNING = 2
+
+
+class AnimationManager:
+    """Shared queue of movement tweens for every unit on a HexGrid.
+
+    Tweens live in parallel arrays indexed by slot (elapsed/duration as doubles, a
+    state byte, the unit and its path), and freed slots are reused. A tween follows
+    its path hex by hex, so units walk the route find_path returned instead of
+    sliding in a straight line. Positions are kept in grid space and converted to
+    pixels every update, so panning or zooming mid-move stays correct.
+
+    update(time_delta) advances every running tween and returns the
+    (tween_id, unit) pairs that finished this frame; the same pairs are passed to
+    any listeners registered with add_listener().
+    """
+    def __init__(self, grid, speed=MOVE_SPEED):
+        self.grid = grid
+        self.speed = speed
+        self.autostart = True
+        self.elapsed = array('d')
+        self.duration = array('d')
+        self.state = array('b')
+        self.units = []
+        self.paths = []
+        self.free_slots = []
+        self.by_unit = {}
+        self.listeners = []
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners:
+            self.listeners.remove(callback)
+
+    @property
+    def busy(self):
+        return any(state != FREE for state in self.state)
+
+    def is_active(self, tween_id):
+        return tween_id is not None and tween_id < len(self.state) and self.state[tween_id] != FREE
+
+    def tween_for(self, unit):
+        return self.by_unit.get(unit)
+
+    def move(self, unit, path):
+        """Start (or, with autostart off, queue paused) a tween along path, a list of (row, col) cells."""
+        if unit in self.by_unit:
+            self.finish(self.by_unit[unit], notify=False)
+        path = list(path)
+        if len(path) < 2:
+            return None
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.units[slot] = unit
+            self.paths[slot] = path
+            self.elapsed[slot] = 0.0
+            self.duration[slot] = (len(path) - 1) / self.speed
+        else:
+            slot = len(self.state)
+            self.units.append(unit)
+            self.paths.append(path)
+            self.elapsed.append(0.0)
+            self.duration.append((len(path) - 1) / self.speed)
+            self.state.append(FREE)
+        self.state[slot] = RUNNING if self.autostart else PAUSED
+        self.by_unit[unit] = slot
+        unit.animating = True
+        unit.render_pos = self.grid.get_hex_center(*path[0])
+        return slot
+
+    def start(self, tween_id):
+        if self.is_active(tween_id):
+            self.state[tween_id] = RUNNING
+
+    def finish(self, tween_id, notify=True):
+        unit = self.units[tween_id]
+        self.state[tween_id] = FREE
+        self.units[tween_id] = None
+        self.paths[tween_id] = None
+        self.free_slots.append(tween_id)
+        if self.by_unit.get(unit) == tween_id:
+            del self.by_unit[unit]
+        unit.animating = False
+        unit.render_pos = None
+        if notify:
+            for listener in list(self.listeners):
+                listener(tween_id, unit)
+
+    def cancel_unit(self, unit):
+        """Drop a unit's tween without notifying listeners (teleports, removals)."""
+        if unit in self.by_unit:
+            self.finish(self.by_unit[unit], notify=False)
+
+    def finish_all(self):
+        completed = [(slot, self.units[slot]) for slot in range(len(self.state)) if self.state[slot] != FREE]
+        for slot, _ in completed:
+            self.finish(slot)
+        return completed
+
+    def cancel_all(self):
+        for slot in range(len(self.state)):
+            if self.state[slot] != FREE:
+                self.finish(slot, notify=False)
+
+    def update(self, time_delta):
+        completed = []
+        for slot in range(len(self.state)):
+            if self.state[slot] != RUNNING:
+                if self.state[slot] == PAUSED:
+                    self.place(slot)
+                continue
+            self.elapsed[slot] += time_delta
+            if self.elapsed[slot] >= self.duration[slot]:
+                completed.append((slot, self.units[slot]))
+            else:
+                self.place(slot)
+        for slot, _ in completed:
+            self.finish(slot)
+        return completed
+
+    def place(self, slot):
+        path = self.paths[slot]
+        progress = self.elapsed[slot] * self.speed
+        step = min(int(progress), len(path) - 2)
+        t = progress - step
+        x1, y1 = self.grid.get_hex_center(*path[step])
+        x2, y2 = self.grid.get_hex_center(*path[step + 1])
+        self.units[slot].render_pos = (x1 + (x2 - x1) * t, y1 + (y2 - y1) * t)
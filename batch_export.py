@@ -0,0 +1,403 @@
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+import pygame
+from card_manager import CardManager
+from card_render import file_stamp
+from index_store import read_index
+
+# Headless batch export through a layout saved by CardTemplateMaker (layouts/<name>.json): every
+# card in a deck or matching a filter is drawn with the layout into its own PNG, and the cards are
+# then imposed onto print sheets (3x3 on A4 at 300 DPI by default). Cards and sheets are drawn on a
+# process pool once there are enough of them.
+#
+# The export is incremental. exports/<layout>/export_manifest.json remembers the hash of the
+# template (the layout plus the output size) and, per card, the hash of everything its picture
+# depends on (the card file and the stamps of the image files the layout shows). A card is only
+# redrawn when one of those changed or its PNG is missing, and a sheet only when a card on it was.
+#   python batch_export.py <layout> [--deck NAME | --type TYPE] [--where FIELD CONDITION]...
+LAYOUTS_DIR = "layouts"
+DECKS_DIR = "decks"
+CARDS_DIR = "cards"
+EXPORT_DIR = "exports"
+MANIFEST_NAME = "export_manifest.json"
+MANIFEST_VERSION = 1
+RENDER_VERSION = 1  # Bump when the drawing below changes, so existing exports are redrawn
+PARALLEL_THRESHOLD = 16  # Images to draw before a process pool is worth starting
+
+# CardTemplateMaker centres its 300x420 card on a 1920x1080 workspace and saves element positions
+# in workspace coordinates
+TEMPLATE_CARD_SIZE = (300, 420)
+TEMPLATE_CARD_ORIGIN = ((1920 - 300) // 2, (1080 - 420) // 2)
+TK_PIXELS_PER_POINT = 96 / 72  # Tk draws font sizes in points
+CARD_INCHES = (2.5, 3.5)       # Poker size; the template's 5:7
+PAGE_SIZES_MM = {"A4": (210, 297), "Letter": (215.9, 279.4)}
+WHITE = (255, 255, 255)
+BLACK = (0, 0, 0)
+CUT_MARK_GREY = (160, 160, 160)
+
+fonts = {}  # (family, size) -> Font, per process
+
+
+def is_image_field(key):
+    # The template maker's rule for which fields are images
+    return "image" in key.lower() or "file" in key.lower()
+
+
+def load_json_file(path):
+    """JSON from path, allowing the // comments in hand-written deck files."""
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return json.loads(re.sub(r'(?m)\s//[^\n]*$', '', text))
+
+
+def find_file(name, directory):
+    """name itself if it is a file, else <directory>/<name>.json, else the one file in directory starting with name."""
+    if os.path.isfile(name):
+        return name
+    path = os.path.join(directory, f"{name}.json")
+    if os.path.isfile(path):
+        return path
+    matches = sorted(f for f in os.listdir(directory) if f.startswith(name) and f.endswith(".json")) if os.path.isdir(directory) else []
+    if len(matches) == 1:
+        return os.path.join(directory, matches[0])
+    raise FileNotFoundError(f"No single file for '{name}' in {directory}/ ({len(matches)} match)")
+
+
+def load_layout(name):
+    path = find_file(name, LAYOUTS_DIR)
+    layout_data = load_json_file(path)
+    if not isinstance(layout_data.get("layout"), dict):
+        raise ValueError(f"{path} has no 'layout'")
+    return os.path.splitext(os.path.basename(path))[0], layout_data
+
+
+def load_deck(name):
+    """(deck name, card ids) for a deck in decks/."""
+    path = find_file(name, DECKS_DIR)
+    deck = load_json_file(path)
+    return deck.get("deck_name") or os.path.splitext(os.path.basename(path))[0], list(deck.get("cards", []))
+
+
+def select_cards(card_type=None, where=None):
+    """Ids of the indexed cards of card_type whose data matches where ({field: condition}), sorted by name."""
+    index = read_index()
+    manager = CardManager()
+    selected = []
+    for card_id, info in sorted(index.items(), key=lambda item: ((item[1].get("name") or "").lower(), item[0])):
+        if card_type and info["type"] != card_type:
+            continue
+        if where:
+            try:
+                card_data = load_json_file(os.path.join(CARDS_DIR, f"{card_id}.json"))
+            except Exception as e:
+                print(f"Error loading card {card_id}: {e}")
+                continue
+            if not manager._apply_filters(card_data, where):
+                continue
+        selected.append(card_id)
+    return selected
+
+
+def sha1_json(value):
+    return hashlib.sha1(json.dumps(value, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+def template_hash(layout_data, card_size):
+    return sha1_json([RENDER_VERSION, layout_data["layout"], list(card_size)])
+
+
+def card_hash(card_data, layout):
+    """Hash of the card's data and of the image files the layout shows for it."""
+    stamps = {key: file_stamp(str(value)) for key, value in card_data.get("data", {}).items()
+              if key in layout and is_image_field(key) and value}
+    return sha1_json([card_data, stamps])
+
+
+def font(family, size):
+    key = (family, size)
+    if key not in fonts:
+        if not pygame.font.get_init():
+            pygame.font.init()
+        fonts[key] = pygame.font.SysFont(family, size)
+    return fonts[key]
+
+
+def draw_card(card_data, layout, card_size):
+    """The card drawn as CardTemplateMaker previews it with layout, at card_size pixels."""
+    scale = card_size[0] / TEMPLATE_CARD_SIZE[0]
+    surface = pygame.Surface(card_size)
+    surface.fill(WHITE)
+    data = card_data.get("data", {})
+    for key, element in layout.items():
+        if key not in data:
+            continue
+        value = str(data[key])
+        x = round((element['x'] - TEMPLATE_CARD_ORIGIN[0]) * scale)
+        y = round((element['y'] - TEMPLATE_CARD_ORIGIN[1]) * scale)
+        if is_image_field(key):
+            if not os.path.exists(value):
+                continue
+            try:
+                image = pygame.image.load(value)
+                size = (max(1, round(element['width'] * scale)), max(1, round(element['height'] * scale)))
+                # smoothscale (the nearest to the template's LANCZOS) needs 24 or 32 bit pixels
+                resize = pygame.transform.smoothscale if image.get_bitsize() >= 24 else pygame.transform.scale
+                surface.blit(resize(image, size), (x, y))
+                continue
+            except (pygame.error, ValueError):
+                text = f"Image Error: {value}"
+                family, points = "Arial", 12
+        else:
+            text = f"{key}: {value}" if element.get('show_key', True) else value
+            family, points = (element.get('font') or ["Arial", element.get('size', 12)])[:2]
+        text_font = font(family, max(1, round(points * TK_PIXELS_PER_POINT * scale)))
+        for line in text.split("\n"):
+            surface.blit(text_font.render(line, True, BLACK), (x, y))
+            y += text_font.get_linesize()
+    pygame.draw.rect(surface, BLACK, surface.get_rect(), max(1, round(scale)))
+    return surface
+
+
+def save_png(surface, path):
+    # Written beside the target and renamed over it, so an interrupted export never leaves half a PNG
+    tmp = f"{path}.tmp.png"
+    pygame.image.save(surface, tmp)
+    os.replace(tmp, path)
+
+
+def render_card(job):
+    """Draw one card to its PNG; returns an error message or None. Runs in the pool."""
+    card_path, layout, card_size, out_path = job
+    try:
+        save_png(draw_card(load_json_file(card_path), layout, card_size), out_path)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def render_sheet(job):
+    """Impose card PNGs onto one page, row by row, with cut marks; returns an error message or None."""
+    card_paths, page_size, card_size, grid, out_path = job
+    try:
+        page = pygame.Surface(page_size)
+        page.fill(WHITE)
+        columns, rows = grid
+        left = (page_size[0] - columns * card_size[0]) // 2
+        top = (page_size[1] - rows * card_size[1]) // 2
+        for slot, card_path in enumerate(card_paths):
+            page.blit(pygame.image.load(card_path), (left + slot % columns * card_size[0], top + slot // columns * card_size[1]))
+        mark = max(10, card_size[0] // 25)
+        for column in range(columns + 1):
+            x = left + column * card_size[0]
+            pygame.draw.line(page, CUT_MARK_GREY, (x, top - mark * 2), (x, top - mark))
+            pygame.draw.line(page, CUT_MARK_GREY, (x, top + rows * card_size[1] + mark), (x, top + rows * card_size[1] + mark * 2))
+        for row in range(rows + 1):
+            y = top + row * card_size[1]
+            pygame.draw.line(page, CUT_MARK_GREY, (left - mark * 2, y), (left - mark, y))
+            pygame.draw.line(page, CUT_MARK_GREY, (left + columns * card_size[0] + mark, y), (left + columns * card_size[0] + mark * 2, y))
+        save_png(page, out_path)
+        return None
+    except Exception as e:
+        return str(e)
+
+
+def run_jobs(function, jobs, workers=None):
+    if len(jobs) < PARALLEL_THRESHOLD or workers == 1:
+        return [function(job) for job in jobs]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(function, jobs, chunksize=max(1, len(jobs) // 64)))
+    except Exception as e:
+        print(f"Error starting parallel export, exporting serially: {e}")
+        return [function(job) for job in jobs]
+
+
+class ExportReport:
+    """Cards and sheets drawn, skipped as unchanged, or failed (with their reasons) in one export."""
+    def __init__(self):
+        self.rendered = []
+        self.skipped = 0
+        self.failed = {}
+        self.sheets_written = []
+        self.sheets_skipped = 0
+
+    def summary(self):
+        return (f"{len(self.rendered)} cards drawn, {self.skipped} unchanged, {len(self.failed)} failed; "
+                f"{len(self.sheets_written)} sheets drawn, {self.sheets_skipped} unchanged")
+
+    def lines(self):
+        lines = [self.summary()]
+        lines += [f"  ! {card_id}: {error}" for card_id, error in sorted(self.failed.items())]
+        return lines
+
+
+def page_pixels(page, dpi):
+    width_mm, height_mm = PAGE_SIZES_MM[page]
+    return round(width_mm / 25.4 * dpi), round(height_mm / 25.4 * dpi)
+
+
+def load_manifest(path):
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error reading export manifest {path}, exporting everything: {e}")
+    return {"version": MANIFEST_VERSION, "template": None, "cards": {}, "sheets": {}}
+
+
+def save_manifest(manifest, path):
+    with open(path, 'w') as f:
+        f.write(json.dumps(manifest, indent=2))
+
+
+def export(layout_name, card_ids, set_name="cards", out_dir=None, dpi=300, page="A4", grid=(3, 3), workers=None,
+           full=False, sheets=True):
+    """Export card_ids through the layout; returns an ExportReport.
+
+    Card PNGs go to <out_dir>/cards/<id>.png and sheets to
+    <out_dir>/sheets/<set_name>_<n>.png; out_dir defaults to
+    exports/<layout name>. full ignores the manifest and redraws everything.
+    """
+    layout_name, layout_data = load_layout(layout_name)
+    layout = layout_data["layout"]
+    out_dir = out_dir or os.path.join(EXPORT_DIR, layout_name)
+    cards_out = os.path.join(out_dir, "cards")
+    sheets_out = os.path.join(out_dir, "sheets")
+    os.makedirs(cards_out, exist_ok=True)
+    card_size = (round(CARD_INCHES[0] * dpi), round(CARD_INCHES[1] * dpi))
+    page_size = page_pixels(page, dpi)
+    if grid[0] * card_size[0] > page_size[0] or grid[1] * card_size[1] > page_size[1]:
+        raise ValueError(f"{grid[0]}x{grid[1]} cards of {card_size[0]}x{card_size[1]} px do not fit on {page} "
+                         f"({page_size[0]}x{page_size[1]} px)")
+
+    manifest_file = os.path.join(out_dir, MANIFEST_NAME)
+    manifest = load_manifest(manifest_file)
+    template = template_hash(layout_data, card_size)
+    if full or manifest["template"] != template:
+        manifest = {"version": MANIFEST_VERSION, "template": template, "cards": {}, "sheets": {}}
+
+    report = ExportReport()
+    hashes = {}
+    jobs = []
+    for card_id in dict.fromkeys(card_ids):
+        card_path = os.path.join(CARDS_DIR, f"{card_id}.json")
+        out_path = os.path.join(cards_out, f"{card_id}.png")
+        try:
+            digest = card_hash(load_json_file(card_path), layout)
+        except Exception as e:
+            report.failed[card_id] = str(e)
+            continue
+        hashes[card_id] = digest
+        if manifest["cards"].get(card_id) == digest and os.path.exists(out_path):
+            report.skipped += 1
+        else:
+            jobs.append((card_id, (card_path, layout, card_size, out_path)))
+    for (card_id, _), error in zip(jobs, run_jobs(render_card, [job for _, job in jobs], workers)):
+        if error:
+            report.failed[card_id] = error
+            manifest["cards"].pop(card_id, None)
+            del hashes[card_id]
+        else:
+            report.rendered.append(card_id)
+            manifest["cards"][card_id] = hashes[card_id]
+
+    if sheets:
+        os.makedirs(sheets_out, exist_ok=True)
+        per_sheet = grid[0] * grid[1]
+        exported = list(hashes)
+        sheet_jobs = []
+        names = []
+        for start in range(0, len(exported), per_sheet):
+            on_sheet = exported[start:start + per_sheet]
+            name = f"{set_name}_{start // per_sheet + 1:03d}.png"
+            names.append(name)
+            digest = sha1_json([template, page, list(grid), [(card_id, hashes[card_id]) for card_id in on_sheet]])
+            out_path = os.path.join(sheets_out, name)
+            if manifest["sheets"].get(name) == digest and os.path.exists(out_path):
+                report.sheets_skipped += 1
+                continue
+            manifest["sheets"][name] = digest
+            sheet_jobs.append((name, ([os.path.join(cards_out, f"{card_id}.png") for card_id in on_sheet],
+                                      page_size, card_size, grid, out_path)))
+        for (name, _), error in zip(sheet_jobs, run_jobs(render_sheet, [job for _, job in sheet_jobs], workers)):
+            if error:
+                report.failed[name] = error
+                manifest["sheets"].pop(name, None)
+            else:
+                report.sheets_written.append(name)
+        # Sheets left over from when the set was longer; other sets' sheets ("Junk" vs "Junk_Card") are left alone
+        own_sheet = re.compile(rf"{re.escape(set_name)}_\d{{3,}}\.png")
+        for name in list(manifest["sheets"]):
+            if own_sheet.fullmatch(name) and name not in names:
+                del manifest["sheets"][name]
+                if os.path.exists(os.path.join(sheets_out, name)):
+                    os.remove(os.path.join(sheets_out, name))
+
+    save_manifest(manifest, manifest_file)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export cards through a CardTemplateMaker layout to PNGs and print sheets")
+    parser.add_argument("layout", help="layout name in layouts/ or a layout file")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--deck", help="export the cards of this deck (name in decks/ or a deck file)")
+    group.add_argument("--type", help="export cards of this card type (default: the layout's card type)")
+    parser.add_argument("--all", action="store_true", help="export every indexed card regardless of type")
+    parser.add_argument("--where", nargs=2, action="append", metavar=("FIELD", "CONDITION"), default=[],
+                        help="only cards whose FIELD matches CONDITION (a value, or >N, <N, =N); repeatable")
+    parser.add_argument("--out", help="output directory (default: exports/<layout>)")
+    parser.add_argument("--dpi", type=int, default=300, help="print resolution (default: 300)")
+    parser.add_argument("--page", choices=sorted(PAGE_SIZES_MM), default="A4", help="sheet page size (default: A4)")
+    parser.add_argument("--grid", default="3x3", help="cards per sheet as COLUMNSxROWS (default: 3x3)")
+    parser.add_argument("--workers", type=int, help="processes to draw with (default: one per CPU)")
+    parser.add_argument("--full", action="store_true", help="redraw everything, ignoring the manifest")
+    parser.add_argument("--no-sheets", action="store_true", help="only write the card PNGs")
+    args = parser.parse_args()
+
+    try:
+        grid = tuple(int(n) for n in args.grid.lower().split("x"))
+        if len(grid) != 2 or min(grid) < 1:
+            raise ValueError
+    except ValueError:
+        parser.error(f"--grid must look like 3x3, not '{args.grid}'")
+    try:
+        _, layout_data = load_layout(args.layout)
+        where = dict(args.where)
+        if args.deck:
+            set_name, card_ids = load_deck(args.deck)
+            if where:
+                manager = CardManager()
+                card_ids = [card_id for card_id in card_ids
+                            if os.path.exists(os.path.join(CARDS_DIR, f"{card_id}.json")) and
+                            manager._apply_filters(load_json_file(os.path.join(CARDS_DIR, f"{card_id}.json")), where)]
+        else:
+            card_type = None if args.all else args.type or layout_data.get("card_type") or None
+            set_name = card_type or "all"
+            card_ids = select_cards(card_type, where)
+        set_name = re.sub(r'[^\w\s-]', '', set_name).strip().replace(' ', '_') or "cards"
+        print(f"Exporting {len(card_ids)} cards through layout '{args.layout}'")
+        report = export(args.layout, card_ids, set_name, args.out, args.dpi, args.page, grid, args.workers, args.full,
+                        not args.no_sheets)
+    except Exception as e:
+        print(f"Error exporting cards: {e}")
+        return 1
+    for line in report.lines():
+        print(line)
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
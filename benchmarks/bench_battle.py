@@ -0,0 +1,181 @@
+"""Whole-battle throughput on the shipped levels.
+
+    python benchmarks/bench_battle.py [--rounds 20] [--levels "levels/1stlevel.json" ...] [--output results.json]
+
+Each level is loaded through HexGrid.load_level, so units are spawned from their
+card files with Unit(card_data) and logged with CardManager.track_card_usage,
+exactly as in the game. Then the Allied, Neutral and Hostile phases run
+--rounds times through TurnEngine with animations snapped to their end, and
+units are switched and removed the way GameScreen.resolve_unit does it. The
+player is healed at the start of every round so the battle keeps going.
+
+Usage logging goes to a temporary copy of cards/usage_log.json, so its disk
+rewrite cost is measured without touching the real log.
+"""
+import argparse
+import glob
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from bench_common import setup_headless, write_results
+
+pygame = setup_headless()
+from card_manager import CardManager, USAGE_LOG
+from hexgrid import HexGrid
+from player import Player
+from turn_engine import TurnEngine
+
+ROUNDS = 20
+ALLEGIANCES = ["Allied", "Neutral", "Hostile"]
+PLAYER_CLASS = "Warrior"
+WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
+
+
+class TimedCardManager(CardManager):
+    """CardManager that adds up the time spent in track_card_usage."""
+    def __init__(self, usage_log):
+        super().__init__(usage_log)
+        self.usage_calls = 0
+        self.usage_seconds = 0.0
+
+    def track_card_usage(self, card_id, usage_context):
+        started = time.perf_counter()
+        super().track_card_usage(card_id, usage_context)
+        self.usage_seconds += time.perf_counter() - started
+        self.usage_calls += 1
+
+
+class Battle:
+    def __init__(self, level_file, usage_log):
+        self.card_manager = TimedCardManager(usage_log)
+        self.grid = HexGrid(16, 24, 30, WINDOW_WIDTH, WINDOW_HEIGHT)
+        self.player = Player(PLAYER_CLASS)
+        self.engine = TurnEngine(self.resolve_unit)
+        self.unit_turns = 0
+        self.defeated = 0
+        self.player_defeats = 0
+        started = time.perf_counter()
+        self.grid.load_level(level_file, self.card_manager, self.player)
+        self.load_seconds = time.perf_counter() - started
+
+    def resolve_unit(self, unit, log_entries):
+        # GameScreen.resolve_unit without the log panel and replay recorder
+        self.unit_turns += 1
+        if self.player.hp <= 0:
+            self.player_defeats += 1
+            return False
+        if unit.states == 2 and unit.hp < unit.max_hp * 0.3:
+            unit.switch_state()
+            self.grid.units.reindex(unit)
+        if unit.hp <= 0:
+            self.grid.grid[unit.position[0]][unit.position[1]]["unit"] = None
+            self.grid.units.remove(unit)
+            self.defeated += 1
+            self.card_manager.track_card_usage(unit.card_id, {"action": "defeated", "screen": "game"})
+        return True
+
+    def run(self, rounds):
+        """Play rounds of the AI phases; returns the seconds spent in each phase, by allegiance."""
+        phase_seconds = {allegiance: [] for allegiance in ALLEGIANCES}
+        for _ in range(rounds):
+            self.player.hp = self.player.max_hp
+            self.player.movement_used = self.player.action_used = False
+            for allegiance in ALLEGIANCES:
+                started = time.perf_counter()
+                self.engine.start_phase(self.grid, allegiance)
+                self.engine.run_to_completion()
+                phase_seconds[allegiance].append(time.perf_counter() - started)
+        return phase_seconds
+
+
+def level_files(patterns=None):
+    if patterns:
+        return [path for pattern in patterns for path in sorted(glob.glob(pattern))]
+    files = sorted(glob.glob(os.path.join("levels", "*.json")))
+    # Chunked worlds are directories with a manifest
+    files += sorted(glob.glob(os.path.join("levels", "*", "world.json")))
+    return files
+
+
+def bench_level(level_file, rounds, usage_log, seed):
+    random.seed(seed)
+    battle = Battle(level_file, usage_log)
+    units_at_start = len(battle.grid.units)
+    spawn_usage_seconds, spawn_usage_calls = battle.card_manager.usage_seconds, battle.card_manager.usage_calls
+    started = time.perf_counter()
+    phase_seconds = battle.run(rounds)
+    total = time.perf_counter() - started
+    phases = {allegiance: {"mean_ms": sum(times) / len(times) * 1000, "max_ms": max(times) * 1000}
+              for allegiance, times in phase_seconds.items()}
+    return {
+        "level": level_file,
+        "rows": battle.grid.rows,
+        "cols": battle.grid.cols,
+        "units_at_start": units_at_start,
+        "units_at_end": len(battle.grid.units),
+        "defeated": battle.defeated,
+        "player_defeats": battle.player_defeats,
+        "load_ms": battle.load_seconds * 1000,
+        "spawn_usage_log_ms": spawn_usage_seconds * 1000,
+        "spawn_usage_log_calls": spawn_usage_calls,
+        "usage_log_ms": battle.card_manager.usage_seconds * 1000,
+        "usage_log_calls": battle.card_manager.usage_calls,
+        "rounds": rounds,
+        "unit_turns": battle.unit_turns,
+        "turns_per_second": rounds / total if total else None,
+        "unit_turns_per_second": battle.unit_turns / total if total else None,
+        "round_ms": total / rounds * 1000,
+        "phases": phases
+    }
+
+
+def peak_memory(level_file, rounds, usage_log, seed):
+    """Peak traced allocation, in KiB, for loading the level and playing it (a separate run, tracing is slow)."""
+    random.seed(seed)
+    tracemalloc.start()
+    try:
+        Battle(level_file, usage_log).run(rounds)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-battle throughput benchmark over levels/")
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="AI rounds (Allied, Neutral, Hostile phases) per level")
+    parser.add_argument("--levels", nargs="+", help="level files or glob patterns (default: everything in levels/)")
+    parser.add_argument("--no-memory", action="store_true", help="skip the traced peak-memory run")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="bench_battle_")
+    usage_log = os.path.join(temp_dir, "usage_log.json")
+    results = []
+    try:
+        for index, level_file in enumerate(level_files(args.levels)):
+            # Every level starts from the real log's size, since the rewrite cost grows with it
+            if os.path.exists(USAGE_LOG):
+                shutil.copyfile(USAGE_LOG, usage_log)
+            result = bench_level(level_file, args.rounds, usage_log, index)
+            if not args.no_memory:
+                if os.path.exists(USAGE_LOG):
+                    shutil.copyfile(USAGE_LOG, usage_log)
+                result["peak_memory_kib"] = peak_memory(level_file, args.rounds, usage_log, index)
+            results.append(result)
+            print(f"{level_file}: {result['units_at_start']} units, load {result['load_ms']:.1f} ms "
+                  f"(usage log {result['spawn_usage_log_ms']:.1f} ms), {result['turns_per_second']:.1f} rounds/s, "
+                  f"{result['unit_turns_per_second']:.0f} unit turns/s"
+                  + (f", peak {result['peak_memory_kib']:.0f} KiB" if "peak_memory_kib" in result else ""))
+            sys.stdout.flush()
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print(f"Results written to {write_results('battle', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+# Shared setup for the benchmark scripts: headless pygame, a repeat-until-budget timer and
+# JSON result files that compare.py can diff across commits.
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, "benchmarks", "results")
+
+
+def setup_headless():
+    """Import the game modules without a window: dummy SDL drivers, repo root on sys.path and as cwd."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    # The game loads cards/, levels/ and images/ relative to the working directory
+    os.chdir(REPO_DIR)
+    import pygame
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    return pygame
+
+
+def time_call(fn, inputs, budget=0.2, min_rounds=3, max_rounds=200, setup=None):
+    """Call fn(*args) for every args in inputs, in rounds, until budget seconds have passed.
+
+    Returns per-call statistics in milliseconds. Rounds rather than single calls are timed so
+    cheap calls are not dominated by timer overhead. setup(), if given, runs untimed before each
+    round, e.g. to drop caches the previous round filled.
+    """
+    inputs = list(inputs)
+    round_times = []
+    started = time.perf_counter()
+    while len(round_times) < max_rounds and (len(round_times) < min_rounds or time.perf_counter() - started < budget):
+        if setup:
+            setup()
+        round_start = time.perf_counter()
+        for args in inputs:
+            fn(*args)
+        round_times.append((time.perf_counter() - round_start) / len(inputs))
+    return {
+        "calls_per_round": len(inputs),
+        "rounds": len(round_times),
+        "mean_ms": statistics.mean(round_times) * 1000,
+        "median_ms": statistics.median(round_times) * 1000,
+        "min_ms": min(round_times) * 1000
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def environment():
+    try:
+        import numpy
+        numpy_version = numpy.__version__
+    except ImportError:
+        numpy_version = None
+    import pygame
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "pygame": pygame.version.ver,
+        "numpy": numpy_version
+    }
+
+
+def write_results(suite, results, output=None):
+    """Write results to output, or benchmarks/results/<suite>_<commit>_<time>.json; returns the path."""
+    commit = git_commit()
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{suite}_{commit}_{time.strftime('%Y%m%d-%H%M%S')}.json")
+    data = {
+        "suite": suite,
+        "commit": commit,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(),
+        "results": results
+    }
+    with open(output, 'w') as f:
+        json.dump(data, f, indent=2)
+    return output
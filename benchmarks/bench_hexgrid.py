@@ -0,0 +1,132 @@
+"""Microbenchmarks for the HexGrid hot paths on synthetic boards.
+
+    python benchmarks/bench_hexgrid.py [--quick] [--sizes 10 50 200] [--output results.json]
+
+Every combination of board size, obstacle density and unit count gets a fresh,
+seeded board, so runs on different commits time the same queries. Results go to
+benchmarks/results/ unless --output is given; compare two runs with compare.py.
+"""
+import argparse
+import random
+import sys
+
+from bench_common import setup_headless, time_call, write_results
+
+pygame = setup_headless()
+from hexgrid import HexGrid
+from unit import Unit
+
+SIZES = [10, 25, 50, 100, 200]
+DENSITIES = [0.0, 0.1, 0.25]
+UNIT_COUNTS = [0, 20, 100]
+QUICK_SIZES = [10, 50, 200]
+QUICK_DENSITIES = [0.1]
+QUICK_UNIT_COUNTS = [20]
+WINDOW_WIDTH, WINDOW_HEIGHT = 1280, 720
+HEX_SIZE = 30
+QUERIES = 40         # Inputs per timed round
+MOVEMENT = 5
+PROJECTILE_RANGE = 5
+LOS_DISTANCE = 8
+
+
+def make_unit(index, allegiance):
+    card_data = {
+        "id": f"bench-{index}",
+        "card_type": "Unit",
+        "data": {"Name": f"Bench {index}", "Health": "10", "Movement": "3",
+                 "Allegiance (Hostile, Neutral, Allied)": allegiance}
+    }
+    return Unit(card_data)
+
+
+def build_grid(size, density, unit_count, seed):
+    rng = random.Random(seed)
+    grid = HexGrid(size, size, HEX_SIZE, WINDOW_WIDTH, WINDOW_HEIGHT)
+    for row in range(size):
+        for col in range(size):
+            if rng.random() < density:
+                grid.grid[row][col]["accessible"] = False
+    grid.occupancy_changed()
+    open_cells = [(row, col) for row in range(size) for col in range(size) if grid.grid[row][col]["accessible"]]
+    rng.shuffle(open_cells)
+    for index, (row, col) in enumerate(open_cells[:unit_count]):
+        grid.place_unit(make_unit(index, "Hostile" if index % 3 else "Allied"), row, col)
+    return grid, rng
+
+
+def open_cells(grid):
+    return [(row, col) for row in range(grid.rows) for col in range(grid.cols)
+            if grid.grid[row][col]["accessible"] and grid.grid[row][col]["unit"] is None]
+
+
+def nearby(grid, rng, origin, distance):
+    """A random in-bounds hex within distance of origin."""
+    while True:
+        row = min(grid.rows - 1, max(0, origin[0] + rng.randint(-distance, distance)))
+        col = min(grid.cols - 1, max(0, origin[1] + rng.randint(-distance, distance)))
+        if grid.hex_distance(origin, (row, col)) <= distance:
+            return row, col
+
+
+def bench_config(size, density, unit_count, budget):
+    seed = hash((size, round(density * 100), unit_count)) & 0xffffffff
+    grid, rng = build_grid(size, density, unit_count, seed)
+    free = open_cells(grid)
+    if len(free) < 2:
+        return {}
+    starts = [rng.choice(free) for _ in range(QUERIES)]
+    # Path goals are open cells so a blocked goal does not turn every query into a full-board flood
+    path_pairs = [(rng.choice(free), rng.choice(free)) for _ in range(QUERIES)]
+    los_pairs = [(start, nearby(grid, rng, start, LOS_DISTANCE)) for start in starts]
+    grid_width = min(WINDOW_WIDTH, size * HEX_SIZE * 1.5)
+    grid_height = min(WINDOW_HEIGHT, size * HEX_SIZE * 1.732)
+    pixels = [(grid.view_offset_x + rng.uniform(0, grid_width), grid.view_offset_y + rng.uniform(0, grid_height))
+              for _ in range(QUERIES)]
+    surface = pygame.Surface((WINDOW_WIDTH, WINDOW_HEIGHT))
+    movement_range = grid.get_movement_range(starts[0], MOVEMENT)
+    attack_range = grid.get_attack_range(starts[0], PROJECTILE_RANGE, is_projectile=True)
+    passable = grid.get_passable_mask()
+    cases = {
+        "get_hex_at_pixel": (grid.get_hex_at_pixel, pixels),
+        "find_path": (grid.find_path, path_pairs),
+        # Memoized per board state, so each round starts from a board that just changed
+        "get_movement_range": (grid.get_movement_range, [(start, MOVEMENT) for start in starts], grid.occupancy_changed),
+        # The flood fill alone, on a prebuilt passable mask, with no cache at all
+        "reach_mask": (grid.geometry.reach_mask, [(start, MOVEMENT, passable) for start in starts]),
+        "get_attack_range_projectile": (grid.get_attack_range, [(start, PROJECTILE_RANGE, True) for start in starts]),
+        "get_attack_range_melee": (grid.get_attack_range, [(start, 1, False) for start in starts]),
+        "has_clear_line_of_sight": (grid.has_clear_line_of_sight, los_pairs),
+        "draw": (grid.draw, [(surface, movement_range, None), (surface, None, attack_range), (surface,)]),
+    }
+    return {name: time_call(*case[:2], budget, setup=case[2] if len(case) > 2 else None) for name, case in cases.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HexGrid microbenchmarks")
+    parser.add_argument("--quick", action="store_true", help="fewer configurations and a shorter time budget")
+    parser.add_argument("--sizes", type=int, nargs="+", help="board sizes (square boards)")
+    parser.add_argument("--densities", type=float, nargs="+", help="fraction of inaccessible hexes")
+    parser.add_argument("--units", type=int, nargs="+", help="unit counts")
+    parser.add_argument("--budget", type=float, help="seconds per benchmark case")
+    parser.add_argument("--output", help="result file (default: benchmarks/results/...)")
+    args = parser.parse_args()
+    sizes = args.sizes or (QUICK_SIZES if args.quick else SIZES)
+    densities = args.densities or (QUICK_DENSITIES if args.quick else DENSITIES)
+    unit_counts = args.units or (QUICK_UNIT_COUNTS if args.quick else UNIT_COUNTS)
+    budget = args.budget or (0.05 if args.quick else 0.2)
+
+    results = []
+    for size in sizes:
+        for density in densities:
+            for unit_count in unit_counts:
+                timings = bench_config(size, density, unit_count, budget)
+                results.append({"size": size, "density": density, "units": unit_count, "timings": timings})
+                summary = "  ".join(f"{name}={timing['median_ms']:.3f}" for name, timing in timings.items())
+                print(f"{size}x{size} density={density} units={unit_count}: {summary}")
+                sys.stdout.flush()
+    print(f"Results written to {write_results('hexgrid', results, args.output)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+"""Compare two benchmark result files from the same suite.
+
+    python benchmarks/compare.py <before.json> <after.json> [--threshold 0.1]
+
+Prints the median time of every case in both runs and the ratio after/before,
+flagging slowdowns and speedups larger than the threshold.
+"""
+import argparse
+import json
+
+
+def case_key(result):
+    """Everything in a result entry except its timings identifies the configuration."""
+    return tuple(sorted((key, value) for key, value in result.items() if key != "timings"))
+
+
+def load(path):
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change worth flagging")
+    args = parser.parse_args()
+    before, after = load(args.before), load(args.after)
+    if before["suite"] != after["suite"]:
+        print(f"Warning: comparing suite {before['suite']} against {after['suite']}")
+    print(f"{before['commit']} -> {after['commit']}")
+    before_results = {case_key(result): result["timings"] for result in before["results"]}
+    for result in after["results"]:
+        old_timings = before_results.get(case_key(result))
+        if old_timings is None:
+            continue
+        label = " ".join(f"{key}={value}" for key, value in case_key(result))
+        for name, timing in result["timings"].items():
+            if name not in old_timings:
+                continue
+            old_ms, new_ms = old_timings[name]["median_ms"], timing["median_ms"]
+            ratio = new_ms / old_ms if old_ms else float('inf')
+            flag = "SLOWER" if ratio > 1 + args.threshold else "faster" if ratio < 1 - args.threshold else ""
+            print(f"{label:40} {name:30} {old_ms:10.3f} {new_ms:10.3f} {ratio:6.2f}x {flag}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from card_manager import INDEX_FILE, USAGE_LOG
+import index_store
+
+# Incremental rebuild of cards/card_index.json. A manifest remembers, per card file, the
+# (mtime, size) it had and the SHA-1 of its contents when it was last parsed, with the index entry
+# (or the reason it is invalid) parsed from it. A rebuild only stats the directory: files whose
+# stamp is unchanged keep their entry, files whose stamp moved are hashed and re-parsed only when
+# the contents really changed. When many files need parsing (a cold rebuild) they are parsed on a
+# process pool. Each rebuild returns an IndexReport of what was added, removed, changed or invalid.
+CARDS_DIR = "cards"
+MANIFEST_FILE = os.path.join(CARDS_DIR, "index_manifest.json")
+MANIFEST_VERSION = 1
+PARALLEL_THRESHOLD = 256  # Files to parse before a process pool is worth starting
+NOT_CARDS = {os.path.basename(INDEX_FILE), os.path.basename(USAGE_LOG), os.path.basename(MANIFEST_FILE)}
+
+
+def index_entry(card_data):
+    """The card_index.json entry for a card file's data; raises ValueError if it is not a card."""
+    if not isinstance(card_data, dict) or "card_type" not in card_data or "data" not in card_data:
+        raise ValueError("missing 'card_type' or 'data'")
+    data = card_data["data"]
+    return {
+        "type": card_data["card_type"],
+        "subclass": card_data.get("subclass"),
+        "blueprint_subclass": card_data.get("blueprint_subclass"),
+        "states": card_data.get("states"),
+        "name": data.get("Name", data.get("Default Name", "Unnamed"))
+    }
+
+
+def parse_card_file(path):
+    """(sha1, entry, error) for one card file; entry is None when the file is not a valid card."""
+    with open(path, 'rb') as f:
+        raw = f.read()
+    digest = hashlib.sha1(raw).hexdigest()
+    try:
+        return digest, index_entry(json.loads(raw)), None
+    except json.JSONDecodeError as e:
+        return digest, None, f"invalid JSON: {e}"
+    except Exception as e:
+        return digest, None, str(e)
+
+
+def parse_many(paths, workers=None):
+    if len(paths) < PARALLEL_THRESHOLD:
+        return [parse_card_file(path) for path in paths]
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(parse_card_file, paths, chunksize=64))
+    except Exception as e:
+        print(f"Error starting parallel card parsing, parsing serially: {e}")
+        return [parse_card_file(path) for path in paths]
+
+
+class IndexReport:
+    """Card ids added, removed, changed and invalid (with their reasons) in one rebuild."""
+    def __init__(self):
+        self.added = []
+        self.removed = []
+        self.changed = []
+        self.invalid = {}
+        self.parsed = 0
+        self.unchanged = 0
+
+    @property
+    def modified(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def summary(self):
+        return (f"{len(self.added)} added, {len(self.removed)} removed, {len(self.changed)} changed, "
+                f"{len(self.invalid)} invalid, {self.unchanged} unchanged ({self.parsed} files parsed)")
+
+    def lines(self):
+        """The report, one line per card, for printing."""
+        lines = [self.summary()]
+        lines += [f"  + {card_id}" for card_id in self.added]
+        lines += [f"  - {card_id}" for card_id in self.removed]
+        lines += [f"  ~ {card_id}" for card_id in self.changed]
+        lines += [f"  ! {filename}: {error}" for filename, error in sorted(self.invalid.items())]
+        return lines
+
+
+def load_manifest(path=MANIFEST_FILE):
+    try:
+        with open(path, 'r') as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            return manifest["files"]
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print(f"Error reading index manifest {path}, rebuilding from scratch: {e}")
+    return {}
+
+
+def save_manifest(files, path=MANIFEST_FILE):
+    with open(path, 'w') as f:
+        f.write(json.dumps({"version": MANIFEST_VERSION, "files": files}))  # dumps encodes in C; dump streams in Python
+
+
+def scan(cards_dir=CARDS_DIR):
+    """{filename: (mtime_ns, size)} for the card files in cards_dir."""
+    stamps = {}
+    with os.scandir(cards_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".json") and entry.name not in NOT_CARDS and entry.is_file():
+                stat = entry.stat()
+                stamps[entry.name] = (stat.st_mtime_ns, stat.st_size)
+    return stamps
+
+
+def update_index(cards_dir=CARDS_DIR, index_file=INDEX_FILE, manifest_file=MANIFEST_FILE, full=False, workers=None,
+                 store=None):
+    """Bring index_file up to date with the card files in cards_dir; returns an IndexReport.
+
+    full ignores the manifest and re-parses every file. The index is only
+    rewritten when it differs from the rebuilt entries, through store (an
+    index_store.IndexStore on index_file) when the caller has one open.
+    """
+    report = IndexReport()
+    old = {} if full else load_manifest(manifest_file)
+    stamps = scan(cards_dir)
+    files = {}
+    to_parse = []
+    for filename, stamp in stamps.items():
+        known = old.get(filename)
+        if known and tuple(known["stamp"]) == stamp:
+            files[filename] = known
+        else:
+            to_parse.append(filename)
+    results = parse_many([os.path.join(cards_dir, filename) for filename in to_parse], workers)
+    report.parsed = len(to_parse)
+    for filename, (digest, entry, error) in zip(to_parse, results):
+        known = old.get(filename)
+        if known and known["sha1"] == digest:
+            # Touched but not edited: keep what was parsed before
+            files[filename] = dict(known, stamp=list(stamps[filename]))
+        else:
+            files[filename] = {"stamp": list(stamps[filename]), "sha1": digest, "entry": entry, "error": error}
+
+    for filename in sorted(stamps):
+        card_id = os.path.splitext(filename)[0]
+        record = files[filename]
+        before = old.get(filename)
+        before_entry = before["entry"] if before else None
+        if record["entry"] is None:
+            report.invalid[filename] = record["error"]
+            if before_entry is not None:
+                report.removed.append(card_id)
+        elif before_entry is None:
+            report.added.append(card_id)
+        elif before_entry != record["entry"]:
+            report.changed.append(card_id)
+        else:
+            report.unchanged += 1
+    for filename in sorted(set(old) - set(stamps)):
+        if old[filename]["entry"] is not None:
+            report.removed.append(os.path.splitext(filename)[0])
+
+    index = {os.path.splitext(filename)[0]: files[filename]["entry"]
+             for filename in sorted(files) if files[filename]["entry"] is not None}
+    # Compared with what is on disk rather than trusting the report, so a wiped or hand-edited index is repaired
+    if index != index_store.read_index(index_file) or not os.path.exists(index_file):
+        if store is not None:
+            store.replace_all(index)
+        else:
+            index_store.replace_index(index, index_file)
+    if files != old:
+        save_manifest(files, manifest_file)
+    return report
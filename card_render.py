@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import OrderedDict
+import pygame
+
+# Draws a card the way CardMaker's preview shows it: background image, the card's art in the
+# middle, the name and then one "key: value" line per data field, truncated with "..." to fit.
+# CardRenderer composites each card once and keeps the result keyed by the card's content (its
+# data plus the stamps of the image files it uses) and the output size, so showing a card again is
+# a single blit. Decoded images and laid-out text lines are cached separately, so cards that share
+# art or lines reuse them. Works without a window, for writing card PNGs:
+#   python card_render.py <card id or card file>... [--out DIR] [--width PX]
+CARD_WIDTH = 400
+CARD_HEIGHT = 600
+LIGHT_TEAL = (173, 216, 230)
+DARK_BRONZE = (139, 69, 19)
+CARDS_DIR = "cards"
+CARD_CACHE_SIZE = 32     # Composited cards kept
+IMAGE_CACHE_SIZE = 64    # Decoded, scaled images kept
+TEXT_CACHE_SIZE = 2048   # Rendered text lines kept
+
+# Fields that hold images and are not listed as text
+IMAGE_FIELDS = {"Name", "Default Name", "Background Image", "Background Image File Path",
+                "Junk Image", "Junk Image File Path", "Enemy Image File Path",
+                "Boss Image File Path", "NPC Image File Path",
+                "Location Image File Path",
+                "2nd_state_Weapon Image", "2nd_state_Tool Image", "2nd_state_Item Image",
+                "Book Image", "Pamphlet Image"}
+ART_FIELDS = {
+    "Enemy Card": "Enemy Image File Path",
+    "Boss Card": "Boss Image File Path",
+    "NPC Card": "NPC Image File Path",
+    "Location Card": "Location Image File Path",
+    "Document Card": "Background Image",
+    "Transition Card": "Background Image"
+}
+
+
+def art_field(card_data):
+    if card_data["card_type"] == "Junk Card":
+        return "Junk Image" if "Junk Image" in card_data["data"] else "Junk Image File Path"
+    return ART_FIELDS.get(card_data["card_type"], "Background Image")
+
+
+def background_path(card_data):
+    return card_data["data"].get("Background Image", card_data["data"].get("Background Image File Path", ""))
+
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except (OSError, TypeError, ValueError):
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def content_hash(card_data):
+    """Hash of everything a card's picture depends on, including the image files' stamps."""
+    paths = [background_path(card_data), card_data["data"].get(art_field(card_data), "")]
+    payload = json.dumps([card_data, [file_stamp(path) if path else None for path in paths]], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class LRU(OrderedDict):
+    def __init__(self, limit):
+        super().__init__()
+        self.limit = limit
+
+    def lookup(self, key):
+        value = self.get(key)
+        if value is not None:
+            self.move_to_end(key)
+        return value
+
+    def store(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.limit:
+            self.popitem(last=False)
+        return value
+
+
+class CardRenderer:
+    """Composited card surfaces, cached; see render()."""
+    def __init__(self, text_scale=1.0):
+        self.text_scale = text_scale  # CardMaker sizes the card text by its display scale
+        self.cards = LRU(CARD_CACHE_SIZE)
+        self.images = LRU(IMAGE_CACHE_SIZE)
+        self.texts = LRU(TEXT_CACHE_SIZE)
+        self.fonts = {}
+
+    def clear(self):
+        self.cards.clear()
+        self.images.clear()
+        self.texts.clear()
+
+    def render(self, card_data, size=(CARD_WIDTH, CARD_HEIGHT)):
+        """The card drawn at size (width, height); the same Surface while the card is unchanged."""
+        size = (int(size[0]), int(size[1]))
+        key = (content_hash(card_data), size, self.text_scale)
+        surface = self.cards.lookup(key)
+        if surface is None:
+            surface = self.cards.store(key, self.composite(card_data, size))
+        return surface
+
+    def save_png(self, card_data, path, size=(CARD_WIDTH, CARD_HEIGHT)):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        pygame.image.save(self.render(card_data, size), path)
+
+    def composite(self, card_data, size):
+        card_surface = pygame.Surface((CARD_WIDTH, CARD_HEIGHT))
+        card_surface.fill(LIGHT_TEAL)
+        background = self.image(background_path(card_data), (CARD_WIDTH, CARD_HEIGHT))
+        if background:
+            card_surface.blit(background, (0, 0))
+        art = self.image(card_data["data"].get(art_field(card_data), ""), (CARD_WIDTH // 2, CARD_HEIGHT // 2))
+        if art:
+            card_surface.blit(art, art.get_rect(center=(CARD_WIDTH // 2, CARD_HEIGHT // 2)))
+
+        font_size = int(72 * self.text_scale)
+        y_pos = int(20 * self.text_scale)
+        data = card_data["data"]
+        name = self.text(data.get("Name", data.get("Default Name", "Unnamed")), font_size, None)
+        card_surface.blit(name, name.get_rect(center=(CARD_WIDTH // 2, y_pos)))
+        y_pos += int(120 * self.text_scale)
+        for key, value in data.items():
+            if key in IMAGE_FIELDS:
+                continue
+            if key in ["Upgraded Type (Weapon, Tool, Consumable, Armor)", "Upgraded Name"]:
+                value = value or "N/A"
+            line = self.text(f"{key}: {value}", font_size, CARD_WIDTH - 20)
+            card_surface.blit(line, line.get_rect(center=(CARD_WIDTH // 2, y_pos)))
+            y_pos += int(90 * self.text_scale)
+
+        if size != (CARD_WIDTH, CARD_HEIGHT):
+            card_surface = pygame.transform.scale(card_surface, size)
+        if pygame.display.get_surface() is not None:
+            card_surface = card_surface.convert()
+        return card_surface
+
+    def font(self, font_size):
+        font = self.fonts.get(font_size)
+        if font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            font = self.fonts[font_size] = pygame.font.Font(None, font_size)
+        return font
+
+    def text(self, text, font_size, max_width):
+        """text rendered in DARK_BRONZE; if wider than max_width, cut short and ended with "..."."""
+        key = (text, font_size, max_width)
+        surface = self.texts.lookup(key)
+        if surface is None:
+            font = self.font(font_size)
+            if max_width is not None and font.size(text)[0] > max_width:
+                # Longest prefix that fits with the ellipsis, by bisection on measured widths
+                low, high = 0, len(text) - 1
+                while low < high:
+                    middle = (low + high + 1) // 2
+                    if font.size(text[:middle] + "...")[0] <= max_width:
+                        low = middle
+                    else:
+                        high = middle - 1
+                text = text[:low] + "..."
+            surface = self.texts.store(key, font.render(text, True, DARK_BRONZE))
+        return surface
+
+    def image(self, path, size):
+        """The image at path scaled to size, or None if there is none or it cannot be loaded."""
+        if not path:
+            return None
+        stamp = file_stamp(path)
+        if stamp is None:
+            return None
+        key = (path, tuple(stamp), size)
+        surface = self.images.lookup(key)
+        if surface is None:
+            try:
+                surface = pygame.image.load(path)
+            except (pygame.error, FileNotFoundError):
+                return None
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert_alpha()
+            surface = self.images.store(key, pygame.transform.scale(surface, size))
+        return surface
+
+
+def load_card(card):
+    """Card data from a card file path or a card id in cards/."""
+    path = card if os.path.exists(card) else os.path.join(CARDS_DIR, f"{card}.json")
+    with open(path, 'r') as f:
+        return os.path.splitext(os.path.basename(path))[0], json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render cards to PNG files as CardMaker previews them")
+    parser.add_argument("cards", nargs="+", help="card ids (files in cards/) or card file paths")
+    parser.add_argument("--out", default="card_images", help="output directory (default: card_images)")
+    parser.add_argument("--width", type=int, default=CARD_WIDTH, help=f"image width in pixels (default: {CARD_WIDTH})")
+    args = parser.parse_args()
+    renderer = CardRenderer()
+    height = round(args.width * CARD_HEIGHT / CARD_WIDTH)
+    failed = 0
+    for card in args.cards:
+        try:
+            card_id, card_data = load_card(card)
+            path = os.path.join(args.out, f"{card_id}.png")
+            renderer.save_png(card_data, path, (args.width, height))
+            print(f"Wrote {path}")
+        except Exception as e:
+            failed += 1
+            print(f"Error rendering {card}: {e}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+import json
+import os
+import sys
+from collections import OrderedDict
+from unit import Unit
+
+# A chunked world is a directory instead of a single level file:
+#   <world>/world.json          manifest: {"chunked": true, "grid": {...}, "chunk_size": 16, "hex_size", "player_start",
+#                                          "card_drawing_hexes"}
+#   <world>/chunks/<cr>_<cc>.json   {"inaccessible": [[row, col], ...], "units": [{"card_id", "position"}, ...],
+#                                    "terrain": [[row, col, type], ...]}  (terrain lists only non-grass cells, for the editor)
+# Coordinates inside chunk files are absolute. A missing chunk file is open ground with no units.
+WORLD_MANIFEST = "world.json"
+CHUNK_DIR = "chunks"
+CHUNK_SIZE = 16
+MAX_LOADED_CHUNKS = 36   # LRU budget; chunks around the player and on screen may exceed it
+PIN_RADIUS = 1           # Chunks within this many chunks of the player are never evicted
+
+
+def chunk_file(world_dir, key):
+    return os.path.join(world_dir, CHUNK_DIR, f"{key[0]}_{key[1]}.json")
+
+
+def read_manifest(world_dir):
+    with open(os.path.join(world_dir, WORLD_MANIFEST), 'r') as f:
+        return json.load(f)
+
+
+def read_chunk(world_dir, key):
+    path = chunk_file(world_dir, key)
+    if not os.path.exists(path):
+        return {"inaccessible": [], "units": []}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+class ChunkRow:
+    """grid[row] for a ChunkStore, so grid[row][col] keeps working for HexGrid and the units."""
+    __slots__ = ("store", "row")
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, col):
+        return self.store.cell(self.row, col)
+
+    def __len__(self):
+        return self.store.cols
+
+
+class ChunkStore:
+    """Cell storage for a HexGrid whose map is split into chunk files.
+
+    Chunks are loaded the first time any cell in them is touched, so neighbor,
+    path and line-of-sight queries cross chunk boundaries without knowing about
+    them. update() runs once per frame and evicts least recently used chunks
+    over the budget, except those around the player or on screen. Units in an
+    evicted chunk go dormant and come back when the chunk is loaded again; the
+    units listed in a chunk file are only spawned the first time it is visited.
+    """
+    def __init__(self, grid, world_dir, manifest, card_manager=None, visited=None, budget=MAX_LOADED_CHUNKS):
+        self.grid = grid
+        self.world_dir = world_dir
+        self.rows = manifest["grid"]["rows"]
+        self.cols = manifest["grid"]["columns"]
+        self.chunk_size = manifest.get("chunk_size", CHUNK_SIZE)
+        self.card_manager = card_manager
+        self.budget = budget
+        self.spawn_units = True  # Replays turn this off and spawn units from their own events
+        self.chunks = OrderedDict()  # (chunk_row, chunk_col) -> list of rows of cell dicts, in LRU order
+        self.visited = set(tuple(key) for key in visited or [])
+        self.dormant = {}  # chunk key -> units waiting for their chunk to be loaded again
+        self.pinned = set()
+        self.focus_key = None
+        self.last_key = None
+        self.last_cells = None
+
+    def __getitem__(self, row):
+        return ChunkRow(self, row)
+
+    def __len__(self):
+        return self.rows
+
+    def chunk_key(self, row, col):
+        return row // self.chunk_size, col // self.chunk_size
+
+    def cell(self, row, col):
+        size = self.chunk_size
+        key = (row // size, col // size)
+        if key != self.last_key:
+            cells = self.chunks.get(key)
+            if cells is None:
+                cells = self.load_chunk(key)
+            else:
+                self.chunks.move_to_end(key)
+            self.last_key, self.last_cells = key, cells
+        return self.last_cells[row % size][col % size]
+
+    def load_chunk(self, key):
+        size = self.chunk_size
+        data = read_chunk(self.world_dir, key)
+        cells = [[{"unit": None, "accessible": True} for _ in range(size)] for _ in range(size)]
+        for row, col in data.get("inaccessible", []):
+            cells[row % size][col % size]["accessible"] = False
+        self.chunks[key] = cells
+        for unit in self.dormant.pop(key, []):
+            cells[unit.position[0] % size][unit.position[1] % size]["unit"] = unit
+            self.grid.units.append(unit)
+            if self.grid.recorder and unit not in self.grid.recorder.uids:
+                self.grid.recorder.record_spawn(unit)
+        if key not in self.visited and self.spawn_units:
+            self.visited.add(key)
+            for unit_data in data.get("units", []):
+                self.spawn(cells, unit_data)
+        return cells
+
+    def spawn(self, cells, unit_data):
+        row, col = unit_data["position"]["row"], unit_data["position"]["column"]
+        cell = cells[row % self.chunk_size][col % self.chunk_size]
+        if cell["unit"] is not None or not cell["accessible"]:
+            return
+        try:
+            with open(os.path.join("cards", f"{unit_data['card_id']}.json"), 'r') as cf:
+                card_data = json.load(cf)
+        except Exception as e:
+            print(f"Error spawning unit {unit_data['card_id']}: {e}")
+            return
+        card_data["id"] = unit_data["card_id"]
+        unit = Unit(card_data)
+        unit.position = (row, col)
+        cell["unit"] = unit
+        self.grid.units.append(unit)
+        if self.grid.recorder:
+            self.grid.recorder.record_spawn(unit)
+        if self.card_manager:
+            self.card_manager.track_card_usage(unit.card_id, {"action": "spawned", "screen": "game", "position": (row, col)})
+
+    def evict(self, key):
+        cells = self.chunks.pop(key)
+        if key == self.last_key:
+            self.last_key = self.last_cells = None
+        sleeping = [cell["unit"] for cell_row in cells for cell in cell_row
+                    if cell["unit"] is not None and cell["unit"] is not self.grid.player]
+        for unit in sleeping:
+            self.grid.units.remove(unit)
+        if sleeping:
+            self.dormant.setdefault(key, []).extend(sleeping)
+
+    def can_evict(self, key):
+        if key in self.pinned:
+            return False
+        # A chunk whose unit is mid-move stays until the tween finishes so turn order never stalls
+        return not any(unit.position and self.chunk_key(*unit.position) == key
+                       for unit in self.grid.animations.by_unit)
+
+    def update(self, focus=None, visible=None):
+        """Pin the chunks around focus (the player's cell) and visible (row/col bounds), then trim to the budget."""
+        pinned = set()
+        if focus:
+            self.focus_key = self.chunk_key(*focus)
+            fr, fc = self.focus_key
+            for cr in range(fr - PIN_RADIUS, fr + PIN_RADIUS + 1):
+                for cc in range(fc - PIN_RADIUS, fc + PIN_RADIUS + 1):
+                    if 0 <= cr * self.chunk_size < self.rows and 0 <= cc * self.chunk_size < self.cols:
+                        pinned.add((cr, cc))
+        if visible:
+            row_start, row_end, col_start, col_end = visible
+            if row_end > row_start and col_end > col_start:
+                for cr in range(row_start // self.chunk_size, (row_end - 1) // self.chunk_size + 1):
+                    for cc in range(col_start // self.chunk_size, (col_end - 1) // self.chunk_size + 1):
+                        pinned.add((cr, cc))
+        self.pinned = pinned
+        # Prefetch the pinned area so the player never waits on a load mid-move
+        for key in pinned:
+            if key not in self.chunks:
+                self.load_chunk(key)
+        excess = len(self.chunks) - self.budget
+        if excess > 0:
+            for key in [key for key in self.chunks if self.can_evict(key)][:excess]:
+                self.evict(key)
+
+    def restore_unit(self, unit):
+        """Put a unit back from a save: onto the board if its chunk is loaded, otherwise dormant."""
+        key = self.chunk_key(*unit.position)
+        if key in self.chunks:
+            self.cell(*unit.position)["unit"] = unit
+            self.grid.units.append(unit)
+        else:
+            self.dormant.setdefault(key, []).append(unit)
+
+    def all_units(self):
+        return list(self.grid.units) + [unit for units in self.dormant.values() for unit in units]
+
+    def inaccessible_hexes(self):
+        """Every blocked cell in the world, read from the chunk files without loading cells."""
+        chunk_dir = os.path.join(self.world_dir, CHUNK_DIR)
+        hexes = []
+        if os.path.isdir(chunk_dir):
+            for filename in sorted(os.listdir(chunk_dir)):
+                if filename.endswith(".json"):
+                    cr, cc = filename[:-5].split("_")
+                    hexes.extend(read_chunk(self.world_dir, (int(cr), int(cc))).get("inaccessible", []))
+        return [tuple(pos) for pos in hexes]
+
+
+def split_level(level_data, world_dir, chunk_size=CHUNK_SIZE):
+    """Write a dense level dict (the Level Maker / level file format) out as a chunked world."""
+    rows, cols = level_data["grid"]["rows"], level_data["grid"]["columns"]
+    chunks = {}
+    new_chunk = lambda row, col: chunks.setdefault((row // chunk_size, col // chunk_size),
+                                                   {"inaccessible": [], "units": [], "terrain": []})
+    for hex_data in level_data.get("inaccessible_hexes", []):
+        row, col = hex_data["row"], hex_data["column"]
+        if 0 <= row < rows and 0 <= col < cols:
+            new_chunk(row, col)["inaccessible"].append([row, col])
+    for unit_data in level_data.get("units", []):
+        row, col = unit_data["position"]["row"], unit_data["position"]["column"]
+        if 0 <= row < rows and 0 <= col < cols:
+            new_chunk(row, col)["units"].append(unit_data)
+    for row, terrain_row in enumerate(level_data.get("terrain", [])[:rows]):
+        for col, terrain in enumerate(terrain_row[:cols]):
+            if terrain != "grass":
+                new_chunk(row, col)["terrain"].append([row, col, terrain])
+    os.makedirs(os.path.join(world_dir, CHUNK_DIR), exist_ok=True)
+    for filename in os.listdir(os.path.join(world_dir, CHUNK_DIR)):
+        if filename.endswith(".json"):
+            os.remove(os.path.join(world_dir, CHUNK_DIR, filename))
+    for key, data in chunks.items():
+        with open(chunk_file(world_dir, key), 'w') as f:
+            json.dump(data, f)
+    manifest = {
+        "chunked": True,
+        "grid": {"rows": rows, "columns": cols},
+        "chunk_size": chunk_size,
+        "hex_size": level_data.get("hex_size", 30),
+        "player_start": level_data.get("player_start"),
+        "card_drawing_hexes": level_data.get("card_drawing_hexes", [])
+    }
+    with open(os.path.join(world_dir, WORLD_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def merge_world(world_dir):
+    """Read a chunked world back into a dense level dict (for the Level Maker)."""
+    manifest = read_manifest(world_dir)
+    level_data = {
+        "grid": dict(manifest["grid"]),
+        "player_start": manifest.get("player_start"),
+        "inaccessible_hexes": [],
+        "units": [],
+        "card_drawing_hexes": manifest.get("card_drawing_hexes", [])
+    }
+    rows, cols = manifest["grid"]["rows"], manifest["grid"]["columns"]
+    level_data["terrain"] = [["grass" for _ in range(cols)] for _ in range(rows)]
+    chunk_dir = os.path.join(world_dir, CHUNK_DIR)
+    if os.path.isdir(chunk_dir):
+        for filename in sorted(os.listdir(chunk_dir)):
+            if filename.endswith(".json"):
+                with open(os.path.join(chunk_dir, filename), 'r') as f:
+                    data = json.load(f)
+                level_data["inaccessible_hexes"].extend({"row": r, "column": c} for r, c in data.get("inaccessible", []))
+                level_data["units"].extend(data.get("units", []))
+                for r, c, terrain in data.get("terrain", []):
+                    level_data["terrain"][r][c] = terrain
+    return level_data
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("Usage: python chunked_map.py <level file> <world dir> [chunk size]")
+        sys.exit(1)
+    with open(sys.argv[1], 'r') as f:
+        level = json.load(f)
+    result = split_level(level, sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else CHUNK_SIZE)
+    print(f"Wrote {result['grid']['rows']}x{result['grid']['columns']} world to {sys.argv[2]}")
@@ -0,0 +1,245 @@
+import pygame
+import range_patterns
+
+# Attack resolution shared by the player and the units. Callers describe what should happen as
+# Intents (attacker, targets, Attack); resolve() checks every target's range and line of sight
+# against the board as it stands, then applies the hits in order and returns CombatEvents for the
+# log, the replay recorder and hit flashes.
+HIT = "hit"
+DEFEATED = "defeated"
+OUT_OF_RANGE = "out_of_range"
+
+# The class special attacks from CHARACTER_CLASSES, built on the class's melee or projectile attack
+SPECIAL_ATTACKS = {
+    "Multi-target Projectile": {"kind": "projectile", "max_targets": 3},  # The target plus the nearest other hostiles in range
+    "Double Attack": {"kind": "melee", "hits": 2},                        # Strike the target twice
+    "Spin Punch": {"kind": "melee", "area": True},                        # Strike every non-allied unit adjacent to the player
+}
+
+
+def name_of(unit):
+    return getattr(unit, "class_name", None) or unit.name
+
+
+class Attack:
+    """What is being used: kind is "melee" or "projectile"; range_id optionally names a ranges/ pattern."""
+    def __init__(self, name, kind, damage, max_range=1, range_id=None, hits=1):
+        self.name = name
+        self.kind = kind
+        self.damage = damage
+        self.max_range = max_range
+        self.range_id = range_id
+        self.hits = hits
+
+    @classmethod
+    def of_player(cls, player, kind):
+        attack = player.attacks[kind]
+        return cls(attack["name"], kind, attack["damage"], player.projectile_range if kind == "projectile" else 1,
+                   attack.get("range_id"))
+
+    @classmethod
+    def of_unit(cls, unit, kind):
+        if kind == "projectile":
+            return cls(None, kind, unit.projectile_damage, unit.projectile_range)
+        return cls(None, kind, unit.melee_damage)
+
+
+class Intent:
+    def __init__(self, attacker, targets, attack):
+        self.attacker = attacker
+        self.targets = list(targets)
+        self.attack = attack
+
+
+class CombatEvent:
+    def __init__(self, kind, attacker, target, attack, damage=0):
+        self.kind = kind
+        self.attacker = attacker
+        self.target = target
+        self.attack = attack
+        self.damage = damage
+
+    @property
+    def message(self):
+        if self.kind == HIT:
+            if self.attack.name:
+                return f"{name_of(self.attacker)} used {self.attack.name} on {name_of(self.target)} for {self.damage} damage"
+            with_projectile = " with projectile" if self.attack.kind == "projectile" else ""
+            return f"{name_of(self.attacker)} attacked {name_of(self.target)}{with_projectile} for {self.damage} damage"
+        if self.kind == DEFEATED:
+            return f"{name_of(self.target)} defeated"
+        return ""
+
+    def __repr__(self):
+        return f"CombatEvent({self.kind}, {name_of(self.attacker)} -> {name_of(self.target)}, {self.damage})"
+
+
+def axis_sight(grid, origin, max_range):
+    """Hexes a projectile from origin can reach: along the six axes, up to max_range.
+
+    Equivalent to is_aligned + has_clear_line_of_sight for every hex at once (including its
+    rule that the hex next to the shooter never blocks), from one walk per axis instead of one
+    line scan per target. Cached on the grid until a unit or obstacle changes.
+    """
+    origin = tuple(origin)
+    cache = grid.get_range_cache()
+    key = ("sight", origin, max_range)
+    if key not in cache:
+        visible = set()
+        x0, z0 = origin[1], origin[0] - origin[1] // 2
+        cells = grid.grid
+        for dx, _, dz in range_patterns.DIRECTIONS:
+            for k in range(1, max_range + 1):
+                col = x0 + k * dx
+                row = z0 + k * dz + col // 2
+                if not (0 <= row < grid.rows and 0 <= col < grid.cols):
+                    break
+                visible.add((row, col))
+                cell = cells[row][col]
+                if k > 1 and (cell["unit"] is not None or not cell["accessible"]):
+                    break
+        cache[key] = visible
+    return cache[key]
+
+
+def pattern_distance(pattern, attack):
+    """The distance a range_id pattern is evaluated at, as HexGrid.get_attack_range picks it."""
+    return pattern.distance if pattern.distance is not None else attack.max_range
+
+
+def attack_area(grid, origin, attack):
+    """Hexes a range_id pattern attack can target from origin, cached like axis_sight.
+
+    For a two_stage pattern that is the primary area only; what the secondary
+    area then catches around the target is splash_area.
+    """
+    cache = grid.get_range_cache()
+    key = ("pattern", tuple(origin), attack.range_id, attack.kind, attack.max_range)
+    if key not in cache:
+        pattern = range_patterns.find_pattern(attack.range_id)
+        if pattern is not None and pattern.type == "two_stage":
+            primary = pattern.library.get(pattern.data["primary"])
+            cache[key] = primary.evaluate(grid, origin, pattern_distance(pattern, attack))
+        else:
+            cache[key] = grid.get_attack_range(origin, attack.max_range, is_projectile=attack.kind == "projectile",
+                                               pattern=attack.range_id)
+    return cache[key]
+
+
+def splash_area(grid, origin, target, attack):
+    """Hexes a two_stage pattern attack aimed at target also hits: its secondary area around target.
+
+    Empty for any other attack, and for a target outside the primary area.
+    """
+    pattern = range_patterns.find_pattern(attack.range_id)
+    if pattern is None or pattern.type != "two_stage":
+        return frozenset()
+    return pattern.evaluate(grid, origin, pattern_distance(pattern, attack), target=tuple(target))
+
+
+def in_range(grid, origin, target, attack):
+    target = tuple(target)
+    if range_patterns.find_pattern(attack.range_id) is not None:
+        return target in attack_area(grid, origin, attack)
+    distance = grid.hex_distance(origin, target)
+    if attack.kind == "melee":
+        return distance == 1
+    return 1 < distance <= attack.max_range and target in axis_sight(grid, origin, attack.max_range)
+
+
+def targets_in_range(grid, attacker, targets, attack):
+    """The targets attacker can hit with attack, in the order given."""
+    return [target for target in targets if target.position and in_range(grid, attacker.position, target.position, attack)]
+
+
+def resolve(grid, intents):
+    """Validate every intent's targets, then apply the hits; returns the CombatEvents in order.
+
+    All range and line-of-sight checks happen before any damage, so they share one set of
+    sight maps, and a target defeated by an earlier hit in the batch is not hit again. A
+    two_stage attack also hits every other unit in its splash_area around each target, once
+    per intent.
+    """
+    events = []
+    planned = []
+    for intent in intents:
+        struck = []
+        for target in intent.targets:
+            if target.position and intent.attacker.position and in_range(grid, intent.attacker.position, target.position, intent.attack):
+                planned.append((intent, target))
+                struck.append(target)
+            else:
+                events.append(CombatEvent(OUT_OF_RANGE, intent.attacker, target, intent.attack))
+        for target in list(struck):
+            for row, col in sorted(splash_area(grid, intent.attacker.position, target.position, intent.attack)):
+                unit = grid.grid[row][col]["unit"]
+                if unit is not None and unit is not intent.attacker and unit not in struck:
+                    planned.append((intent, unit))
+                    struck.append(unit)
+    for intent, target in planned:
+        for _ in range(intent.attack.hits):
+            if target.hp <= 0:
+                break
+            events.append(apply_hit(grid, intent.attacker, target, intent.attack))
+            if target.hp <= 0:
+                events.append(CombatEvent(DEFEATED, intent.attacker, target, intent.attack))
+                if target is grid.player:
+                    grid.game_over = True
+    return events
+
+
+def apply_hit(grid, attacker, target, attack):
+    damage = attack.damage
+    target.hp -= damage
+    target.set_damage_text(damage)
+    attacker.attack_flash = True
+    attacker.flash_start = pygame.time.get_ticks()
+    if grid.recorder:
+        grid.recorder.record_attack(attacker, target, damage)
+    return CombatEvent(HIT, attacker, target, attack, damage)
+
+
+def remove_defeated(grid, unit):
+    """Take a defeated unit off the board."""
+    grid.grid[unit.position[0]][unit.position[1]]["unit"] = None
+    grid.units.remove(unit)
+    if grid.recorder:
+        grid.recorder.record_defeat(unit)
+
+
+def settle_unit(grid, unit):
+    """The rules after a unit's turn: a two-state unit below 30% HP switches to its second state, and a unit
+    at 0 HP leaves the board. Returns (switch message or "", whether the unit was defeated)."""
+    switch_message = ""
+    if unit.states == 2 and unit.hp < unit.max_hp * 0.3:
+        switch_message = unit.switch_state()
+        grid.units.reindex(unit)
+        if switch_message and grid.recorder:
+            grid.recorder.record_switch(unit)
+    defeated = unit.hp <= 0
+    if defeated:
+        remove_defeated(grid, unit)
+    return switch_message, defeated
+
+
+def special_intents(player, target, grid):
+    """Intents for the player's class special attack aimed at target."""
+    special = SPECIAL_ATTACKS.get(player.special_attack)
+    if special is None:
+        return []
+    base = Attack.of_player(player, special["kind"])
+    attack = Attack(player.special_attack, base.kind, base.damage, base.max_range, base.range_id, special.get("hits", 1))
+    if special.get("area"):
+        targets = [unit for unit in grid.units.within(player.position, 1) if unit.allegiance != "Allied"]
+        return [Intent(player, targets, attack)] if target in targets else []
+    targets = [target]
+    if special.get("max_targets", 1) > 1:
+        others = [unit for unit in grid.units.within(player.position, attack.max_range, "Hostile") if unit is not target]
+        others = targets_in_range(grid, player, others, attack)
+        others.sort(key=lambda unit: grid.hex_distance(player.position, unit.position))
+        targets += others[:special["max_targets"] - 1]
+    return [Intent(player, targets, attack)]
+
+
+def hit_messages(events):
+    return [event.message for event in events if event.kind == HIT]
@@ -0,0 +1,150 @@
+from bisect import bisect_left, bisect_right, insort
+import crafting_solver
+
+# Which two-state cards in the inventory could be crafted right now, kept up to date as the
+# inventory changes. The crafting check is CraftingScreen's: the junk cards in state 1 (other than
+# the recipe itself) must add up to every "Requirements: ..." value and include each of the
+# "Requirements: Specific Cards" names.
+#
+# Material totals and name counts are running sums. Each recipe is reduced to thresholds those
+# sums must reach: per value dimension, the requirement plus whatever the recipe itself
+# contributes (it cannot be spent on itself), and per specific name, 1 (2 if the recipe has that
+# name). Recipes sit in one sorted threshold list per dimension, so when a total moves from a to b
+# only the recipes with a threshold between a and b change state; those are found by bisection.
+
+
+def is_recipe(card, category):
+    if not card.is_two_state() or card.current_state != 1:
+        return False
+    return category == "junk" or (category == "documents" and card.card_data.get("subclass", "") == "Blueprint")
+
+
+class Recipe:
+    __slots__ = ("card", "name", "thresholds", "names", "unmet")
+
+    def __init__(self, card, name, thresholds, names):
+        self.card = card
+        self.name = name
+        self.thresholds = thresholds  # Per value dimension
+        self.names = names            # {specific name: count of that name needed}
+        self.unmet = 0
+
+
+class CraftingIndex:
+    """Craftable recipes in an inventory_model.Inventory, updated on each card_added/card_removed.
+
+    craftable() lists them sorted by name; version changes whenever that list
+    may have, for the HUD badge and the crafting screen to poll.
+    """
+    def __init__(self, inventory):
+        self.totals = [0] * len(crafting_solver.REQUIREMENT_TO_VALUE)
+        self.name_counts = {}
+        self.contributions = {}  # Material card -> the values it added to totals
+        self.recipes = {}        # Recipe card -> Recipe
+        self.recipe_ids = {}     # id(recipe card) -> Recipe, for the threshold lists
+        self.by_dimension = [[] for _ in self.totals]  # Sorted (threshold, id(card)) per dimension
+        self.by_name = {}        # Specific name -> recipes that need it
+        self.ready = {}          # Recipe card -> Recipe, for the ones with nothing unmet
+        self.version = 0
+        inventory.watchers.append(self)
+        for card in inventory:
+            category, name = inventory.cards[card]
+            self.card_added(card, category, name)
+
+    def __len__(self):
+        return len(self.ready)
+
+    def craftable(self):
+        """The craftable recipe cards, sorted by name."""
+        return [recipe.card for recipe in sorted(self.ready.values(), key=lambda recipe: recipe.name)]
+
+    def is_craftable(self, card):
+        return card in self.ready
+
+    def card_added(self, card, category, name):
+        if category == "junk":
+            values = crafting_solver.values_of(card)
+            self.contributions[card] = (values, name)
+            for d, value in enumerate(values):
+                self.move_total(d, value)
+            self.move_name_count(name, 1)
+        if is_recipe(card, category):
+            self.add_recipe(card, name)
+
+    def card_removed(self, card, category, name):
+        if card in self.recipes:
+            self.remove_recipe(card)
+        if card in self.contributions:
+            values, name = self.contributions.pop(card)
+            for d, value in enumerate(values):
+                self.move_total(d, -value)
+            self.move_name_count(name, -1)
+
+    def move_total(self, d, delta):
+        if not delta:
+            return
+        old = self.totals[d]
+        new = self.totals[d] = old + delta
+        entries = self.by_dimension[d]
+        # Thresholds in (old, new] become met, those in (new, old] unmet
+        low, high = (old, new) if delta > 0 else (new, old)
+        start = bisect_right(entries, (low, float('inf')))
+        end = bisect_right(entries, (high, float('inf')))
+        for _, key in entries[start:end]:
+            self.change_unmet(self.recipe_ids[key], -1 if delta > 0 else 1)
+
+    def move_name_count(self, name, delta):
+        old = self.name_counts.get(name, 0)
+        new = old + delta
+        if new:
+            self.name_counts[name] = new
+        else:
+            del self.name_counts[name]
+        for recipe in self.by_name.get(name, ()):
+            needed = recipe.names[name]
+            if old < needed <= new:
+                self.change_unmet(recipe, -1)
+            elif new < needed <= old:
+                self.change_unmet(recipe, 1)
+
+    def change_unmet(self, recipe, delta):
+        recipe.unmet += delta
+        if recipe.unmet == 0:
+            self.ready[recipe.card] = recipe
+            self.version += 1
+        elif recipe.card in self.ready:
+            del self.ready[recipe.card]
+            self.version += 1
+
+    def add_recipe(self, card, name):
+        required, names = crafting_solver.requirements_of(card)
+        own_values, own_name = self.contributions.get(card, ((0,) * len(required), None))
+        thresholds = tuple(r + own for r, own in zip(required, own_values))
+        needed = {specific: 2 if specific == own_name else 1 for specific in names}
+        recipe = Recipe(card, name, thresholds, needed)
+        self.recipes[card] = recipe
+        self.recipe_ids[id(card)] = recipe
+        for d, threshold in enumerate(thresholds):
+            insort(self.by_dimension[d], (threshold, id(card)))
+            if self.totals[d] < threshold:
+                recipe.unmet += 1
+        for specific, count in needed.items():
+            self.by_name.setdefault(specific, []).append(recipe)
+            if self.name_counts.get(specific, 0) < count:
+                recipe.unmet += 1
+        if recipe.unmet == 0:
+            self.ready[card] = recipe
+            self.version += 1
+
+    def remove_recipe(self, card):
+        recipe = self.recipes.pop(card)
+        del self.recipe_ids[id(card)]
+        for d, threshold in enumerate(recipe.thresholds):
+            entries = self.by_dimension[d]
+            del entries[bisect_left(entries, (threshold, id(card)))]
+        for specific in recipe.names:
+            self.by_name[specific].remove(recipe)
+            if not self.by_name[specific]:
+                del self.by_name[specific]
+        if self.ready.pop(card, None) is not None:
+            self.version += 1
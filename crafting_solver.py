@@ -0,0 +1,318 @@
+import itertools
+import time
+
+# Picks the junk cards to spend on a craft. A recipe (the state 1 data of a two-state card) asks for
+# amounts of four material values plus, optionally, specific cards by name; the solver finds the set
+# of materials that meets all of them with the least waste (value provided beyond what is required,
+# then fewest cards), or says which requirement cannot be met.
+REQUIREMENT_TO_VALUE = {
+    "Requirements: Raw Materials": "Raw Material Value",
+    "Requirements: Refined Materials": "Refined Material Value",
+    "Requirements: Wood": "Wood Value",
+    "Requirements: Metal": "Metal Value"
+}
+SPECIFIC_CARDS_KEY = "Requirements: Specific Cards"
+FRAME_BUDGET_MS = 8       # Time the exact search may take before settling for the best plan found so far
+SPECIFIC_CHOICE_LIMIT = 16  # Combinations of differing specific-card copies worth trying
+GREEDY_RESCAN_TYPES = 64
+CARD_COST = 1             # Tie-break: among equal waste, fewer cards
+VALUE_COST = 1000         # One point of material value outweighs any number of cards
+
+
+def int_value_of(value):
+    try:
+        return int(value or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def requirement_name(req_key):
+    return req_key.split(": ")[1]
+
+
+def requirements_of(card):
+    """(the four required amounts, the names of the specific cards required) for a recipe card."""
+    data = card.get_state_data(1)
+    amounts = tuple(int_value_of(data.get(req_key)) for req_key in REQUIREMENT_TO_VALUE)
+    specific = data.get(SPECIFIC_CARDS_KEY, "") or ""
+    names = list(dict.fromkeys(name.strip() for name in specific.split(",") if name.strip()))
+    return amounts, names
+
+
+def values_of(card):
+    return tuple(int_value_of(card.get_value(val_key)) for val_key in REQUIREMENT_TO_VALUE.values())
+
+
+class CraftPlan:
+    """The solver's answer. materials is empty and problems lists the unmet requirements when the craft is impossible."""
+    def __init__(self, materials, required, provided, problems=(), optimal=True):
+        self.materials = materials
+        self.required = required
+        self.provided = provided
+        self.problems = list(problems)
+        self.optimal = optimal
+
+    @property
+    def feasible(self):
+        return not self.problems
+
+    @property
+    def waste(self):
+        """Material value spent beyond the requirements."""
+        return sum(self.provided) - sum(self.required) if self.feasible else 0
+
+    def __repr__(self):
+        return f"CraftPlan({len(self.materials)} cards, waste {self.waste}, problems {self.problems})"
+
+
+class SearchTimeout(Exception):
+    pass
+
+
+class CoverSearch:
+    """Cheapest multiset of item types covering a requirement vector.
+
+    Items with the same value vector form one type with a count, so an
+    inventory of hundreds of duplicate junk cards is a few dozen types.
+    Depth-first over the types with branch and bound, bounding the rest of
+    the cost from the remaining requirement and the best value density the
+    remaining types offer in each dimension. Results per (type, remaining
+    requirement) are memoized: exact costs once a subtree is solved, lower
+    bounds when it is cut off by the incumbent.
+    """
+    def __init__(self, types, deadline):
+        self.types = types  # [(vector, cost, count)], best first
+        self.deadline = deadline
+        self.exact = {}
+        self.lower = {}
+        self.nodes = 0
+        dims = len(types[0][0]) if types else 0
+        # suffix[i]: what types i.. can provide at most, per dimension; density[i]: the most value
+        # in each dimension any of types i.. buys per unit of cost
+        self.suffix = [(0,) * dims] * (len(types) + 1)
+        self.density = [(0.0,) * dims] * (len(types) + 1)
+        for i in range(len(types) - 1, -1, -1):
+            vector, cost, count = types[i]
+            self.suffix[i] = tuple(total + value * count for total, value in zip(self.suffix[i + 1], vector))
+            self.density[i] = tuple(max(best, value / cost) for best, value in zip(self.density[i + 1], vector))
+
+    def recount(self, counts, deadline):
+        """Search the same types again with counts (none above the original ones), until deadline.
+
+        suffix keeps the original counts: a looser bound, so it only prunes less.
+        """
+        self.types = [(vector, cost, count) for (vector, cost, _), count in zip(self.types, counts)]
+        self.deadline = deadline
+        self.exact = {}
+        self.lower = {}
+
+    def solve(self, need, cost, counts):
+        """Improve on the plan counts (taken per type) costing cost.
+
+        Returns (cost, counts, proven optimal); when the deadline passes,
+        the best plan found so far. With counts None, cost is only a bound:
+        counts comes back None if nothing cheaper exists.
+        """
+        self.best = (cost, list(counts) if counts is not None else None)
+        self.path = []
+        try:
+            self.search(0, need, cost, 0)
+        except SearchTimeout:
+            return self.best + (False,)
+        return self.best + (True,)
+
+    def record(self, total, counts):
+        if total < self.best[0]:
+            self.best = (total, counts + [0] * (len(self.types) - len(counts)))
+
+    def completion(self, i, need):
+        """Counts for types i.. in the memoized optimum from (i, need)."""
+        counts = []
+        while any(need):
+            taken = self.exact[(i, need)][1]
+            counts.append(taken)
+            need = tuple(max(0, n - taken * v) for n, v in zip(need, self.types[i][0]))
+            i += 1
+        return counts
+
+    def search(self, i, need, limit, spent_before):
+        """Cheapest cost of covering need with types i.., if below limit; None otherwise."""
+        if not any(need):
+            self.record(spent_before, list(self.path))
+            return 0
+        if i == len(self.types):
+            return None
+        limit = min(limit, self.best[0] - spent_before)
+        key = (i, need)
+        known = self.exact.get(key)
+        if known is not None:
+            if known[0] >= limit:
+                return None
+            self.record(spent_before + known[0], self.path + self.completion(i, need))
+            return known[0]
+        if any(n > s for n, s in zip(need, self.suffix[i])):
+            self.lower[key] = float('inf')
+            return None
+        # Every point of need costs VALUE_COST, and covering one dimension alone costs at least its
+        # need over the best density left for it
+        bound = max(sum(need) * VALUE_COST, self.lower.get(key, 0),
+                    max(n / d for n, d in zip(need, self.density[i]) if n > 0))
+        if bound >= limit:
+            return None
+        self.nodes += 1
+        if self.nodes % 32 == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        vector, cost, count = self.types[i]
+        useful = [(n + v - 1) // v for n, v in zip(need, vector) if n > 0 and v > 0]
+        most = min(count, max(useful)) if useful else 0
+        best = None
+        for taken in range(most, -1, -1):
+            spent = taken * cost
+            cap = (best[0] if best else limit) - spent
+            if cap <= 0:
+                continue
+            self.path.append(taken)
+            rest = self.search(i + 1, tuple(max(0, n - taken * v) for n, v in zip(need, vector)), cap, spent_before + spent)
+            self.path.pop()
+            if rest is not None:
+                best = (spent + rest, taken)
+        if best is None:
+            self.lower[key] = max(self.lower.get(key, 0), limit)
+            return None
+        self.exact[key] = best
+        return best[0]
+
+
+def card_cost(vector):
+    return sum(vector) * VALUE_COST + CARD_COST
+
+
+def greedy_cover(types, need):
+    """A quick feasible plan: repeatedly take the card covering the most of what is left per unit of cost.
+
+    With many distinct types that rescan gets slow, so past GREEDY_RESCAN_TYPES
+    the types are walked once in their best-first order instead.
+    """
+    counts = [0] * len(types)
+    need = list(need)
+    if len(types) > GREEDY_RESCAN_TYPES:
+        for i, (vector, _, count) in enumerate(types):
+            while counts[i] < count and any(n > 0 and v > 0 for n, v in zip(need, vector)):
+                counts[i] += 1
+                need = [max(0, n - v) for n, v in zip(need, vector)]
+            if not any(need):
+                return counts
+        return None
+    while any(need):
+        best, best_score = None, 0
+        for i, (vector, cost, count) in enumerate(types):
+            if counts[i] < count:
+                covered = sum(min(n, v) for n, v in zip(need, vector))
+                if covered and covered / cost > best_score:
+                    best, best_score = i, covered / cost
+        if best is None:
+            return None
+        counts[best] += 1
+        need = [max(0, n - v) for n, v in zip(need, types[best][0])]
+    return counts
+
+
+def trim(types, counts, need):
+    """Remove cards, most expensive first, while the rest still cover need."""
+    provided = [sum(vector[d] * counts[i] for i, (vector, _, _) in enumerate(types)) for d in range(len(need))]
+    for i in sorted(range(len(types)), key=lambda i: -types[i][1]):
+        vector = types[i][0]
+        while counts[i] and all(p - v >= n for p, v, n in zip(provided, vector, need)):
+            counts[i] -= 1
+            provided = [p - v for p, v in zip(provided, vector)]
+    return counts
+
+
+def group_cards(pool, values, need):
+    """pool's cards by value vector; cards that provide nothing needed are left out."""
+    groups = {}
+    for card in pool:
+        vector = values[card]
+        if any(v > 0 and n > 0 for v, n in zip(vector, need)):
+            groups.setdefault(vector, []).append(card)
+    return groups
+
+
+def best_first(types, need):
+    """CoverSearch types that help with need, most of need covered per unit of cost first."""
+    types = [t for t in types if t[2] > 0 and any(v > 0 and n > 0 for v, n in zip(t[0], need))]
+    return sorted(types, key=lambda t: -sum(min(n, v) for n, v in zip(need, t[0])) / t[1])
+
+
+def solve(recipe, materials, budget_ms=FRAME_BUDGET_MS):
+    """Plan the materials for crafting recipe out of materials (InventoryCards, the recipe itself excluded)."""
+    deadline = time.perf_counter() + budget_ms / 1000.0
+    required, names = requirements_of(recipe)
+    materials = [card for card in materials if card is not recipe]
+    values = {card: values_of(card) for card in materials}
+    problems = []
+
+    # Specific cards are mandatory: one card of each name. Copies of a name normally share their
+    # values, but when they do not, every distinct choice is tried (up to SPECIFIC_CHOICE_LIMIT).
+    options = []
+    by_name = {}
+    for card in materials:
+        by_name.setdefault(card.get_value("Name", "Unnamed"), []).append(card)
+    for name in names:
+        copies = {}
+        for card in by_name.get(name, ()):
+            copies.setdefault(values[card], card)
+        if copies:
+            options.append(sorted(copies.values(), key=lambda card: sum(values[card])))
+        else:
+            problems.append(f"Specific Cards: missing {name}")
+
+    dims = range(len(required))
+    available = [sum(values[card][d] for card in materials) for d in dims]
+    for req_key, r, a in zip(REQUIREMENT_TO_VALUE, required, available):
+        if r > a:
+            problems.append(f"{requirement_name(req_key)}: need {r}, only {a} available")
+    if problems:
+        return CraftPlan([], required, tuple(available), problems)
+
+    # Grouped, ordered and bounded once for the whole requirement. Each choice of specific cards only
+    # takes its copies out of the counts and searches, until the deadline, for a plan cheaper than the
+    # best found so far; the deadline is checked before each choice, as the search checks it
+    groups = group_cards(materials, values, required)
+    types = best_first([(vector, card_cost(vector), len(cards)) for vector, cards in groups.items()], required)
+    search = CoverSearch(types, deadline)
+    best = None
+    optimal = True
+    choices = list(itertools.islice(itertools.product(*options), SPECIFIC_CHOICE_LIMIT))
+    for number, chosen in enumerate(choices):
+        now = time.perf_counter()
+        if number and now > deadline:
+            optimal = False  # Choices left untried
+            break
+        taken = set(chosen)
+        need = tuple(max(0, r - sum(values[card][d] for card in chosen)) for d, r in zip(dims, required))
+        chosen_cost = sum(card_cost(values[card]) for card in chosen)
+        choice_types = [(vector, cost, count - sum(values[card] == vector for card in chosen))
+                        for vector, cost, count in types]
+        counts = greedy_cover(choice_types, need)
+        if counts is None:
+            continue
+        counts = trim(choice_types, counts, need)
+        cost = sum(c * t[1] for c, t in zip(counts, choice_types))
+        if best is not None and best[0] - chosen_cost <= cost:
+            counts, cost = None, best[0] - chosen_cost  # Only a plan cheaper than the best so far is of interest
+            if cost <= 0:
+                continue
+        search.recount([count for _, _, count in choice_types], deadline)
+        cost, counts, proven = search.solve(need, cost, counts)
+        optimal = optimal and proven
+        if counts is not None:
+            picked = [card for (vector, _, _), c in zip(choice_types, counts) if c
+                      for card in [card for card in groups[vector] if card not in taken][:c]]
+            best = (cost + chosen_cost, list(chosen) + picked)
+    if best is None:
+        # Every way of taking the specific cards uses up material some value requirement needed
+        return CraftPlan([], required, tuple(available), ["Specific Cards: the named cards leave too little material for the rest"])
+    picked = best[1]
+    provided = tuple(sum(values[card][d] for card in picked) for d in dims)
+    return CraftPlan(picked, required, provided, optimal=optimal)
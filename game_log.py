@@ -0,0 +1,155 @@
+import atexit
+import os
+import threading
+import time
+from collections import deque
+
+# The game screen's message log. GameLog keeps the last VISIBLE_LINES messages for the log box and
+# saves; the box itself is only touched once per frame, from refresh(), which appends just the lines
+# added since the last frame, or rebuilds it from the buffer once it would show more than VISIBLE_LINES. Every message also goes to logs/transcript.log through a background
+# TranscriptWriter, rotated at TRANSCRIPT_MAX_BYTES with TRANSCRIPT_BACKUPS old files kept.
+LOG_DIR = "logs"
+TRANSCRIPT_FILE = os.path.join(LOG_DIR, "transcript.log")
+TRANSCRIPT_MAX_BYTES = 1024 * 1024
+TRANSCRIPT_BACKUPS = 3
+VISIBLE_LINES = 10
+LINE_HTML = "<font color='#FFFFFF' size=4>{}</font>"
+
+
+class TranscriptWriter:
+    """Appends lines to a rotating transcript file on a background thread."""
+    def __init__(self, path=TRANSCRIPT_FILE, max_bytes=TRANSCRIPT_MAX_BYTES, backups=TRANSCRIPT_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.last_error = None
+        self.thread = threading.Thread(target=self._run, name="transcript", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+        self.write(f"=== Session started {time.strftime('%Y-%m-%d %H:%M:%S')} ===")
+
+    def write(self, line):
+        with self.condition:
+            self.queue.append(f"[{time.strftime('%H:%M:%S')}] {line}\n")
+            self.condition.notify()
+
+    def close(self):
+        """Write out everything queued and stop the thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.queue and not self.closed:
+                    self.condition.wait()
+                lines = list(self.queue)
+                self.queue.clear()
+                closed = self.closed
+            if lines:
+                try:
+                    self._append(lines)
+                except Exception as e:
+                    self.last_error = e
+                    print(f"Error writing transcript {self.path}: {e}")
+            if closed:
+                return
+
+    def _append(self, lines):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        f = open(self.path, 'a', encoding='utf-8')
+        try:
+            for line in lines:
+                length = len(line.encode('utf-8'))
+                if size and size + length > self.max_bytes:
+                    f.close()
+                    self._rotate()
+                    f = open(self.path, 'a', encoding='utf-8')
+                    size = 0
+                f.write(line)
+                size += length
+        finally:
+            f.close()
+
+    def _rotate(self):
+        # transcript.log -> transcript.log.1 -> ... -> transcript.log.<backups>, dropping the oldest
+        for index in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{index}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{index + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+
+class GameLog:
+    """Ring buffer of recent messages behind the game screen's log box.
+
+    append() only queues the message; refresh(), called once per frame, hands the
+    box every message queued since the last frame in one append_html_text call.
+    Iterating gives the buffered messages, oldest first.
+    """
+    def __init__(self, capacity=VISIBLE_LINES, transcript=None):
+        self.lines = deque(maxlen=capacity)
+        self.pending = deque(maxlen=capacity)  # Older unshown lines are no longer in the buffer either
+        self.transcript = transcript
+        self.textbox = None
+        self.box_lines = 0  # Lines in the box since it was last rebuilt
+        self.needs_rebuild = True
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __len__(self):
+        return len(self.lines)
+
+    def append(self, message):
+        if not message:
+            return
+        self.lines.append(message)
+        self.pending.append(message)
+        if self.transcript:
+            self.transcript.write(message)
+
+    def extend(self, messages):
+        for message in messages:
+            self.append(message)
+
+    def clear(self):
+        self.lines.clear()
+        self.pending.clear()
+        self.needs_rebuild = True
+
+    def reset(self, messages):
+        """Replace the buffer with saved messages; they are not written to the transcript again."""
+        self.clear()
+        self.lines.extend(messages)
+
+    def attach(self, textbox):
+        """Show the log in textbox; the box it is already shown in keeps its text."""
+        if textbox is not self.textbox:
+            self.textbox = textbox
+            self.needs_rebuild = True
+
+    def refresh(self):
+        if self.textbox is None:
+            return
+        if self.needs_rebuild or self.box_lines + len(self.pending) > self.lines.maxlen:
+            # Start over from the buffer so the box never shows more than it holds
+            self.textbox.set_text(LINE_HTML.format("<br>".join(self.lines)))
+            self.box_lines = len(self.lines)
+            self.needs_rebuild = False
+        elif self.pending:
+            separator = "<br>" if self.box_lines else ""
+            self.textbox.append_html_text(separator + LINE_HTML.format("<br>".join(self.pending)))
+            self.box_lines += len(self.pending)
+        self.pending.clear()
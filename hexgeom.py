@@ -0,0 +1,149 @@
+try:
+    import numpy as np
+except ImportError:  # NumPy is optional; everything below has a pure-Python fallback
+    np = None
+
+# Neighbor offsets (row, col) for even and odd columns, matching HexGrid.get_neighbors
+EVEN_COL_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1)]
+ODD_COL_OFFSETS = [(-1, 0), (1, 0), (0, -1), (0, 1), (1, -1), (1, 1)]
+
+GEOMETRY_CACHE = {}
+
+
+def get_geometry(rows, cols):
+    """Shared HexGeometry for a board size; the coordinate arrays are built once per size."""
+    key = (rows, cols)
+    if key not in GEOMETRY_CACHE:
+        GEOMETRY_CACHE[key] = HexGeometry(rows, cols)
+    return GEOMETRY_CACHE[key]
+
+
+def offset_to_cube(row, col):
+    x = col
+    z = row - (col // 2)
+    return x, -x - z, z
+
+
+class HexGeometry:
+    """Whole-board hex geometry as array operations.
+
+    Cube coordinates for every cell are precomputed once, so distance maps and
+    ring/disc/parity masks are a few vectorized operations instead of a Python
+    loop per hex, and flood fills (movement-style ranges) advance a whole
+    frontier per step. Masks are rows x cols boolean arrays with NumPy, or
+    lists of lists of bools without it; cells() turns either into a set of
+    (row, col).
+    """
+    def __init__(self, rows, cols):
+        self.rows = rows
+        self.cols = cols
+        if np is not None:
+            col_index = np.arange(cols)
+            self.x = np.broadcast_to(col_index, (rows, cols)).copy()
+            self.z = np.arange(rows)[:, None] - (col_index // 2)[None, :]
+            self.y = -self.x - self.z
+            self.odd_cols = np.broadcast_to(col_index % 2 == 1, (rows, cols)).copy()
+        else:
+            self.x = [[col for col in range(cols)] for _ in range(rows)]
+            self.z = [[row - col // 2 for col in range(cols)] for row in range(rows)]
+            self.y = [[-col - (row - col // 2) for col in range(cols)] for row in range(rows)]
+
+    def distance_map(self, origin):
+        """Hex distance from origin to every cell."""
+        ox, oy, oz = offset_to_cube(*origin)
+        if np is not None:
+            return np.maximum(np.maximum(np.abs(self.x - ox), np.abs(self.y - oy)), np.abs(self.z - oz))
+        return [[max(abs(col - ox), abs(y - oy), abs(z - oz)) for col, y, z in zip(range(self.cols), y_row, z_row)]
+                for y_row, z_row in zip(self.y, self.z)]
+
+    def disc_mask(self, origin, radius, inner=0):
+        """Cells with inner <= distance <= radius."""
+        distances = self.distance_map(origin)
+        if np is not None:
+            return (distances >= inner) & (distances <= radius)
+        return [[inner <= d <= radius for d in row] for row in distances]
+
+    def ring_mask(self, origin, radius):
+        return self.disc_mask(origin, radius, radius)
+
+    def parity_mask(self, origin, radius, parity):
+        """Cells within radius whose distance is odd (parity 1) or even (parity 0, origin included)."""
+        distances = self.distance_map(origin)
+        if np is not None:
+            return (distances <= radius) & (distances % 2 == parity)
+        return [[d <= radius and d % 2 == parity for d in row] for row in distances]
+
+    def passable_mask(self, grid, units_block=True):
+        """Accessible cells of a HexGrid-style grid[row][col] board; occupied cells too unless units_block."""
+        if units_block:
+            cells = [[cell["accessible"] and cell.get("unit") is None for cell in grid.grid[row]] for row in range(self.rows)]
+        else:
+            cells = [[cell["accessible"] for cell in grid.grid[row]] for row in range(self.rows)]
+        return np.array(cells, dtype=bool) if np is not None else cells
+
+    def dilate(self, mask, odd_cols=None):
+        """Cells adjacent to any cell in mask (mask itself only where adjacent to another mask cell)."""
+        if np is not None:
+            odd_cols = self.odd_cols if odd_cols is None else odd_cols
+            rows, cols = mask.shape
+            padded = np.zeros((rows + 2, cols + 2), dtype=bool)
+            padded[1:-1, 1:-1] = mask
+            # at(dr, dc)[row, col] is mask[row + dr, col + dc], False off the board
+            at = lambda dr, dc: padded[1 + dr:1 + dr + rows, 1 + dc:1 + dc + cols]
+            sides = at(0, -1) | at(0, 1)
+            return at(-1, 0) | at(1, 0) | np.where(odd_cols, sides | at(1, -1) | at(1, 1), sides | at(-1, -1) | at(-1, 1))
+        grown = [[False] * self.cols for _ in range(self.rows)]
+        for row in range(self.rows):
+            for col in range(self.cols):
+                offsets = ODD_COL_OFFSETS if col % 2 else EVEN_COL_OFFSETS
+                grown[row][col] = any(0 <= row + dr < self.rows and 0 <= col + dc < self.cols and mask[row + dr][col + dc]
+                                      for dr, dc in offsets)
+        return grown
+
+    def reach_mask(self, origin, steps, passable):
+        """Cells reachable from origin in at most steps moves through passable cells (origin always included)."""
+        if np is not None:
+            # Only the window that steps moves can cover is flooded
+            row_reach = steps + steps // 2 + 1
+            window = (slice(max(0, origin[0] - row_reach), min(self.rows, origin[0] + row_reach + 1)),
+                      slice(max(0, origin[1] - steps), min(self.cols, origin[1] + steps + 1)))
+            odd_cols = self.odd_cols[window]
+            open_cells = passable[window]
+            reached = np.zeros(odd_cols.shape, dtype=bool)
+            reached[origin[0] - window[0].start, origin[1] - window[1].start] = True
+            frontier = reached
+            for _ in range(steps):
+                frontier = self.dilate(frontier, odd_cols) & open_cells & ~reached
+                if not frontier.any():
+                    break
+                reached |= frontier
+            result = np.zeros((self.rows, self.cols), dtype=bool)
+            result[window] = reached
+            return result
+        reached = [[False] * self.cols for _ in range(self.rows)]
+        reached[origin[0]][origin[1]] = True
+        frontier = [origin]
+        for _ in range(steps):
+            next_frontier = []
+            for row, col in frontier:
+                for dr, dc in ODD_COL_OFFSETS if col % 2 else EVEN_COL_OFFSETS:
+                    r, c = row + dr, col + dc
+                    if 0 <= r < self.rows and 0 <= c < self.cols and passable[r][c] and not reached[r][c]:
+                        reached[r][c] = True
+                        next_frontier.append((r, c))
+            frontier = next_frontier
+        return reached
+
+    def combine(self, *masks):
+        """Logical AND of masks."""
+        if np is not None:
+            result = masks[0].copy()
+            for mask in masks[1:]:
+                result &= mask
+            return result
+        return [[all(mask[row][col] for mask in masks) for col in range(self.cols)] for row in range(self.rows)]
+
+    def cells(self, mask):
+        if np is not None:
+            return set(zip(*(index.tolist() for index in np.nonzero(mask))))
+        return {(row, col) for row in range(self.rows) for col in range(self.cols) if mask[row][col]}
@@ -8,6 +8,13 @@ from collections import deque
 from player import Player  # Import Player for type checking
 from unit import Unit      # Import Unit for instantiation
 from inventory_card import InventoryCard
+from animation import AnimationManager
+from chunked_map import ChunkStore
+from unit_registry import UnitRegistry
+import hexgeom
+import range_patterns
+
+RANGE_CACHE_LIMIT = 512  # Memoized two-stage ranges kept per occupancy_version
 
 # Hexagonal directions for LOS
 DIRECTIONS = [
@@ -23,7 +30,11 @@ class HexGrid:
         # Grid stores a dict with "unit" and "accessible" keys
         self.grid = [[{"unit": None, "accessible": True} for _ in range(cols)] for _ in range(rows)]
         self.player = None
-        self.units = []
+        self.occupancy_version = 0  # Bumped whenever a unit or obstacle changes; keys range caches
+        self.passable_cache = None
+        self.range_cache = {}  # Two-stage range results and cell bitsets, valid for range_cache_version
+        self.range_cache_version = None
+        self.units = UnitRegistry(self)
         self.selected_hex = None
         self.card_drawing_hexes = []
         self.deck_data = {}
@@ -35,17 +46,29 @@ class HexGrid:
         # Font for rendering unit names and damage text
         self.font = pygame.font.Font(None, 18)
         self.game_over = False  # Flag to indicate if the player is defeated
+        self.recorder = None  # Optional replay.ReplayRecorder
+        self.animations = AnimationManager(self)
+        # Drawing caches
+        self.hex_surface = None
+        self.corner_offsets = []
+        self.corner_offsets_size = None
+        self.image_cache = {}
 
     def load_level(self, level_file, card_manager, player):
         try:
             with open(level_file, 'r') as f:
                 level_data = json.load(f)
+            self.animations.cancel_all()
+            if level_data.get("chunked"):
+                self.load_world(os.path.dirname(level_file), level_data, card_manager, player)
+                return
             # Set grid dimensions from the level file
             self.rows = level_data["grid"]["rows"]
             self.cols = level_data["grid"]["columns"]
             self.hex_size = level_data.get("hex_size", 30)  # Default to 30 if not specified
             # Rebuild the grid with the new dimensions
             self.grid = [[{"unit": None, "accessible": True} for _ in range(self.cols)] for _ in range(self.rows)]
+            self.occupancy_changed()
             self.card_drawing_hexes = level_data.get("card_drawing_hexes", [])
             
             # Mark inaccessible hexes
@@ -53,6 +76,8 @@ class HexGrid:
                 row, col = hex["row"], hex["column"]
                 if 0 <= row < self.rows and 0 <= col < self.cols:
                     self.grid[row][col]["accessible"] = False
+            if self.recorder:
+                self.recorder.record_level(self)
             
             # Place the player at the specified start position
             player_start = level_data.get("player_start")
@@ -77,16 +102,7 @@ class HexGrid:
                 })
 
             # Preload deck data for card-drawing hexes
-            for hex_data in self.card_drawing_hexes:
-                if "deck_file" in hex_data and hex_data["deck_file"]:
-                    deck_file = os.path.join("decks", hex_data["deck_file"])
-                    if deck_file not in self.deck_data:
-                        try:
-                            with open(deck_file, 'r') as df:
-                                self.deck_data[deck_file] = json.load(df)
-                            print(f"Loaded deck: {deck_file}, contents: {self.deck_data[deck_file]}")
-                        except Exception as e:
-                            print(f"Error loading deck {deck_file}: {e}")
+            self.load_decks()
             
             # Recalculate view offsets based on new grid size
             grid_width = self.cols * self.hex_size * 1.5
@@ -99,9 +115,124 @@ class HexGrid:
             # Fallback to default setup only on error
             self.rows, self.cols, self.hex_size = 16, 24, 30
             self.grid = [[{"unit": None, "accessible": True} for _ in range(self.cols)] for _ in range(self.rows)]
+            self.occupancy_changed()
+            if self.recorder:
+                self.recorder.record_level(self)
             if player:
                 self.place_unit(player, self.rows // 2, self.cols // 2)
 
+    def load_world(self, world_dir, manifest, card_manager, player, visited=None):
+        """Open a chunked world (see chunked_map); cells and units load around the player as needed."""
+        self.rows = manifest["grid"]["rows"]
+        self.cols = manifest["grid"]["columns"]
+        self.hex_size = manifest.get("hex_size", 30)
+        self.grid = ChunkStore(self, world_dir, manifest, card_manager, visited)
+        self.occupancy_changed()
+        self.card_drawing_hexes = manifest.get("card_drawing_hexes", [])
+        if self.recorder:
+            self.recorder.record_level(self)
+        player_start = manifest.get("player_start")
+        start = (player_start["row"], player_start["column"]) if player_start else (self.rows // 2, self.cols // 2)
+        self.center_on(*start)
+        if player:
+            self.place_unit(player, *start)
+        self.load_decks()
+
+    def load_decks(self):
+        """Load the decks of the card-drawing hexes that are not loaded yet."""
+        for hex_data in self.card_drawing_hexes:
+            if hex_data.get("deck_file"):
+                deck_file = os.path.join("decks", hex_data["deck_file"])
+                if deck_file not in self.deck_data:
+                    try:
+                        with open(deck_file, 'r') as df:
+                            self.deck_data[deck_file] = json.load(df)
+                    except Exception as e:
+                        print(f"Error loading deck {deck_file}: {e}")
+
+    def occupancy_changed(self):
+        self.occupancy_version += 1
+
+    @property
+    def geometry(self):
+        """Vectorized whole-board geometry (see hexgeom); None for chunked worlds, which are never materialized whole."""
+        return None if self.chunked else hexgeom.get_geometry(self.rows, self.cols)
+
+    def get_passable_mask(self):
+        """Accessible, unoccupied cells as a hexgeom mask, rebuilt only when occupancy_version changes."""
+        key = (self.occupancy_version, self.rows, self.cols)
+        if self.passable_cache is None or self.passable_cache[0] != key:
+            self.passable_cache = (key, self.geometry.passable_mask(self))
+        return self.passable_cache[1]
+
+    def get_range_cache(self):
+        if self.range_cache_version != (self.occupancy_version, self.rows, self.cols):
+            self.range_cache = {}
+            self.range_cache_version = (self.occupancy_version, self.rows, self.cols)
+        return self.range_cache
+
+    def get_cell_bits(self, pad, blocking):
+        """range_patterns.board_bits for this board, rebuilt only when occupancy_version changes."""
+        cache = self.get_range_cache()
+        key = ("cells", pad, blocking)
+        if key not in cache:
+            cache[key] = range_patterns.board_bits(self, pad, blocking)
+        return cache[key]
+
+    def get_two_stage_range(self, origin, primary, secondary, distance=None, secondary_distance=None, target=None):
+        """Apply primary from origin to find target hexes, then secondary around them (only around target if given).
+
+        primary and secondary are RangePatterns or range ids. Results are memoized per origin,
+        patterns and distances until occupancy_version changes, so hovering over the same splash
+        attack every frame costs a dict lookup.
+        """
+        library = range_patterns.get_library()
+        primary = library.get(primary) if isinstance(primary, str) else primary
+        secondary = library.get(secondary) if isinstance(secondary, str) else secondary
+        cache = self.get_range_cache()
+        key = ("two_stage", tuple(origin), primary.id, secondary.id, distance, secondary_distance,
+               tuple(target) if target is not None else None)
+        if key not in cache:
+            if len(cache) > RANGE_CACHE_LIMIT:
+                cache.clear()
+            primary_hexes = primary.evaluate(self, origin, distance)
+            if target is not None:
+                centers = [tuple(target)] if tuple(target) in primary_hexes else []
+            else:
+                centers = primary_hexes
+            cache[key] = frozenset(secondary.evaluate_many(self, centers, secondary_distance))
+        return cache[key]
+
+    def get_reachable_mask(self, start, movement):
+        """get_movement_range as a whole-board mask (not for chunked worlds)."""
+        return self.geometry.reach_mask(start, movement, self.get_passable_mask())
+
+    @property
+    def chunked(self):
+        return isinstance(self.grid, ChunkStore)
+
+    def update_streaming(self):
+        """Pin the chunks around the player and on screen, evicting the rest past the budget (chunked worlds only)."""
+        if self.chunked:
+            info = pygame.display.Info()
+            self.grid.update(self.player.position if self.player else None,
+                             self.get_visible_bounds(info.current_w, info.current_h))
+
+    def center_on(self, row, col):
+        info = pygame.display.Info()
+        x, y = self.get_hex_center(row, col)
+        self.view_offset_x += info.current_w / 2 - x
+        self.view_offset_y += info.current_h / 2 - y
+
+    def all_units(self):
+        """Units on the board plus, in a chunked world, those sleeping in unloaded chunks."""
+        return self.grid.all_units() if self.chunked else list(self.units)
+
+    def get_inaccessible_hexes(self):
+        if self.chunked:
+            return self.grid.inaccessible_hexes()
+        return [(r, c) for r in range(self.rows) for c in range(self.cols) if not self.grid[r][c]["accessible"]]
+
     def get_hex_center(self, row, col):
         x = self.view_offset_x + col * self.hex_size * 1.5
         y = self.view_offset_y + row * self.hex_size * 1.732 + (col % 2) * self.hex_size * 0.866
@@ -117,8 +248,11 @@ class HexGrid:
             return None
         min_dist = float('inf')
         selected_hex = None
-        for row in range(self.rows):
-            for col in range(self.cols):
+        # Only the hexes around the estimated column/row can contain the point
+        approx_col = int((x - self.view_offset_x) / (self.hex_size * 1.5))
+        for col in range(max(0, approx_col - 1), min(self.cols, approx_col + 2)):
+            approx_row = int((y - self.view_offset_y - (col % 2) * self.hex_size * 0.866) / (self.hex_size * 1.732))
+            for row in range(max(0, approx_row - 1), min(self.rows, approx_row + 2)):
                 center_x, center_y = self.get_hex_center(row, col)
                 dist = (x - center_x) ** 2 + (y - center_y) ** 2
                 if dist < min_dist and dist < (self.hex_size ** 2):
@@ -131,19 +265,28 @@ class HexGrid:
             self.grid[row][col]["unit"] is None and self.grid[row][col]["accessible"]):
             self.grid[row][col]["unit"] = unit
             unit.position = (row, col)
+            self.occupancy_changed()
             if isinstance(unit, Player):
                 self.player = unit
+                self.update_streaming()
             else:
                 self.units.append(unit)
+            if self.recorder:
+                self.recorder.record_spawn(unit)
             return True, f"{unit.class_name if isinstance(unit, Player) else unit.name} placed at ({row}, {col})"
         else:
             print(f"Cannot place unit at ({row}, {col}): out of bounds, occupied, or inaccessible")
             return False, ""
 
-    def move_unit(self, unit, new_row, new_col):
+    def move_unit(self, unit, new_row, new_col, path=None):
         if (0 <= new_row < self.rows and 0 <= new_col < self.cols and 
             self.grid[new_row][new_col]["unit"] is None and self.grid[new_row][new_col]["accessible"]):
-            unit.animate_move(self, new_row, new_col)
+            unit.animate_move(self, new_row, new_col, path)
+            self.occupancy_changed()
+            if self.recorder:
+                self.recorder.record_move(unit, new_row, new_col)
+            if unit is self.player:
+                self.update_streaming()
             return True, f"{unit.class_name if isinstance(unit, Player) else unit.name} moved to ({new_row}, {new_col})"
         return False, ""
 
@@ -165,7 +308,10 @@ class HexGrid:
                             card_data = json.load(f)
                         card_data["id"] = card_id
                         card = InventoryCard(card_data)
-                        card_manager.track_card_usage(card_id, {"action": "drawn", "screen": "game", "position": (row, col)})
+                        if card_manager:  # None when a replay is re-simulated
+                            card_manager.track_card_usage(card_id, {"action": "drawn", "screen": "game", "position": (row, col)})
+                        if self.recorder:
+                            self.recorder.record_draw(row, col, card_id)
                         return card, f"Drew {card.get_current_data().get('Name', 'Unnamed')}"
                     except Exception as e:
                         return None, f"Error drawing card: {e}"
@@ -265,6 +411,13 @@ class HexGrid:
         return path[::-1]
 
     def get_movement_range(self, start, movement):
+        if not self.chunked:
+            # Flooded over the cached passable mask, and memoized until a unit or obstacle changes
+            cache = self.get_range_cache()
+            key = ("movement", tuple(start), movement)
+            if key not in cache:
+                cache[key] = frozenset(self.geometry.cells(self.get_reachable_mask(start, movement)))
+            return cache[key]
         reachable = set()
         frontier = deque([(0, start)])
         visited = set([start])
@@ -283,7 +436,12 @@ class HexGrid:
         reachable = self.get_movement_range(start, movement)
         return [pos for pos in reachable if pos != start and self.grid[pos[0]][pos[1]]["unit"] is None]
 
-    def get_attack_range(self, start, range_limit, is_projectile=False):
+    def get_attack_range(self, start, range_limit, is_projectile=False, pattern=None):
+        # A card's range_id picks a pattern from ranges/; without one, the built-in projectile lines and melee ring
+        range_pattern = range_patterns.find_pattern(pattern)
+        if range_pattern is not None:
+            distance = range_pattern.distance if range_pattern.distance is not None else range_limit
+            return range_pattern.evaluate(self, start, distance)
         if is_projectile:
             attack_hexes = set()
             row, col = start
@@ -297,6 +455,24 @@ class HexGrid:
         else:
             return {(r, c) for r, c in self.get_neighbors(*start) if self.hex_distance(start, (r, c)) <= range_limit}
 
+    def get_visible_bounds(self, width, height, margin=1):
+        """Row/column window (end-exclusive) of hexes that can appear on a width x height surface."""
+        col_step = self.hex_size * 1.5
+        row_step = self.hex_size * 1.732
+        col_start = max(0, math.floor((-self.view_offset_x - self.hex_size) / col_step) - margin)
+        col_end = min(self.cols, math.ceil((width - self.view_offset_x + self.hex_size) / col_step) + margin + 1)
+        row_start = max(0, math.floor((-self.view_offset_y - self.hex_size * 1.866) / row_step) - margin)
+        row_end = min(self.rows, math.ceil((height - self.view_offset_y + self.hex_size) / row_step) + margin + 1)
+        return row_start, row_end, col_start, col_end
+
+    def get_hex_corners(self):
+        # Corner offsets only change with zoom, so compute the trig once per hex size
+        if self.corner_offsets_size != self.hex_size:
+            self.corner_offsets = [(self.hex_size * math.cos(math.radians(60 * i)),
+                                    self.hex_size * math.sin(math.radians(60 * i))) for i in range(6)]
+            self.corner_offsets_size = self.hex_size
+        return self.corner_offsets
+
     def draw(self, surface, movement_range=None, attack_range=None, colors=None):
         if colors is None:
             colors = {
@@ -311,12 +487,21 @@ class HexGrid:
                 'WHITE': (255, 255, 255),
                 'PURPLE': (128, 0, 128)
             }
-        hex_surface = pygame.Surface((surface.get_width(), surface.get_height()), pygame.SRCALPHA)
-        for row in range(self.rows):
-            for col in range(self.cols):
+        width, height = surface.get_width(), surface.get_height()
+        if self.chunked:
+            self.grid.update(self.player.position if self.player else None, self.get_visible_bounds(width, height))
+        if self.hex_surface is None or self.hex_surface.get_size() != (width, height):
+            self.hex_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        hex_surface = self.hex_surface
+        hex_surface.fill((0, 0, 0, 0))
+        corners = self.get_hex_corners()
+        special_hexes = {(hex_data["row"], hex_data["column"]): hex_data for hex_data in reversed(self.card_drawing_hexes)}
+        row_start, row_end, col_start, col_end = self.get_visible_bounds(width, height)
+        # Only hexes (and the units standing in them) inside the viewport are touched
+        for row in range(row_start, row_end):
+            for col in range(col_start, col_end):
                 x, y = self.get_hex_center(row, col)
-                points = [(x + self.hex_size * math.cos(math.radians(60 * i)), 
-                           y + self.hex_size * math.sin(math.radians(60 * i))) for i in range(6)]
+                points = [(x + dx, y + dy) for dx, dy in corners]
                 # Draw hex background
                 if not self.grid[row][col]["accessible"]:
                     pygame.draw.polygon(hex_surface, colors['GRAY'], points, 0)  # Gray for inaccessible
@@ -325,45 +510,60 @@ class HexGrid:
                 elif attack_range and (row, col) in attack_range:
                     pygame.draw.polygon(hex_surface, colors['DARK_RED_ALPHA'], points, 0)
                 # Draw special hex indicators
-                for hex_data in self.card_drawing_hexes:
-                    if hex_data["row"] == row and hex_data["column"] == col:
-                        if "linked_level" in hex_data and hex_data["linked_level"]:
-                            pygame.draw.polygon(hex_surface, colors['PURPLE'], points, 3)  # Purple for linked levels
-                        elif "deck_file" in hex_data and hex_data["deck_file"] or "card_id" in hex_data and hex_data["card_id"]:
-                            pygame.draw.polygon(hex_surface, colors['LIGHT_GREEN'], points, 3)  # Green for card-drawing
-                        break
+                hex_data = special_hexes.get((row, col))
+                if hex_data:
+                    if "linked_level" in hex_data and hex_data["linked_level"]:
+                        pygame.draw.polygon(hex_surface, colors['PURPLE'], points, 3)  # Purple for linked levels
+                    elif "deck_file" in hex_data and hex_data["deck_file"] or "card_id" in hex_data and hex_data["card_id"]:
+                        pygame.draw.polygon(hex_surface, colors['LIGHT_GREEN'], points, 3)  # Green for card-drawing
                 if self.selected_hex == (row, col):
                     pygame.draw.polygon(hex_surface, colors['YELLOW'], points, 0)
                 pygame.draw.polygon(hex_surface, colors['GOLDEN_YELLOW'], points, 1)
-                # Draw unit if present
-                if unit := self.grid[row][col]["unit"]:
-                    pos = unit.render_pos if unit.animating and unit.render_pos else (x, y)
-                    if isinstance(unit, Player) and unit.image:
-                        scale_factor = (self.hex_size * 1.5 * unit.image_scale_factor) / unit.image.get_height()
-                        scaled_image = pygame.transform.scale(unit.image, 
-                                                             (int(unit.image.get_width() * scale_factor), 
-                                                              int(unit.image.get_height() * scale_factor)))
-                        image_rect = scaled_image.get_rect(center=(int(pos[0]), int(pos[1])))
-                        hex_surface.blit(scaled_image, image_rect)
-                        health_bar_y = image_rect.top - 5
-                    else:
-                        color = (colors['GREEN'] if isinstance(unit, Player) else 
-                                 colors['RED'] if unit.allegiance == "Hostile" else 
-                                 colors['BLUE'] if unit.allegiance == "Allied" else 
-                                 colors['GRAY'])
-                        radius = max(10, int(self.hex_size / 3))  # Same as old version
-                        pygame.draw.circle(hex_surface, colors['WHITE'] if unit.attack_flash else color, 
-                                           (int(pos[0]), int(pos[1])), radius)
-                        health_bar_y = pos[1] - 15
-                        # Draw unit name above health bar
-                        name = unit.class_name if isinstance(unit, Player) else unit.name
-                        text_surface = self.font.render(name, True, colors['WHITE'])
-                        text_rect = text_surface.get_rect(centerx=pos[0], bottom=health_bar_y - 5)
-                        hex_surface.blit(text_surface, text_rect)
-                        # Draw damage text if present
-                        if unit.damage_text:
-                            damage_surface = self.font.render(unit.damage_text, True, colors['RED'])
-                            damage_rect = damage_surface.get_rect(center=(pos[0], health_bar_y - 25))
-                            hex_surface.blit(damage_surface, damage_rect)
-                    unit.draw_health_bar(hex_surface, (pos[0], health_bar_y))
+        # Units go on top of the board; moving units are drawn from their tween position instead of their cell
+        for row in range(row_start, row_end):
+            for col in range(col_start, col_end):
+                unit = self.grid[row][col]["unit"]
+                if unit and not unit.animating:
+                    self.draw_unit(hex_surface, unit, self.get_hex_center(row, col), colors)
+        for unit in list(self.animations.by_unit):
+            pos = unit.render_pos
+            if pos and -self.hex_size <= pos[0] <= width + self.hex_size and -self.hex_size <= pos[1] <= height + self.hex_size:
+                self.draw_unit(hex_surface, unit, pos, colors)
         surface.blit(hex_surface, (0, 0))
+
+    def get_scaled_image(self, image, scale_factor):
+        size = (int(image.get_width() * scale_factor), int(image.get_height() * scale_factor))
+        key = (id(image), size)
+        if key not in self.image_cache:
+            if len(self.image_cache) > 32:
+                self.image_cache.clear()
+            self.image_cache[key] = pygame.transform.scale(image, size)
+        return self.image_cache[key]
+
+    def draw_unit(self, hex_surface, unit, pos, colors):
+        if isinstance(unit, Player) and unit.image:
+            scale_factor = (self.hex_size * 1.5 * unit.image_scale_factor) / unit.image.get_height()
+            scaled_image = self.get_scaled_image(unit.image, scale_factor)
+            image_rect = scaled_image.get_rect(center=(int(pos[0]), int(pos[1])))
+            hex_surface.blit(scaled_image, image_rect)
+            health_bar_y = image_rect.top - 5
+        else:
+            color = (colors['GREEN'] if isinstance(unit, Player) else 
+                     colors['RED'] if unit.allegiance == "Hostile" else 
+                     colors['BLUE'] if unit.allegiance == "Allied" else 
+                     colors['GRAY'])
+            radius = max(10, int(self.hex_size / 3))  # Same as old version
+            pygame.draw.circle(hex_surface, colors['WHITE'] if unit.attack_flash else color, 
+                               (int(pos[0]), int(pos[1])), radius)
+            health_bar_y = pos[1] - 15
+            # Draw unit name above health bar
+            name = unit.class_name if isinstance(unit, Player) else unit.name
+            text_surface = self.font.render(name, True, colors['WHITE'])
+            text_rect = text_surface.get_rect(centerx=pos[0], bottom=health_bar_y - 5)
+            hex_surface.blit(text_surface, text_rect)
+            # Draw damage text if present
+            if unit.damage_text:
+                damage_surface = self.font.render(unit.damage_text, True, colors['RED'])
+                damage_rect = damage_surface.get_rect(center=(pos[0], health_bar_y - 25))
+                hex_surface.blit(damage_surface, damage_rect)
+        unit.draw_health_bar(hex_surface, (pos[0], health_bar_y))
@@ -0,0 +1,225 @@
+import json
+import os
+import zlib
+
+# The card index (card id -> entry) as a snapshot plus a change journal. card_index.json is the
+# snapshot, in the format every tool already reads; it is only ever replaced whole, by writing a
+# temporary file and renaming it over the old one, so a crash leaves either the old or the new
+# snapshot. Single-card changes are appended to card_index.journal, one checksummed line each,
+# and the journal is folded into a new snapshot after COMPACT_AFTER records.
+#
+# The journal's first line names the snapshot it applies to (its mtime and size). On open, the
+# records are replayed on top of the snapshot; a torn or corrupt tail from a crash mid-append is
+# cut off, and a journal whose snapshot has since been replaced (compaction that crashed before
+# resetting the journal, or another tool rewriting the index) is dropped.
+INDEX_FILE = os.path.join("cards", "card_index.json")
+JOURNAL_SUFFIX = ".journal"
+COMPACT_AFTER = 256
+PUT = "put"
+DELETE = "delete"
+
+
+def journal_path(index_file):
+    return os.path.splitext(index_file)[0] + JOURNAL_SUFFIX
+
+
+def snapshot_stamp(index_file):
+    try:
+        stat = os.stat(index_file)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def encode(record):
+    payload = json.dumps(record).encode('utf-8')
+    return b"%08x " % zlib.crc32(payload) + payload + b"\n"
+
+
+def decode(line):
+    """The record on a journal line (bytes), or None if the line is torn or corrupt."""
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+        return None
+    payload = line[9:-1]
+    if b"%08x" % zlib.crc32(payload) != line[:8]:
+        return None
+    try:
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def apply(index, record):
+    op, card_id = record[0], record[1]
+    if op == PUT:
+        index[card_id] = record[2]
+    elif op == DELETE:
+        index.pop(card_id, None)
+
+
+def load_snapshot(index_file):
+    try:
+        with open(index_file, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        print(f"Error reading card index {index_file}: {e}")
+        return {}
+
+
+def read_journal(index_file):
+    """(records, byte length of the valid part, applies to the current snapshot) for index_file's journal."""
+    path = journal_path(index_file)
+    try:
+        with open(path, 'rb') as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return [], 0, True
+    header = decode(lines[0]) if lines else None
+    if not isinstance(header, dict) or header.get("base") != snapshot_stamp(index_file):
+        return [], 0, False
+    records = []
+    valid = len(lines[0])
+    for line in lines[1:]:
+        record = decode(line)
+        if not isinstance(record, list) or len(record) < 2:
+            break
+        records.append(record)
+        valid += len(line)
+    return records, valid, True
+
+
+def read_index(index_file=INDEX_FILE):
+    """The current index, snapshot plus journal, without recovering or writing anything."""
+    index = load_snapshot(index_file)
+    records, _, current = read_journal(index_file)
+    if current:
+        for record in records:
+            apply(index, record)
+    return index
+
+
+def write_snapshot(index, index_file=INDEX_FILE):
+    """Atomically replace index_file with index (temporary file, fsync, rename)."""
+    tmp = f"{index_file}.tmp"
+    with open(tmp, 'w') as f:
+        f.write(json.dumps(index, indent=2))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, index_file)
+
+
+def start_journal(index_file=INDEX_FILE):
+    """Atomically replace index_file's journal with an empty one on the current snapshot."""
+    path = journal_path(index_file)
+    tmp = f"{path}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(encode({"base": snapshot_stamp(index_file)}))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def replace_index(index, index_file=INDEX_FILE):
+    """Make index the whole index for tools without an open IndexStore."""
+    write_snapshot(index, index_file)
+    start_journal(index_file)
+
+
+class IndexStore:
+    """The card index in memory, with put() and delete() journaled in O(1)."""
+    def __init__(self, index_file=INDEX_FILE, compact_after=COMPACT_AFTER):
+        self.index_file = index_file
+        self.journal_file = journal_path(index_file)
+        self.compact_after = compact_after
+        self.index = {}
+        self.records = 0
+        self.journal = None
+        self.open()
+
+    def __contains__(self, card_id):
+        return card_id in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def get(self, card_id, default=None):
+        return self.index.get(card_id, default)
+
+    def items(self):
+        return self.index.items()
+
+    def open(self):
+        """(Re)load the index from disk, recovering from an interrupted write."""
+        self.close()
+        for tmp in (f"{self.index_file}.tmp", f"{self.journal_file}.tmp"):
+            if os.path.exists(tmp):
+                os.remove(tmp)  # Written but never renamed into place
+        self.index = load_snapshot(self.index_file)
+        records, valid, current = read_journal(self.index_file)
+        if not current:
+            print(f"Discarding {self.journal_file}: it belongs to an older {self.index_file}")
+            self.reset_journal()
+            return
+        for record in records:
+            apply(self.index, record)
+        self.records = len(records)
+        if not os.path.exists(self.journal_file):
+            self.reset_journal()
+            return
+        if valid != os.path.getsize(self.journal_file):
+            print(f"Recovered {self.journal_file}: dropped an incomplete record after {len(records)} changes")
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(valid)
+        self.journal = open(self.journal_file, 'ab')
+        self.compact_if_due()
+
+    def close(self):
+        if self.journal:
+            self.journal.close()
+            self.journal = None
+
+    def put(self, card_id, entry):
+        self.append([PUT, card_id, entry])
+        self.index[card_id] = entry
+        self.compact_if_due()
+
+    def delete(self, card_id):
+        if card_id in self.index:
+            self.append([DELETE, card_id])
+            del self.index[card_id]
+            self.compact_if_due()
+
+    def append(self, record):
+        self.journal.write(encode(record))
+        self.journal.flush()
+        os.fsync(self.journal.fileno())
+        self.records += 1
+
+    def compact_if_due(self):
+        if self.records >= self.compact_after:
+            self.compact()
+
+    def checkpoint(self):
+        """Fold any journaled changes into the snapshot (on exit, so card_index.json is complete by itself)."""
+        if self.records:
+            self.compact()
+
+    def compact(self):
+        """Write the whole index as a new snapshot and start an empty journal on it."""
+        write_snapshot(self.index, self.index_file)
+        self.reset_journal()
+
+    def replace_all(self, index):
+        """Make index the whole index (after a full rebuild)."""
+        self.index = dict(index)
+        self.compact()
+
+    def reset_journal(self):
+        self.close()
+        if not os.path.exists(self.index_file):
+            write_snapshot(self.index, self.index_file)
+        start_journal(self.index_file)
+        self.records = 0
+        self.journal = open(self.journal_file, 'ab')
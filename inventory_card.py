@@ -7,6 +7,14 @@ class InventoryCard:
     def get_current_data(self):
         return self.get_state_data(self.current_state)
 
+    def get_value(self, key, default=None):
+        """One field of the current state's data, without building the whole get_current_data() dict."""
+        if self.current_state == 1:
+            return self.card_data["data"].get(key, default)
+        elif self.current_state == 2:
+            return self.card_data["data"].get("2nd_state_" + key, default)
+        return default
+
     def get_state_data(self, state):
         if state == 1:
             return {k: v for k, v in self.card_data["data"].items() if not k.startswith("2nd_state_")}
@@ -0,0 +1,132 @@
+from collections import Counter
+
+# Player inventory with the cards sorted into the inventory screen's categories as they come and
+# go, so the screens never rescan the whole inventory. Categories depend on the card's state:
+#   state 1: "junk" (Junk Card), "documents" (Document Card)
+#   state 2: "weapons" (Melee/Projectile), "consumables", "tools"
+CATEGORIES = ["junk", "documents", "weapons", "consumables", "tools"]
+STATE_2_TYPES = {"Melee": "weapons", "Projectile": "weapons", "Consumable": "consumables", "Tool": "tools"}
+STATE_1_TYPES = {"Junk Card": "junk", "Document Card": "documents"}
+
+
+def category_of(card):
+    if card.current_state == 1:
+        return STATE_1_TYPES.get(card.card_data["card_type"])
+    if card.current_state == 2:
+        card_type = card.get_current_data().get("Type")
+        return STATE_2_TYPES.get(card_type) if isinstance(card_type, str) else None
+    return None
+
+
+def stack_label(name, count):
+    return f"{name} (x{count})" if count > 1 else name
+
+
+class Inventory:
+    """The player's cards, in pickup order, indexed by category and by name.
+
+    Supports the list operations the game and savegame use (append, remove,
+    index, iteration, len, in, [i], copy). Card state changes must go through
+    toggle_state() so the card moves to its new category. Each category has a
+    version number that changes whenever its contents do; screens compare it
+    with the version they last showed to decide which lists to rebuild.
+    Watchers get card_added(card, category, name) and card_removed(card,
+    category, name) calls as cards come and go (a toggle is a removal, then
+    an add).
+    """
+    def __init__(self, cards=()):
+        self.cards = {}  # card -> (category, name); dicts keep insertion order
+        self.buckets = {category: {} for category in CATEGORIES}  # category -> name -> [cards]
+        self.by_name = {}  # name -> [cards], every category
+        self.versions = Counter()
+        self.watchers = []
+        for card in cards:
+            self.append(card)
+
+    def __iter__(self):
+        return iter(list(self.cards))
+
+    def __len__(self):
+        return len(self.cards)
+
+    def __contains__(self, card):
+        return card in self.cards
+
+    def __getitem__(self, index):
+        return list(self.cards)[index]
+
+    def index(self, card):
+        for i, other in enumerate(self.cards):
+            if other is card:
+                return i
+        raise ValueError("card is not in the inventory")
+
+    def copy(self):
+        return list(self.cards)
+
+    def append(self, card):
+        if card in self.cards:
+            return
+        self.cards[card] = self._index(card)
+
+    def remove(self, card):
+        if card not in self.cards:
+            raise ValueError("card is not in the inventory")
+        self._unindex(card, *self.cards.pop(card))
+
+    def toggle_state(self, card):
+        """card.toggle_state(), moving the card to the category of its new state (it keeps its place in pickup order)."""
+        self._unindex(card, *self.cards[card])
+        card.toggle_state()
+        self.cards[card] = self._index(card)
+
+    def _index(self, card):
+        category = category_of(card)
+        name = card.get_current_data().get("Name", "Unnamed")
+        self.by_name.setdefault(name, []).append(card)
+        if category:
+            self.buckets[category].setdefault(name, []).append(card)
+            self.versions[category] += 1
+        for watcher in self.watchers:
+            watcher.card_added(card, category, name)
+        return category, name
+
+    def _unindex(self, card, category, name):
+        for watcher in self.watchers:
+            watcher.card_removed(card, category, name)
+        self._unlink(self.by_name, name, card)
+        if category:
+            self._unlink(self.buckets[category], name, card)
+            self.versions[category] += 1
+
+    @staticmethod
+    def _unlink(multimap, name, card):
+        cards = multimap[name]
+        cards.remove(card)
+        if not cards:
+            del multimap[name]
+
+    def name_of(self, card):
+        return self.cards[card][1]
+
+    def stacks(self, category):
+        """(name, cards) for every distinct name in the category, in the order the names were first picked up."""
+        return list(self.buckets[category].items())
+
+    def cards_in(self, category):
+        return [card for cards in self.buckets[category].values() for card in cards]
+
+    def labels(self, category):
+        """Selection-list labels for the category: one per name, with the stack count for duplicates."""
+        return [stack_label(name, len(cards)) for name, cards in self.buckets[category].items()]
+
+    def first(self, category, label):
+        """The first card of the stack a label from labels() refers to, or None."""
+        bucket = self.buckets[category]
+        cards = bucket.get(label)
+        if cards is None and label.endswith(")") and " (x" in label:
+            cards = bucket.get(label.rsplit(" (x", 1)[0])
+        return cards[0] if cards else None
+
+    def has_named(self, name):
+        return name in self.by_name
@@ -1,6 +1,8 @@
 import pygame
 import os
-import math
+import combat
+from inventory_model import Inventory
+from crafting_index import CraftingIndex
 
 # Character classes
 CHARACTER_CLASSES = {
@@ -10,7 +12,6 @@ CHARACTER_CLASSES = {
 }
 
 # Animation constants
-MOVE_SPEED = 5
 ATTACK_FLASH_DURATION = 500
 DAMAGE_TEXT_DURATION = 1000  # 1 second
 
@@ -34,7 +35,8 @@ class Player:
         self.render_pos = None
         self.attack_flash = False
         self.flash_start = 0
-        self.inventory = []
+        self.inventory = Inventory()
+        self.crafting_index = CraftingIndex(self.inventory)
         self.melee_weapon = None
         self.projectile_weapon = None
         self.damage_text = None
@@ -47,31 +49,32 @@ class Player:
         self.image_scale_factor = 1.2
 
     def attack(self, enemy, attack_name, grid):
-        if not self.action_used:
-            if attack_name == self.attacks["projectile"]["name"]:
-                damage = self.attacks["projectile"]["damage"]
-                max_range = self.projectile_range
-                distance = grid.hex_distance(self.position, enemy.position)
-                if (1 < distance <= max_range and 
-                    grid.is_aligned(self.position, enemy.position, max_range) and 
-                    grid.has_clear_line_of_sight(self.position, enemy.position)):
-                    enemy.hp -= damage
-                    enemy.set_damage_text(damage)  # Set damage feedback for enemy
-                    self.action_used = True
-                    self.attack_flash = True
-                    self.flash_start = pygame.time.get_ticks()
-                    return f"{self.class_name} used {attack_name} on {enemy.name} for {damage} damage", enemy.hp <= 0
-            elif attack_name == self.attacks["melee"]["name"]:
-                damage = self.attacks["melee"]["damage"]
-                distance = grid.hex_distance(self.position, enemy.position)
-                if distance == 1:
-                    enemy.hp -= damage
-                    enemy.set_damage_text(damage)
-                    self.action_used = True
-                    self.attack_flash = True
-                    self.flash_start = pygame.time.get_ticks()
-                    return f"{self.class_name} used {attack_name} on {enemy.name} for {damage} damage", enemy.hp <= 0
-        return "", False
+        """Use the named attack (or the class special) on enemy; returns the combat.CombatEvents, empty if nothing was hit."""
+        if self.action_used:
+            return []
+        if attack_name == self.special_attack:
+            intents = combat.special_intents(self, enemy, grid)
+        else:
+            kinds = [kind for kind, attack in self.attacks.items() if attack["name"] == attack_name]
+            intents = [combat.Intent(self, [enemy], combat.Attack.of_player(self, kinds[0]))] if kinds else []
+        events = combat.resolve(grid, intents)
+        if any(event.kind == combat.HIT for event in events):
+            self.action_used = True
+        return events
+
+    def attack_kind(self, attack_name):
+        """"melee" or "projectile" for one of the player's attack names (the special uses its base attack)."""
+        if attack_name == self.special_attack and attack_name in combat.SPECIAL_ATTACKS:
+            return combat.SPECIAL_ATTACKS[attack_name]["kind"]
+        for kind, attack in self.attacks.items():
+            if attack["name"] == attack_name:
+                return kind
+        return None
+
+    def get_attack_range(self, kind, grid):
+        """Hexes the melee or projectile attack can target, shaped by the weapon's range_id when it has one."""
+        # The same hexes combat checks targets against (for a two_stage weapon, its primary area)
+        return combat.attack_area(grid, self.position, combat.Attack.of_player(self, kind))
 
     def equip_weapon(self, weapon_card):
         weapon_data = weapon_card.get_current_data()
@@ -80,14 +83,14 @@ class Player:
             try:
                 damage = int(weapon_data["Melee Damage"])
                 self.melee_weapon = weapon_card
-                self.attacks["melee"] = {"name": weapon_data["Name"], "damage": damage}
+                self.attacks["melee"] = {"name": weapon_data["Name"], "damage": damage, "range_id": weapon_data.get("range_id")}
             except ValueError:
                 print(f"Error: Invalid 'Melee Damage' for {weapon_data.get('Name', 'Unknown')}")
         elif weapon_type == "Projectile" and "Projectile Damage" in weapon_data:
             try:
                 damage = int(weapon_data["Projectile Damage"])
                 self.projectile_weapon = weapon_card
-                self.attacks["projectile"] = {"name": weapon_data["Name"], "damage": damage}
+                self.attacks["projectile"] = {"name": weapon_data["Name"], "damage": damage, "range_id": weapon_data.get("range_id")}
             except ValueError:
                 print(f"Error: Invalid 'Projectile Damage' for {weapon_data.get('Name', 'Unknown')}")
 
@@ -103,28 +106,16 @@ class Player:
         self.damage_text = f"-{damage}"
         self.damage_time = pygame.time.get_ticks()
 
-    def animate_move(self, grid, new_row, new_col):
+    def animate_move(self, grid, new_row, new_col, path=None):
         if not self.animating:
-            self.animating = True
-            old_x, old_y = grid.get_hex_center(*self.position)
-            self.render_pos = (old_x, old_y)
-            grid.grid[self.position[0]][self.position[1]]["unit"] = None
+            old_pos = self.position
+            grid.grid[old_pos[0]][old_pos[1]]["unit"] = None
             grid.grid[new_row][new_col]["unit"] = self
             self.position = (new_row, new_col)
+            grid.animations.move(self, path or [old_pos, self.position])
 
     def update_animation(self, grid):
-        if self.animating and self.render_pos:
-            target_x, target_y = grid.get_hex_center(*self.position)
-            dx = target_x - self.render_pos[0]
-            dy = target_y - self.render_pos[1]
-            dist = math.sqrt(dx**2 + dy**2)
-            if dist <= MOVE_SPEED:
-                self.render_pos = None
-                self.animating = False
-            else:
-                move_x = dx / dist * MOVE_SPEED
-                move_y = dy / dist * MOVE_SPEED
-                self.render_pos = (self.render_pos[0] + move_x, self.render_pos[1] + move_y)
+        """Expire the attack flash and damage text; movement is driven by grid.animations."""
         if self.attack_flash and pygame.time.get_ticks() - self.flash_start > ATTACK_FLASH_DURATION:
             self.attack_flash = False
         if self.damage_text and pygame.time.get_ticks() - self.damage_time > DAMAGE_TEXT_DURATION:
@@ -139,8 +130,12 @@ class Player:
             pygame.draw.rect(surface, (0, 255, 0), (bar_x, bar_y, health_width, bar_height))
 
     def teleport(self, grid, new_row, new_col):
+        grid.animations.cancel_unit(self)
         grid.grid[self.position[0]][self.position[1]]["unit"] = None
         self.position = (new_row, new_col)
         grid.grid[new_row][new_col]["unit"] = self
+        grid.occupancy_changed()
         self.animating = False  # Ensure no animation
         self.render_pos = None
+        if grid.recorder:
+            grid.recorder.record_teleport(self, new_row, new_col)
@@ -0,0 +1,254 @@
+import atexit
+import cProfile
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+import pygame
+
+# Command-line profiling for the game and the editors:
+#   --profile                 profile the whole session
+#   --profile=window          profile only between presses of F9 (each window gets its own files)
+#   --record-input FILE       save keyboard/mouse input, frame by frame, to FILE
+#   --replay-input FILE       play FILE back instead of live keyboard/mouse input, then quit
+# Each capture writes profiles/<app>_<time>.pstats (cProfile, open with pstats or snakeviz) and a
+# .collapsed file of sampled call stacks (flamegraph.pl, speedscope, inferno).
+# Recording and replaying also seed `random` from the script, so a replayed session makes the same AI
+# and loot rolls; together with --profile this gives reproducible profiles. Input is keyed by frame
+# number, so the script also holds every frame's clock time: while replaying, session.clock() hands
+# the recorded times to the tweens and timers that read it. `scripted` (recording or replaying) tells
+# the app to finish any time-budgeted work (the game's AI phases) within the frame, both times, so each
+# frame ends in the same state.
+PROFILE_DIR = "profiles"
+WINDOW_KEY = pygame.K_F9
+SAMPLE_INTERVAL = 0.001  # Seconds between stack samples
+
+# Raw input events worth recording, with the attributes needed to rebuild them. pygame_gui's own
+# events are not recorded; they are regenerated when the replayed input reaches the UI manager.
+INPUT_EVENTS = {
+    pygame.QUIT: ("QUIT", ()),
+    pygame.KEYDOWN: ("KEYDOWN", ("key", "mod", "unicode", "scancode")),
+    pygame.KEYUP: ("KEYUP", ("key", "mod", "unicode", "scancode")),
+    pygame.TEXTINPUT: ("TEXTINPUT", ("text",)),
+    pygame.MOUSEBUTTONDOWN: ("MOUSEBUTTONDOWN", ("pos", "button")),
+    pygame.MOUSEBUTTONUP: ("MOUSEBUTTONUP", ("pos", "button")),
+    pygame.MOUSEMOTION: ("MOUSEMOTION", ("pos", "rel", "buttons")),
+    pygame.MOUSEWHEEL: ("MOUSEWHEEL", ("x", "y", "flipped")),
+}
+EVENT_TYPES = {name: event_type for event_type, (name, _) in INPUT_EVENTS.items()}
+
+
+def parse_args(argv):
+    options = {"profile": None, "record": None, "replay": None}
+    args = list(argv)
+    while args:
+        arg = args.pop(0)
+        if arg == "--profile":
+            options["profile"] = "session"
+        elif arg.startswith("--profile="):
+            options["profile"] = arg.split("=", 1)[1]
+        elif arg in ("--record-input", "--replay-input") and args:
+            options["record" if arg == "--record-input" else "replay"] = args.pop(0)
+    if options["profile"] not in (None, "session", "window"):
+        print(f"Unknown profile mode {options['profile']}; use --profile or --profile=window")
+        options["profile"] = None
+    return options
+
+
+def frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler(threading.Thread):
+    """Samples the main thread's call stack every interval into collapsed-stack counts."""
+    def __init__(self, thread_id, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(frame_label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+
+class SessionClock:
+    """pygame.time.Clock for the main loop: records each frame's time, or plays the recorded times back."""
+    def __init__(self, session):
+        self.session = session
+        self.clock = pygame.time.Clock()
+        self.time = 0
+
+    def tick(self, framerate=0):
+        self.time = self.session.frame_time(self.clock.tick(framerate))
+        return self.time
+
+    def get_time(self):
+        return self.time
+
+    def get_fps(self):
+        return self.clock.get_fps()
+
+
+class ProfileSession:
+    """Profiling and input record/replay for one app's main loop.
+
+    The main loop calls events() in place of pygame.event.get(), and ticks the
+    clock() it gets from here. Without any of the command-line options they are
+    exactly pygame.event.get() and a pygame Clock.
+    """
+    def __init__(self, app_name, argv=None):
+        self.app_name = app_name
+        self.options = parse_args(sys.argv[1:] if argv is None else argv)
+        self.frame = 0
+        self.profiler = None
+        self.sampler = None
+        self.capture_started = None
+        self.recorded = []
+        self.frame_times = []  # Milliseconds per frame, recorded or loaded from the script
+        self.script = None
+        self.script_end = 0
+        self.seed = None
+        self.finished = False
+        if self.options["replay"]:
+            self.load_script(self.options["replay"])
+        elif self.options["record"]:
+            self.seed = int(time.time())
+        if self.seed is not None:
+            random.seed(self.seed)
+        if any(self.options.values()):
+            atexit.register(self.finish)
+        if self.options["profile"] == "session":
+            self.start_capture()
+
+    @property
+    def capturing(self):
+        return self.profiler is not None
+
+    @property
+    def replaying(self):
+        return self.script is not None
+
+    @property
+    def scripted(self):
+        """Input is being recorded or replayed: frames must not depend on wall-clock time."""
+        return self.replaying or bool(self.options["record"])
+
+    def clock(self):
+        return SessionClock(self)
+
+    def frame_time(self, measured):
+        """The frame's time in milliseconds: measured, except while replaying a script that recorded it."""
+        if self.replaying:
+            return self.frame_times[self.frame] if self.frame < len(self.frame_times) else measured
+        if self.options["record"]:
+            self.frame_times.append(measured)
+        return measured
+
+    def load_script(self, path):
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"Error loading input script {path}: {e}")
+            self.script = []
+            return
+        if data.get("app") != self.app_name:
+            print(f"Warning: input script {path} was recorded in {data.get('app')}, not {self.app_name}")
+        self.seed = data.get("seed")
+        self.script = [(frame, name, attrs) for frame, name, attrs in data["events"]]
+        self.script.reverse()  # Popped from the end as frames go by
+        self.script_end = data.get("frames", 0)
+        self.frame_times = data.get("frame_times", [])  # Missing in older scripts: frames then take real time
+
+    def events(self):
+        events = pygame.event.get()
+        if self.script is not None:
+            # Live input is ignored while replaying; window and UI events still pass through
+            events = [e for e in events if e.type not in INPUT_EVENTS] + self.scripted_events()
+            if not self.script and self.frame >= self.script_end:
+                events.append(pygame.event.Event(pygame.QUIT))
+        elif self.options["record"]:
+            for e in events:
+                if e.type in INPUT_EVENTS:
+                    name, fields = INPUT_EVENTS[e.type]
+                    self.recorded.append([self.frame, name, {field: getattr(e, field) for field in fields if hasattr(e, field)}])
+        if self.options["profile"] == "window":
+            for e in events:
+                if e.type == pygame.KEYDOWN and e.key == WINDOW_KEY:
+                    if self.capturing:
+                        self.stop_capture()
+                    else:
+                        self.start_capture()
+        self.frame += 1
+        return events
+
+    def scripted_events(self):
+        events = []
+        while self.script and self.script[-1][0] <= self.frame:
+            _, name, attrs = self.script.pop()
+            attrs = {key: tuple(value) if isinstance(value, list) else value for key, value in attrs.items()}
+            events.append(pygame.event.Event(EVENT_TYPES[name], attrs))
+        return events
+
+    def start_capture(self):
+        if self.capturing:
+            return
+        print(f"Profiling {self.app_name}...")
+        self.capture_started = time.strftime("%Y%m%d-%H%M%S")
+        self.sampler = StackSampler(threading.get_ident())
+        self.sampler.start()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def stop_capture(self):
+        """Stop profiling and write the .pstats and .collapsed files; returns their common path prefix."""
+        if not self.capturing:
+            return None
+        self.profiler.disable()
+        self.sampler.stop()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{self.app_name}_{self.capture_started}")
+        suffix = 1
+        while os.path.exists(base + ".pstats"):
+            suffix += 1
+            base = os.path.join(PROFILE_DIR, f"{self.app_name}_{self.capture_started}_{suffix}")
+        try:
+            self.profiler.dump_stats(base + ".pstats")
+            with open(base + ".collapsed", 'w') as f:
+                for stack, count in sorted(self.sampler.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+            print(f"Wrote profile to {base}.pstats and {base}.collapsed")
+        except Exception as e:
+            print(f"Error writing profile: {e}")
+        self.profiler = None
+        self.sampler = None
+        return base
+
+    def finish(self):
+        if self.finished:
+            return
+        self.finished = True
+        self.stop_capture()
+        if self.options["record"] and self.script is None:
+            try:
+                with open(self.options["record"], 'w') as f:
+                    json.dump({"app": self.app_name, "seed": self.seed, "frames": self.frame, "events": self.recorded,
+                               "frame_times": self.frame_times}, f)
+                print(f"Wrote input script to {self.options['record']} ({len(self.recorded)} events, {self.frame} frames)")
+            except Exception as e:
+                print(f"Error writing input script: {e}")
@@ -0,0 +1,195 @@
+import json
+import os
+import time
+from collections import deque
+import pygame
+
+# Frame-time overlay for the game. F3 turns recording and the overlay on and off, F4 writes the
+# recorded frames as a Chrome trace (open it in chrome://tracing or https://ui.perfetto.dev).
+HISTORY_FRAMES = 240         # Frames kept for the overlay and the trace
+TOGGLE_KEY = pygame.K_F3
+TRACE_KEY = pygame.K_F4
+TRACE_DIR = "profiles"
+TARGET_FRAME_MS = 1000 / 60
+GRAPH_MAX_MS = 50            # Frame-time bars are clipped at this height
+PANEL_WIDTH = 320
+
+
+class NullSection:
+    """What section() returns while the profiler is off: entering and leaving it does nothing."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_SECTION = NullSection()
+
+
+class Section:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class Frame:
+    __slots__ = ("start", "end", "events")
+
+    def __init__(self, start):
+        self.start = start
+        self.end = start
+        self.events = []  # (name, start, end), in the order sections finished
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    def totals(self):
+        totals = {}
+        for name, start, end in self.events:
+            totals[name] = totals.get(name, 0.0) + end - start
+        return totals
+
+
+class FrameProfiler:
+    """Per-frame timings for named subsystems.
+
+        with PROFILER.section("board"):
+            hex_grid.draw(...)
+
+    The main loop brackets every frame with begin_frame()/end_frame(). While the
+    profiler is off, section() hands back a shared do-nothing context manager,
+    so instrumented code costs one attribute check per section.
+    """
+    def __init__(self, history=HISTORY_FRAMES):
+        self.enabled = False
+        self.frames = deque(maxlen=history)
+        self.current = None
+        self.font = None
+
+    def section(self, name):
+        if not self.enabled:
+            return NULL_SECTION
+        return Section(self, name)
+
+    def record(self, name, start, end):
+        if self.current is not None:
+            self.current.events.append((name, start, end))
+
+    def begin_frame(self):
+        self.current = Frame(time.perf_counter()) if self.enabled else None
+
+    def end_frame(self):
+        if self.current is not None:
+            self.current.end = time.perf_counter()
+            self.frames.append(self.current)
+            self.current = None
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.frames.clear()
+        self.current = None
+
+    def handle_event(self, event):
+        """F3/F4 handling; returns True when the event was a profiler hotkey."""
+        if event.type != pygame.KEYDOWN:
+            return False
+        if event.key == TOGGLE_KEY:
+            self.toggle()
+            return True
+        if event.key == TRACE_KEY:
+            path = self.dump_chrome_trace()
+            print(f"Wrote frame trace to {path}" if path else "No frames recorded; press F3 to start profiling")
+            return True
+        return False
+
+    def summary(self):
+        """FPS, frame time percentiles and the mean ms per frame of each section over the history."""
+        if not self.frames:
+            return None
+        durations = sorted(frame.duration * 1000 for frame in self.frames)
+        span = self.frames[-1].start - self.frames[0].start
+        sections = {}
+        for frame in self.frames:
+            for name, seconds in frame.totals().items():
+                sections[name] = sections.get(name, 0.0) + seconds * 1000
+        count = len(self.frames)
+        percentile = lambda p: durations[min(count - 1, int(p * count))]
+        return {
+            # Frame durations leave out the clock.tick wait, so FPS comes from the spacing of frame starts
+            "fps": (count - 1) / span if span > 0 else 0.0,
+            "mean_ms": sum(durations) / count,
+            "p50_ms": percentile(0.5),
+            "p95_ms": percentile(0.95),
+            "max_ms": durations[-1],
+            "sections": {name: total / count for name, total in sections.items()}
+        }
+
+    def draw(self, surface):
+        if not self.enabled:
+            return
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        stats = self.summary()
+        lines = ["Profiler (F3 hide, F4 trace)"]
+        if stats:
+            lines.append(f"{stats['fps']:.1f} FPS  frame {stats['mean_ms']:.1f} ms")
+            lines.append(f"p50 {stats['p50_ms']:.1f}  p95 {stats['p95_ms']:.1f}  max {stats['max_ms']:.1f} ms")
+            for name, ms in sorted(stats["sections"].items(), key=lambda item: -item[1]):
+                lines.append(f"  {name:<12} {ms:6.2f} ms")
+        graph_height = 60
+        line_height = 16
+        height = 10 + line_height * len(lines) + graph_height + 10
+        x = surface.get_width() - PANEL_WIDTH - 10
+        panel = pygame.Surface((PANEL_WIDTH, height), pygame.SRCALPHA)
+        panel.fill((0, 0, 0, 180))
+        for i, line in enumerate(lines):
+            panel.blit(self.font.render(line, True, (255, 255, 255)), (8, 6 + i * line_height))
+        # Frame-time history, one bar per frame, newest on the right
+        graph_top = 10 + line_height * len(lines)
+        bar_width = max(1, (PANEL_WIDTH - 16) // max(1, self.frames.maxlen))
+        scale = graph_height / GRAPH_MAX_MS
+        for i, frame in enumerate(self.frames):
+            ms = frame.duration * 1000
+            color = (0, 200, 0) if ms <= TARGET_FRAME_MS else (230, 200, 0) if ms <= 2 * TARGET_FRAME_MS else (230, 0, 0)
+            bar_height = max(1, int(min(ms, GRAPH_MAX_MS) * scale))
+            pygame.draw.rect(panel, color, (8 + i * bar_width, graph_top + graph_height - bar_height, bar_width, bar_height))
+        target_y = graph_top + graph_height - int(TARGET_FRAME_MS * scale)
+        pygame.draw.line(panel, (255, 255, 255), (8, target_y), (PANEL_WIDTH - 8, target_y))
+        surface.blit(panel, (x, 10))
+
+    def dump_chrome_trace(self, path=None):
+        """Write the recorded frames in Chrome's trace event format; returns the path, or None if empty."""
+        if not self.frames:
+            return None
+        if path is None:
+            os.makedirs(TRACE_DIR, exist_ok=True)
+            path = os.path.join(TRACE_DIR, f"frames_{time.strftime('%Y%m%d-%H%M%S')}.json")
+        origin = self.frames[0].start
+        to_us = lambda seconds: round((seconds - origin) * 1e6, 1)
+        events = []
+        for index, frame in enumerate(self.frames):
+            events.append({"name": "frame", "cat": "frame", "ph": "X", "pid": 1, "tid": 1,
+                           "ts": to_us(frame.start), "dur": round(frame.duration * 1e6, 1), "args": {"index": index}})
+            for name, start, end in frame.events:
+                events.append({"name": name, "cat": "section", "ph": "X", "pid": 1, "tid": 1,
+                               "ts": to_us(start), "dur": round((end - start) * 1e6, 1)})
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return path
+
+
+PROFILER = FrameProfiler()
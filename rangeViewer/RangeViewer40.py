@@ -4,7 +4,13 @@ import pygame
 import pygame_gui
 from pygame_gui.elements import UIDropDownMenu, UILabel, UITextEntryLine, UIButton
 import math
+import os
+import sys
 from hexgrid import HexGrid, DIRECTIONS
+# Shared modules (hexgeom, range_patterns) and the ranges/ pattern files live one level up, next to the game
+GAME_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(GAME_DIR)
+import range_patterns
 
 pygame.init()
 
@@ -38,7 +44,9 @@ hex_grid.grid[9][11]["accessible"] = False
 range_distance_entry = UITextEntryLine(relative_rect=pygame.Rect(10, 50, 100, 30), manager=manager, initial_text="9")
 range_distance_label = UILabel(relative_rect=pygame.Rect(120, 50, 150, 30), text="Range Distance", manager=manager)
 
-pattern_options = ["Line of Sight", "Melee", "Area Effect", "Echo", "Multi Echo", "Perimeter", "Mist/Shadow"]
+range_library = range_patterns.RangeLibrary(os.path.join(GAME_DIR, range_patterns.RANGE_DIR))
+pattern_ids = {name: range_id for name, range_id in range_library.names()}
+pattern_options = list(pattern_ids) or ["Line of Sight"]
 pattern_dropdown = UIDropDownMenu(options_list=pattern_options, starting_option="Line of Sight",
                                   relative_rect=pygame.Rect(10, 90, 150, 30), manager=manager)
 pattern_label = UILabel(relative_rect=pygame.Rect(170, 90, 100, 30), text="Pattern", manager=manager)
@@ -103,67 +111,12 @@ def calculate_range(grid, pos, distance, pattern, include_pos, exclude_adj):
         pattern = pattern[0]
     print(f"Calculating range: pattern={pattern}, distance={dist}, include_pos={include_pos}, exclude_adj={exclude_adj}")
     
-    if pattern == "Line of Sight":
-        range_set = grid.get_attack_range(pos, dist, is_projectile=True)
-    elif pattern == "Melee":
-        range_set = grid.get_attack_range(pos, dist, is_projectile=False)
-    elif pattern == "Area Effect":
-        range_set = grid.get_movement_range(pos, dist)
-    elif pattern == "Echo":
-        range_set = {hex_pos for hex_pos in grid.get_movement_range(pos, dist) 
-                     if grid.hex_distance(pos, hex_pos) % 2 == 1 and grid.grid[hex_pos[0]][hex_pos[1]]["accessible"]}
-    elif pattern == "Multi Echo":
-        range_set = {hex_pos for hex_pos in grid.get_movement_range(pos, dist) 
-                     if grid.hex_distance(pos, hex_pos) % 2 == 0 and grid.grid[hex_pos[0]][hex_pos[1]]["accessible"]}
-    elif pattern == "Perimeter":
-        range_set = {hex_pos for hex_pos in grid.get_movement_range(pos, dist) 
-                     if grid.hex_distance(pos, hex_pos) == dist and grid.grid[hex_pos[0]][hex_pos[1]]["accessible"]}
-    elif pattern == "Mist/Shadow":
-        range_set = set()
-        angles = [30, 90, 150, 210, 270, 330]
-        row, col = pos
-        is_odd_col = col % 2 != 0
-        
-        # Define target offsets based on column parity
-        step_offsets = {
-            30: [(-1, 1), (-3, 2), (-4, 3), (-6, 4)] if is_odd_col else [(-2, 1), (-3, 2), (-5, 3), (-6, 4)],
-            150: [(2, 1), (3, 2), (5, 3), (6, 4)] if is_odd_col else [(1, 1), (3, 2), (4, 3), (6, 4)],
-            210: [(2, -1), (3, -2), (5, -3), (6, -4)] if is_odd_col else [(1, -1), (3, -2), (4, -3), (6, -4)],
-            330: [(-1, -1), (-3, -2), (-4, -3), (-6, -4)] if is_odd_col else [(-2, -1), (-3, -2), (-5, -3), (-6, -4)]
-        }
-        
-        for angle in angles:
-            line = []
-            r, c = row, col
-            if angle in [90, 270]:
-                # Horizontal directions: step by 2 columns
-                steps = min(4, dist)
-                for step in range(1, steps + 1):
-                    new_r, new_c = r, c + (2 * step if angle == 90 else -2 * step)
-                    new_pos = (new_r, new_c)
-                    if (0 <= new_r < grid.rows and 0 <= new_c < grid.cols and 
-                        grid.hex_distance(pos, new_pos) <= dist):
-                        if grid.grid[new_r][new_c]["accessible"]:
-                            line.append(new_pos)
-                        else:
-                            break  # Stop at the first obstruction
-                    else:
-                        break
-            else:
-                # Diagonal directions: use predefined offsets
-                offsets = step_offsets[angle]
-                for dr, dc in offsets[:min(4, dist)]:
-                    new_r, new_c = r + dr, c + dc
-                    new_pos = (new_r, new_c)
-                    if (0 <= new_r < grid.rows and 0 <= new_c < grid.cols and 
-                        grid.hex_distance(pos, new_pos) <= dist):
-                        if grid.grid[new_r][new_c]["accessible"]:
-                            line.append(new_pos)
-                        else:
-                            break  # Stop at the first obstruction
-                    else:
-                        break
-            range_set.update(line)
+    range_pattern = range_library.patterns.get(pattern_ids.get(pattern))
+    if range_pattern is None:
+        print(f"Unknown range pattern: {pattern}")
+        return set()
+    # The entered distance overrides the pattern's own, so any pattern can be previewed at any size
+    range_set = range_pattern.evaluate(grid, pos, dist)
     
     # Apply include_pos and exclude_adjacent filters
     if not include_pos and pos in range_set:
@@ -301,7 +254,7 @@ while running:
         pattern = pattern[0]
     pattern = pattern.lower()
     movement_range = current_range if "area" in pattern else None
-    attack_range = current_range if "sight" in pattern or "melee" in pattern or "echo" in pattern or "perimeter" in pattern or "mist" in pattern else None
+    attack_range = current_range if movement_range is None else None
     
     print(f"Drawing: movement_range={len(movement_range) if movement_range else 0}, attack_range={len(attack_range) if attack_range else 0}")
     if movement_range:
@@ -0,0 +1,332 @@
+import json
+import math
+import os
+import hexgeom
+
+# Range patterns are data: one JSON file per pattern in ranges/, listed in ranges/range_index.json
+# (which the Card Maker reads for its range_id dropdowns). A pattern file looks like
+#   {"id": "echo", "name": "Echo", "type": "parity", "distance": 9, "parity": 1, "blocking": "reach"}
+# Types:
+#   ring        every hex with min_distance <= d <= distance
+#   perimeter   every hex at exactly distance
+#   parity      hexes within distance whose distance is odd (parity 1) or even (parity 0)
+#   line        straight rays along "axes" (the 6 neighbor directions) or "diagonals", optionally max_steps long
+#   cone        hexes within width degrees of a facing direction (0-5, index into DIRECTIONS)
+#   two_stage   "primary" picks a target hex, "secondary" is then applied around that target
+# Blocking decides which template hexes survive on an actual board:
+#   none        anything on the board
+#   accessible  accessible hexes
+#   open        accessible and unoccupied hexes
+#   ray         rays stop at the first inaccessible hex (lines only)
+#   los         HexGrid.has_clear_line_of_sight from the origin
+#   reach       accessible and reachable by walking at most distance steps (flood fill)
+#   flood       the flood fill itself, like a movement range: reach plus the origin, even if inaccessible
+RANGE_DIR = "ranges"
+RANGE_INDEX_NAME = "range_index.json"
+
+# Cube directions, same order as hexgrid.DIRECTIONS
+DIRECTIONS = [
+    (1, 0, -1), (1, -1, 0), (0, -1, 1),
+    (-1, 0, 1), (-1, 1, 0), (0, 1, -1)
+]
+DIAGONALS = [
+    (2, -1, -1), (1, 1, -2), (-1, 2, -1),
+    (-2, 1, 1), (-1, -1, 2), (1, -2, 1)
+]
+
+
+def cube_length(dx, dz):
+    return max(abs(dx), abs(dz), abs(dx + dz))
+
+
+def cube_angle(dx, dz):
+    """Screen angle of a cube offset on this repo's flat-top, column-offset layout."""
+    return math.degrees(math.atan2(1.732 * (dz + dx / 2), 1.5 * dx))
+
+
+def disc_offsets(distance, min_distance=0):
+    """(dx, dz) cube offsets with min_distance <= length <= distance, nearest first."""
+    offsets = []
+    for dx in range(-distance, distance + 1):
+        for dz in range(max(-distance, -dx - distance), min(distance, -dx + distance) + 1):
+            if cube_length(dx, dz) >= min_distance:
+                offsets.append((dx, dz))
+    offsets.sort(key=lambda offset: cube_length(*offset))
+    return offsets
+
+
+# Blocking rules that only look at the target cell, so a translated template can be masked in one step
+CELL_BLOCKING = ("none", "accessible", "open")
+
+
+def board_bits(grid, pad, blocking):
+    """Bitset of the cells that pass a per-cell blocking rule, on the board padded by pad on every side.
+
+    Bit (row + pad) * width + (col + pad) is cell (row, col), where width = cols + 2 * pad.
+    """
+    width = grid.cols + 2 * pad
+    bits = 0
+    for row in range(grid.rows):
+        cells = grid.grid[row]
+        row_bits = 0
+        for col in range(grid.cols):
+            cell = cells[col]
+            if blocking == "none" or (cell["accessible"] and (blocking != "open" or cell.get("unit") is None)):
+                row_bits |= 1 << col
+        bits |= row_bits << ((row + pad) * width + pad)
+    return bits
+
+
+def bits_to_cells(bits, width, pad):
+    cells = set()
+    while bits:
+        low = bits & -bits
+        index = low.bit_length() - 1
+        cells.add((index // width - pad, index % width - pad))
+        bits ^= low
+    return cells
+
+
+class RangeTemplate:
+    """A pattern compiled for one distance: cube offsets relative to the origin.
+
+    rays is a list of offset lists. Line patterns have one ray per direction,
+    walked in order so blockers can cut them short; every other pattern has a
+    single ray holding all its offsets.
+    """
+    def __init__(self, rays, is_ray):
+        self.rays = rays
+        self.is_ray = is_ray
+        self.size = sum(len(ray) for ray in rays)
+
+
+class RangePattern:
+    def __init__(self, data, library=None):
+        self.data = data
+        self.library = library
+        self.id = data["id"]
+        self.name = data.get("name", self.id)
+        self.type = data["type"]
+        self.distance = data.get("distance")
+        self.max_distance = data.get("max_distance")
+        self.min_distance = data.get("min_distance", 1)
+        self.blocking = data.get("blocking", "ray" if self.type == "line" else "accessible")
+        self.templates = {}
+        self.bit_templates = {}
+
+    def resolve_distance(self, distance=None):
+        distance = self.distance if distance is None else distance
+        if distance is None:
+            raise ValueError(f"Range pattern {self.id} has no distance and none was given")
+        return min(distance, self.max_distance) if self.max_distance is not None else distance
+
+    def template(self, distance, facing=0):
+        """Compile (once per distance and facing) into relative cube offsets."""
+        key = (distance, facing)
+        if key not in self.templates:
+            self.templates[key] = self.compile(distance, facing)
+        return self.templates[key]
+
+    def compile(self, distance, facing):
+        if self.type == "ring":
+            return RangeTemplate([disc_offsets(distance, self.min_distance)], False)
+        if self.type == "perimeter":
+            return RangeTemplate([disc_offsets(distance, distance)], False)
+        if self.type == "parity":
+            parity = self.data.get("parity", 1)
+            offsets = [offset for offset in disc_offsets(distance, self.min_distance) if cube_length(*offset) % 2 == parity]
+            return RangeTemplate([offsets], False)
+        if self.type == "line":
+            directions = DIAGONALS if self.data.get("directions") == "diagonals" else DIRECTIONS
+            max_steps = self.data.get("max_steps")
+            rays = []
+            for dx, _, dz in directions:
+                ray = []
+                step = 1
+                while cube_length(dx * step, dz * step) <= distance and (max_steps is None or step <= max_steps):
+                    if cube_length(dx * step, dz * step) >= self.min_distance:
+                        ray.append((dx * step, dz * step))
+                    step += 1
+                rays.append(ray)
+            return RangeTemplate(rays, True)
+        if self.type == "cone":
+            dx, _, dz = DIRECTIONS[(self.data.get("facing", 0) + facing) % 6]
+            center = cube_angle(dx, dz)
+            half_width = self.data.get("width", 60) / 2 + 1e-6
+            offsets = [offset for offset in disc_offsets(distance, max(1, self.min_distance))
+                       if abs((cube_angle(*offset) - center + 180) % 360 - 180) <= half_width]
+            return RangeTemplate([offsets], False)
+        raise ValueError(f"Range pattern {self.id} has unknown type {self.type}")
+
+    def template_bits(self, distance, odd_col, width):
+        """The distance template as a bitset over a board padded by distance, anchored at cell (0, 0).
+
+        Shifting it left by row * width + col moves it onto (row, col). A cube offset lands on a
+        different row offset in odd and even columns, so there is one bitset per column parity.
+        """
+        key = (distance, odd_col, width)
+        if key not in self.bit_templates:
+            bits = 0
+            for ray in self.template(distance).rays:
+                for dx, dz in ray:
+                    dr = dz + (odd_col + dx) // 2
+                    bits |= 1 << ((dr + distance) * width + dx + distance)
+            self.bit_templates[key] = bits
+        return self.bit_templates[key]
+
+    def evaluate_many(self, grid, origins, distance=None):
+        """Union of this pattern's hexes around every origin.
+
+        Patterns whose blocking only looks at the target cell are translated as bitsets and
+        masked once; rays, line of sight and reach depend on the path from each origin.
+        """
+        if self.type == "two_stage" or self.blocking not in CELL_BLOCKING or getattr(grid, "chunked", False):
+            area = set()
+            for origin in origins:
+                area |= self.evaluate(grid, origin, distance)
+            return area
+        distance = self.resolve_distance(distance)
+        width = grid.cols + 2 * distance
+        templates = (self.template_bits(distance, 0, width), self.template_bits(distance, 1, width))
+        bits = 0
+        for row, col in origins:
+            bits |= templates[col % 2] << (row * width + col)
+        if hasattr(grid, "get_cell_bits"):
+            mask = grid.get_cell_bits(distance, self.blocking)
+        else:
+            mask = board_bits(grid, distance, self.blocking)
+        return bits_to_cells(bits & mask, width, distance)
+
+    def evaluate(self, grid, origin, distance=None, facing=0, target=None):
+        """Absolute (row, col) hexes this pattern covers from origin on grid."""
+        if self.type == "two_stage":
+            return self.evaluate_two_stage(grid, origin, distance, target)
+        distance = self.resolve_distance(distance)
+        template = self.template(distance, facing)
+        row0, col0 = origin
+        origin_x, origin_z = col0, row0 - (col0 // 2)
+        rows, cols, cells = grid.rows, grid.cols, grid.grid
+        blocking = self.blocking
+        reach = reach_cells(grid, origin, distance) if blocking in ("reach", "flood") else None
+        result = set()
+        for ray in template.rays:
+            for dx, dz in ray:
+                col = origin_x + dx
+                row = origin_z + dz + (col // 2)
+                if not (0 <= row < rows and 0 <= col < cols):
+                    if template.is_ray:
+                        break
+                    continue
+                cell = cells[row][col]
+                if blocking == "ray":
+                    if not cell["accessible"]:
+                        break
+                elif blocking == "accessible":
+                    if not cell["accessible"]:
+                        continue
+                elif blocking == "open":
+                    if not cell["accessible"] or cell.get("unit") is not None:
+                        continue
+                elif blocking == "los":
+                    if not grid.has_clear_line_of_sight(origin, (row, col)):
+                        continue
+                elif blocking == "reach":
+                    if (row, col) not in reach or not cell["accessible"]:
+                        continue
+                elif blocking == "flood":
+                    if (row, col) not in reach:
+                        continue
+                result.add((row, col))
+        return result
+
+    def evaluate_two_stage(self, grid, origin, distance=None, target=None):
+        """With a target, the secondary area around it (if the primary range reaches it); otherwise the union over every target."""
+        primary = self.library.get(self.data["primary"])
+        secondary = self.library.get(self.data["secondary"])
+        secondary_distance = self.data.get("secondary_distance")
+        if hasattr(grid, "get_two_stage_range"):
+            # The game board memoizes the result until a unit or obstacle changes
+            return grid.get_two_stage_range(origin, primary, secondary, distance, secondary_distance, target)
+        primary_hexes = primary.evaluate(grid, origin, distance)
+        if target is not None:
+            return secondary.evaluate(grid, target, secondary_distance) if target in primary_hexes else set()
+        return secondary.evaluate_many(grid, primary_hexes, secondary_distance)
+
+
+def reach_cells(grid, origin, distance):
+    """Hexes reachable from origin in distance steps; uses the cached whole-board masks when the grid has them."""
+    if getattr(grid, "geometry", None) is not None:
+        geometry = grid.geometry
+        return geometry.cells(geometry.reach_mask(origin, distance, grid.get_passable_mask()))
+    if not hasattr(grid, "get_passable_mask"):
+        # A plain board (e.g. the range viewer's HexGrid) with no mask cache of its own
+        geometry = hexgeom.get_geometry(grid.rows, grid.cols)
+        return geometry.cells(geometry.reach_mask(origin, distance, geometry.passable_mask(grid)))
+    return grid.get_movement_range(origin, distance)
+
+
+class RangeLibrary:
+    """Every pattern in a ranges/ directory, loaded once and looked up by id."""
+    def __init__(self, range_dir=RANGE_DIR):
+        self.range_dir = range_dir
+        self.patterns = {}
+        self.load()
+
+    def load(self):
+        self.patterns = {}
+        if not os.path.isdir(self.range_dir):
+            return
+        for filename in sorted(os.listdir(self.range_dir)):
+            if not filename.endswith(".json") or filename == RANGE_INDEX_NAME:
+                continue
+            try:
+                with open(os.path.join(self.range_dir, filename), 'r') as f:
+                    pattern = RangePattern(json.load(f), self)
+                self.patterns[pattern.id] = pattern
+            except Exception as e:
+                print(f"Error loading range pattern {filename}: {e}")
+
+    def get(self, range_id):
+        pattern = self.patterns.get(range_id)
+        if pattern is None:
+            raise KeyError(f"Unknown range pattern: {range_id}")
+        return pattern
+
+    def __contains__(self, range_id):
+        return range_id in self.patterns
+
+    def names(self):
+        return [(pattern.name, pattern.id) for pattern in self.patterns.values()]
+
+    def write_index(self):
+        """Rewrite range_index.json (read by the Card Maker) from the pattern files."""
+        index = {pattern.id: {"name": pattern.name, "type": pattern.type, "file": f"{pattern.id}.json"}
+                 for pattern in self.patterns.values()}
+        with open(os.path.join(self.range_dir, RANGE_INDEX_NAME), 'w') as f:
+            json.dump(index, f, indent=2)
+
+
+LIBRARY = None
+
+
+def get_library():
+    global LIBRARY
+    if LIBRARY is None:
+        LIBRARY = RangeLibrary()
+    return LIBRARY
+
+
+def find_pattern(range_id):
+    """The pattern for a card's range_id, or None for missing/"None"/unknown ids (callers fall back to their defaults)."""
+    if isinstance(range_id, list):  # Card Maker dropdowns sometimes save the selection as a one-item list
+        range_id = range_id[0] if range_id else None
+    if not range_id or range_id == "None":
+        return None
+    library = get_library()
+    return library.patterns.get(range_id)
+
+
+if __name__ == "__main__":
+    library = get_library()
+    library.write_index()
+    print(f"Indexed {len(library.patterns)} range patterns in {os.path.join(RANGE_DIR, RANGE_INDEX_NAME)}")
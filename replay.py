@@ -0,0 +1,443 @@
+import gzip
+import json
+import os
+import random
+import sys
+import pygame
+import combat
+from player import Player
+from unit import Unit
+from hexgrid import HexGrid
+from chunked_map import read_manifest
+from turn_engine import TurnEngine
+
+# Replays are an event stream, not video. Every event is a short list starting with an op code:
+#   ["G", rows, cols, hex_size, inaccessible, card_drawing_hexes]  new board (level load)
+#   ["W", world_dir, hex_size]                                   new chunked world (see chunked_map)
+#   ["U", uid, card_id_or_class, row, col, name, hp(, state)]   unit/player placed (uid 0 is the player; state 2 if switched)
+#   ["P", phase(, 1)]                                            turn phase started (1: the AI ran in fast mode)
+#   ["M", uid, row, col]                                         unit moved
+#   ["T", uid, row, col]                                         unit teleported
+#   ["A", attacker_uid, target_uid, damage]                      attack landed
+#   ["S", uid]                                                   unit switched to its second state
+#   ["X", uid]                                                   unit defeated
+#   ["D", row, col, card_id]                                     card drawn
+#
+# The stream is also a test of the rules. The board setup, the player's actions and the phase
+# changes are the inputs; Simulation feeds them back through the game's rules with random seeded
+# from the header, so the AI phases (TurnEngine, combat.resolve, combat.settle_unit) and card draws
+# are played again rather than copied. If the rules still behave as they did when the battle was
+# recorded, the simulation records exactly the same stream; otherwise it reports the first event
+# that differs.
+REPLAY_VERSION = 1
+REPLAY_DIR = "replays"
+LAST_REPLAY_FILE = os.path.join(REPLAY_DIR, "last.replay")
+
+EVENT_INTERVAL = 250        # ms between events at 1x speed (moves also wait for their animation)
+SLOW_MOTION_SPEED = 0.25
+FINAL_MOMENT_LOOKBACK = 8   # events shown before the killing blow
+
+
+class ReplayRecorder:
+    def __init__(self, seed, class_name):
+        self.seed = seed
+        self.class_name = class_name
+        self.events = []
+        self.uids = {}
+        self.next_uid = 1
+
+    def uid(self, unit):
+        if isinstance(unit, Player):
+            return 0
+        if unit not in self.uids:
+            self.uids[unit] = self.next_uid
+            self.next_uid += 1
+        return self.uids[unit]
+
+    def record_level(self, grid):
+        if grid.chunked:
+            # Large worlds are referenced rather than copied; their chunks stream in during playback too
+            self.events.append(["W", grid.grid.world_dir, grid.hex_size])
+            return
+        inaccessible = [list(pos) for pos in grid.get_inaccessible_hexes()]
+        self.events.append(["G", grid.rows, grid.cols, grid.hex_size, inaccessible, grid.card_drawing_hexes])
+
+    def record_board(self, grid):
+        """Record the current board as if it had just been loaded (used after loading a save)."""
+        self.record_level(grid)
+        if grid.player:
+            self.record_spawn(grid.player)
+        for unit in grid.units:
+            self.record_spawn(unit)
+
+    def record_spawn(self, unit):
+        if isinstance(unit, Player):
+            self.events.append(["U", 0, unit.class_name, unit.position[0], unit.position[1], unit.class_name, unit.hp])
+        else:
+            event = ["U", self.uid(unit), unit.card_id, unit.position[0], unit.position[1], unit.name, unit.hp]
+            if unit.current_state == 2:  # Loaded from a save after switching
+                event.append(2)
+            self.events.append(event)
+
+    def record_phase(self, phase, fast_ai=False):
+        # The fast AI decides a whole phase before resolving any unit, which can play out differently
+        self.events.append(["P", phase, 1] if fast_ai and phase != "player" else ["P", phase])
+
+    def record_move(self, unit, row, col):
+        self.events.append(["M", self.uid(unit), row, col])
+
+    def record_teleport(self, unit, row, col):
+        self.events.append(["T", self.uid(unit), row, col])
+
+    def record_attack(self, attacker, target, damage):
+        self.events.append(["A", self.uid(attacker), self.uid(target), damage])
+
+    def record_switch(self, unit):
+        self.events.append(["S", self.uid(unit)])
+
+    def record_defeat(self, unit):
+        self.events.append(["X", self.uid(unit)])
+
+    def record_draw(self, row, col, card_id):
+        self.events.append(["D", row, col, card_id])
+
+    def to_data(self):
+        return {"version": REPLAY_VERSION, "seed": self.seed, "class_name": self.class_name, "events": self.events}
+
+    def save(self, path=LAST_REPLAY_FILE):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(self.to_data(), f, separators=(',', ':'))
+
+
+def load_replay(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get("version") != REPLAY_VERSION:
+        raise ValueError(f"Unsupported replay version {data.get('version')} (expected {REPLAY_VERSION})")
+    return data
+
+
+def make_unit(card_id, name, hp, state=1):
+    """Rebuild a unit from its card so state switches replay correctly; fall back to the recorded stats."""
+    try:
+        with open(os.path.join("cards", f"{card_id}.json"), 'r') as f:
+            card_data = json.load(f)
+        card_data["id"] = card_id
+        unit = Unit(card_data)
+    except Exception:
+        unit = Unit({"id": card_id, "card_type": "Enemy Card", "data": {"Name": name, "Health": hp}})
+    if state == 2:
+        unit.switch_state()
+    unit.hp = hp
+    return unit
+
+
+def board_from_event(grid, ev):
+    """Reset grid to the board in a "G" event."""
+    _, rows, cols, hex_size, inaccessible, card_drawing_hexes = ev
+    grid.animations.cancel_all()
+    grid.rows, grid.cols, grid.hex_size = rows, cols, hex_size
+    grid.grid = [[{"unit": None, "accessible": True} for _ in range(cols)] for _ in range(rows)]
+    grid.units.clear()
+    for r, c in inaccessible:
+        grid.grid[r][c]["accessible"] = False
+    grid.occupancy_changed()
+    grid.card_drawing_hexes = card_drawing_hexes
+
+
+AI_PHASES = {"allied": "Allied", "neutral": "Neutral", "hostile": "Hostile"}
+
+
+class Simulation:
+    """Re-runs a recorded battle through the game rules, headlessly (see the top of this file).
+
+    events is the stream the rules produce from the recording's inputs;
+    divergence is the index of the first event that differs from the
+    recording, or None when they are identical.
+    """
+    def __init__(self, data, window_width=1, window_height=1):
+        self.data = data
+        self.recorder = ReplayRecorder(data["seed"], data["class_name"])
+        self.grid = HexGrid(16, 24, 30, window_width, window_height)
+        self.grid.recorder = self.recorder
+        self.turn_engine = TurnEngine(self.resolve_unit)
+        self.units = {}
+        self.phase = "player"
+        # Seeded like GameScreen does at the start of the match; the caller's RNG is left as it was
+        state = random.getstate()
+        random.seed(data["seed"])
+        try:
+            for ev in data["events"]:
+                self.feed(ev)
+        finally:
+            random.setstate(state)
+        # Compared as JSON, the form the recording was saved in
+        self.events = json.loads(json.dumps(self.recorder.events))
+        recorded = json.loads(json.dumps(data["events"]))
+        self.divergence = next((i for i, (a, b) in enumerate(zip(recorded, self.events)) if a != b), None)
+        if self.divergence is None and len(recorded) != len(self.events):
+            self.divergence = min(len(recorded), len(self.events))
+
+    @property
+    def matches(self):
+        return self.divergence is None
+
+    def describe(self):
+        if self.matches:
+            return f"Re-simulated {len(self.events)} events: identical to the recording"
+        i = self.divergence
+        recorded = self.data["events"][i] if i < len(self.data["events"]) else "end of recording"
+        simulated = self.events[i] if i < len(self.events) else "end of simulation"
+        return f"Re-simulation diverges at event {i}: recorded {recorded}, simulated {simulated}"
+
+    def resolve_unit(self, unit, log_entries):
+        # GameScreen.resolve_unit without the UI
+        if self.grid.player and self.grid.player.hp <= 0:
+            return False
+        combat.settle_unit(self.grid, unit)
+        return True
+
+    def spawned(self, unit):
+        self.units[self.recorder.uid(unit)] = unit
+
+    def feed(self, ev):
+        """Apply one recorded event: inputs are applied, outcomes of the AI phases are left to the rules."""
+        op = ev[0]
+        grid = self.grid
+        if op == "G":
+            board_from_event(grid, ev)
+            self.recorder.record_level(grid)
+            grid.load_decks()
+        elif op == "W":
+            grid.animations.cancel_all()
+            grid.units.clear()
+            grid.load_world(ev[1], read_manifest(ev[1]), None, None)
+            grid.grid.spawn_units = False  # Streamed-in units are in the recording
+            grid.hex_size = ev[2]
+        elif op == "U":
+            uid, ident, row, col, name, hp = ev[1:7]
+            if uid == 0:
+                unit = self.units.get(0) or Player(ident)
+                unit.hp = hp
+            else:
+                unit = make_unit(ident, name, hp, ev[7] if len(ev) > 7 else 1)
+            if grid.place_unit(unit, row, col)[0]:
+                self.spawned(unit)
+        elif op == "P":
+            self.phase = ev[1]
+            self.recorder.record_phase(self.phase, len(ev) > 2 and ev[2])
+            if self.phase in AI_PHASES:
+                self.turn_engine.fast_ai = len(ev) > 2 and bool(ev[2])
+                self.turn_engine.start_phase(grid, AI_PHASES[self.phase])
+                self.turn_engine.run_to_completion()
+        elif self.phase != "player":
+            return  # Moves, attacks, switches and defeats in AI phases are what the simulation reproduces
+        elif op in ("M", "T"):
+            unit = self.units.get(ev[1])
+            if unit and unit.position:
+                if op == "M":
+                    grid.move_unit(unit, ev[2], ev[3])
+                    grid.animations.finish_all()
+                else:
+                    unit.teleport(grid, ev[2], ev[3])
+        elif op == "A":
+            attacker, target = self.units.get(ev[1]), self.units.get(ev[2])
+            if attacker and target:
+                # The player's weapons are not recorded, so their damage is an input too
+                combat.apply_hit(grid, attacker, target, combat.Attack(None, "melee", ev[3]))
+        elif op == "S":
+            unit = self.units.get(ev[1])
+            if unit and unit.switch_state():
+                grid.units.reindex(unit)
+                self.recorder.record_switch(unit)
+        elif op == "X":
+            unit = self.units.pop(ev[1], None)
+            if unit and unit in grid.units:
+                combat.remove_defeated(grid, unit)
+        elif op == "D":
+            grid.draw_card(ev[1], ev[2], None)  # Which card comes up is drawn again from the seeded RNG
+
+
+class ReplayPlayer:
+    """Shows a battle re-simulated from its recording on a fresh HexGrid.
+
+    The stream shown is the one Simulation produces; if that diverges from the
+    recording (the rules changed since), the recording is shown instead and
+    the log says where they part. update() plays events back in real time
+    (scaled by speed), seek_turn() and seek_final_moment() jump there
+    instantly without animating.
+    """
+    def __init__(self, data, window_width, window_height):
+        self.data = data
+        self.window_width = window_width
+        self.window_height = window_height
+        self.simulation = Simulation(data, window_width, window_height)
+        self.events = self.simulation.events if self.simulation.matches else data["events"]
+        self.speed = 1.0
+        self.death_index = self.find_death_index()
+        self.reset()
+
+    def reset(self):
+        self.grid = HexGrid(16, 24, 30, self.window_width, self.window_height)
+        self.units = {}
+        self.cursor = 0
+        self.turn = 0
+        self.phase = "player"
+        self.elapsed = 0
+        self.log = [] if self.simulation.matches else [self.simulation.describe()]
+
+    def find_death_index(self):
+        hp = None
+        for i, ev in enumerate(self.events):
+            if ev[0] == "U" and ev[1] == 0:
+                hp = ev[6]
+            elif ev[0] == "A" and ev[2] == 0 and hp is not None:
+                hp -= ev[3]
+                if hp <= 0:
+                    return i
+        return None
+
+    @property
+    def finished(self):
+        return self.cursor >= len(self.events)
+
+    def animating(self):
+        return self.grid.animations.busy
+
+    def apply(self, ev, instant=False):
+        op = ev[0]
+        grid = self.grid
+        if op == "G":
+            board_from_event(grid, ev)
+            grid_width = grid.cols * grid.hex_size * 1.5
+            grid_height = grid.rows * grid.hex_size * 1.732
+            grid.view_offset_x = (self.window_width - grid_width) / 2 if grid_width < self.window_width else 0
+            grid.view_offset_y = (self.window_height - grid_height) / 2 if grid_height < self.window_height else 0
+            self.units = {0: self.units[0]} if 0 in self.units else {}
+        elif op == "W":
+            grid.animations.cancel_all()
+            grid.units.clear()
+            grid.load_world(ev[1], read_manifest(ev[1]), None, None)
+            grid.grid.spawn_units = False
+            grid.hex_size = ev[2]
+            self.units = {0: self.units[0]} if 0 in self.units else {}
+        elif op == "U":
+            uid, ident, row, col, name, hp = ev[1:7]
+            if uid == 0:
+                unit = self.units.get(0) or Player(ident)
+                unit.hp = hp
+            else:
+                unit = make_unit(ident, name, hp, ev[7] if len(ev) > 7 else 1)
+            self.units[uid] = unit
+            grid.place_unit(unit, row, col)
+        elif op == "P":
+            self.phase = ev[1]
+            if self.phase == "player":
+                self.turn += 1
+        elif op in ("M", "T"):
+            unit = self.units.get(ev[1])
+            if unit:
+                if instant or op == "T":
+                    unit.teleport(grid, ev[2], ev[3])
+                else:
+                    grid.move_unit(unit, ev[2], ev[3])
+        elif op == "A":
+            attacker, target = self.units.get(ev[1]), self.units.get(ev[2])
+            if target:
+                target.hp -= ev[3]
+                if not instant:
+                    target.set_damage_text(ev[3])
+            if attacker and not instant:
+                attacker.attack_flash = True
+                attacker.flash_start = pygame.time.get_ticks()
+            if attacker and target:
+                self.log.append(f"{self.name_of(attacker)} hit {self.name_of(target)} for {ev[3]}")
+        elif op == "S":
+            unit = self.units.get(ev[1])
+            if unit:
+                unit.switch_state()
+                grid.units.reindex(unit)
+        elif op == "X":
+            unit = self.units.pop(ev[1], None)
+            if unit and unit in grid.units:
+                grid.grid[unit.position[0]][unit.position[1]]["unit"] = None
+                grid.units.remove(unit)
+                self.log.append(f"{unit.name} defeated")
+        elif op == "D":
+            self.log.append(f"Drew card {ev[3]} at ({ev[1]}, {ev[2]})")
+
+    def name_of(self, unit):
+        return unit.class_name if isinstance(unit, Player) else unit.name
+
+    def step(self, instant=False):
+        if not self.finished:
+            self.apply(self.events[self.cursor], instant)
+            self.cursor += 1
+
+    def seek_index(self, index):
+        if index < self.cursor:
+            self.reset()
+        while self.cursor < index and not self.finished:
+            self.step(instant=True)
+
+    def seek_turn(self, turn):
+        """Jump instantly to the start of the given player turn (or the end if the replay is shorter)."""
+        if turn <= self.turn:
+            self.reset()
+        while not self.finished and self.turn < turn:
+            self.step(instant=True)
+
+    def seek_final_moment(self, lookback=FINAL_MOMENT_LOOKBACK):
+        """Jump to just before the player's death and switch to slow motion."""
+        if self.death_index is None:
+            return False
+        self.seek_index(max(0, self.death_index - lookback))
+        self.speed = SLOW_MOTION_SPEED
+        return True
+
+    def update(self, time_delta_ms):
+        self.grid.animations.update(time_delta_ms * self.speed / 1000.0)
+        if self.grid.player:
+            self.grid.player.update_animation(self.grid)
+        for unit in self.grid.units:
+            unit.update_animation(self.grid)
+        if self.finished or self.animating():
+            return
+        self.elapsed += time_delta_ms * self.speed
+        if self.elapsed >= EVENT_INTERVAL:
+            self.elapsed = 0
+            self.step()
+            # Bookkeeping events carry no visuals; play them straight through
+            while not self.finished and self.events[self.cursor][0] in ("P", "D", "S"):
+                self.step()
+
+
+def summarize(data, turn=None):
+    """Headless playback: re-simulate the stream (optionally only up to a turn); returns (text summary, simulation matched)."""
+    pygame.init()
+    pygame.display.set_mode((1, 1))
+    replay_player = ReplayPlayer(data, 1, 1)
+    if turn is None:
+        replay_player.seek_index(len(replay_player.events))
+    else:
+        replay_player.seek_turn(turn)
+    grid = replay_player.grid
+    lines = [f"Seed {data['seed']}, {len(data['events'])} events, turn {replay_player.turn}, phase {replay_player.phase}",
+             replay_player.simulation.describe()]
+    if grid.player:
+        lines.append(f"{grid.player.class_name}: {grid.player.hp} HP at {grid.player.position}")
+    for unit in grid.units:
+        lines.append(f"{unit.name}: {unit.hp} HP at {unit.position}")
+    return "\n".join(lines), replay_player.simulation.matches
+
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    if len(sys.argv) < 2:
+        print("Usage: python replay.py <replay file> [turn]")
+        sys.exit(1)
+    summary, matches = summarize(load_replay(sys.argv[1]), int(sys.argv[2]) if len(sys.argv) > 2 else None)
+    print(summary)
+    # A diverging replay means the rules changed since it was recorded
+    sys.exit(0 if matches else 1)
@@ -0,0 +1,279 @@
+import atexit
+import copy
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from player import Player
+from unit import Unit
+from hexgrid import HexGrid
+from inventory_card import InventoryCard
+from chunked_map import read_manifest
+
+# Save files are gzipped JSON lines: a header record followed by one record per section.
+# Bump SAVE_VERSION whenever a record layout changes and teach load_game about the old one.
+SAVE_VERSION = 2  # 2: equipped weapons are saved by card id instead of inventory position
+SAVE_DIR = "saves"
+AUTOSAVE_FILE = os.path.join(SAVE_DIR, "autosave.sav")
+QUICKSAVE_FILE = os.path.join(SAVE_DIR, "quicksave.sav")
+
+# Unit attributes that change during a battle (switch_state rewrites most of them)
+UNIT_FIELDS = ["name", "hp", "max_hp", "movement", "melee_damage", "projectile_damage",
+               "projectile_range", "allegiance", "special_skill", "states", "current_state"]
+
+
+def load_card_data(card_id):
+    card_file = os.path.join("cards", f"{card_id}.json")
+    with open(card_file, 'r') as f:
+        card_data = json.load(f)
+    card_data["id"] = card_id
+    return card_data
+
+
+def unit_to_record(unit):
+    record = {"section": "unit", "card_id": unit.card_id, "card_type": unit.card_type,
+              "position": list(unit.position), "second_state": copy.deepcopy(unit.second_state)}
+    for field in UNIT_FIELDS:
+        record[field] = getattr(unit, field)
+    return record
+
+
+def unit_from_record(record):
+    unit = Unit({"id": record["card_id"], "card_type": record["card_type"],
+                 "states": record["states"], "data": {}})
+    for field in UNIT_FIELDS:
+        setattr(unit, field, record[field])
+    unit.second_state = record.get("second_state", {})
+    return unit
+
+
+def player_to_record(player):
+    inventory = [[card.card_data.get("id", ""), card.current_state] for card in player.inventory]
+    weapon_id = lambda weapon: weapon.card_data.get("id") if weapon in player.inventory else None
+    return {
+        "section": "player",
+        "class_name": player.class_name,
+        "hp": player.hp,
+        "max_hp": player.max_hp,
+        "movement": player.movement,
+        "projectile_range": player.projectile_range,
+        "attacks": {key: dict(attack) for key, attack in player.attacks.items()},
+        "movement_used": player.movement_used,
+        "action_used": player.action_used,
+        "position": list(player.position),
+        "inventory": inventory,
+        "melee_weapon": weapon_id(player.melee_weapon),
+        "projectile_weapon": weapon_id(player.projectile_weapon)
+    }
+
+
+def player_from_record(record):
+    player = Player(record["class_name"])
+    for field in ["hp", "max_hp", "movement", "projectile_range", "movement_used", "action_used"]:
+        setattr(player, field, record[field])
+    for card_id, state in record["inventory"]:
+        try:
+            card = InventoryCard(load_card_data(card_id))
+        except Exception as e:
+            print(f"Error restoring inventory card {card_id}: {e}")
+            continue
+        if card.is_two_state() and state != card.current_state:
+            card.toggle_state()
+        player.inventory.append(card)
+    player.melee_weapon = find_weapon(player, record, "melee_weapon")
+    player.projectile_weapon = find_weapon(player, record, "projectile_weapon")
+    player.attacks = record["attacks"]
+    return player
+
+
+def find_weapon(player, record, key):
+    """The inventory card equipped as record[key]; version 1 saves hold its position in the saved inventory."""
+    card_id = record.get(key)
+    if isinstance(card_id, int):
+        card_id = record["inventory"][card_id][0] if 0 <= card_id < len(record["inventory"]) else None
+    if card_id is None:
+        return None
+    return next((card for card in player.inventory if card.card_data.get("id") == card_id), None)
+
+
+def rng_to_record():
+    version, internal_state, gauss_next = random.getstate()
+    return {"section": "rng", "state": [version, list(internal_state), gauss_next]}
+
+
+def rng_from_record(record):
+    version, internal_state, gauss_next = record["state"]
+    random.setstate((version, tuple(internal_state), gauss_next))
+
+
+def snapshot_game(game_screen, player):
+    """Copy everything needed to rebuild the battle into plain data; cheap enough to run between frames."""
+    grid = game_screen.hex_grid
+    grid_record = {
+        "section": "grid",
+        "rows": grid.rows,
+        "cols": grid.cols,
+        "hex_size": grid.hex_size,
+        "view_offset": [grid.view_offset_x, grid.view_offset_y],
+        "card_drawing_hexes": [dict(hex_data) for hex_data in grid.card_drawing_hexes]
+    }
+    if grid.chunked:
+        # The world directory holds the terrain; only remember which chunks have already spawned their units
+        grid_record["world"] = grid.grid.world_dir
+        grid_record["visited"] = sorted(grid.grid.visited)
+    else:
+        grid_record["inaccessible"] = grid.get_inaccessible_hexes()
+    header = {
+        "version": SAVE_VERSION,
+        "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "class_name": player.class_name,
+        "hp": player.hp,
+        "level_file": game_screen.current_level_file,
+        "level_idx": game_screen.current_level_idx
+    }
+    records = [
+        player_to_record(player),
+        grid_record,
+        {"section": "decks", "deck_data": dict(grid.deck_data)},
+        {
+            "section": "game",
+            "turn_phase": game_screen.turn_phase,
+            "is_player_turn": game_screen.is_player_turn,
+            "current_level_idx": game_screen.current_level_idx,
+            "current_level_file": game_screen.current_level_file,
+            "campaign_file": game_screen.campaign_file,
+            "campaign": copy.deepcopy(game_screen.campaign),
+            "player_class": game_screen.player_class,
+            "log": list(game_screen.log)
+        },
+        rng_to_record()
+    ]
+    records.extend(unit_to_record(unit) for unit in grid.all_units())
+    return header, records
+
+
+def write_save(path, header, records):
+    """Write atomically so a crash mid-save never clobbers the previous file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps(header, separators=(',', ':')) + "\n")
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
+    os.replace(tmp_path, path)
+
+
+def save_game(path, game_screen, player):
+    header, records = snapshot_game(game_screen, player)
+    write_save(path, header, records)
+
+
+def read_header(path):
+    """Read only the first record, for listing saves without decompressing the whole file."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.loads(f.readline())
+
+
+def iter_records(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        header = json.loads(f.readline())
+        if header.get("version") not in range(1, SAVE_VERSION + 1):
+            raise ValueError(f"Unsupported save version {header.get('version')} (expected up to {SAVE_VERSION})")
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def restore_unit(hex_grid, unit, position):
+    if hex_grid.chunked:
+        unit.position = tuple(position)
+        hex_grid.grid.restore_unit(unit)
+    else:
+        hex_grid.place_unit(unit, *position)
+
+
+def load_game(path, window_width, window_height):
+    """Rebuild the player, grid and game state record by record.
+
+    Returns (player, hex_grid, game_state) where game_state is the "game" record.
+    """
+    player = None
+    player_position = None
+    hex_grid = None
+    game_state = {}
+    pending_units = []
+    for record in iter_records(path):
+        section = record["section"]
+        if section == "player":
+            player = player_from_record(record)
+            player_position = record["position"]
+        elif section == "grid":
+            if "world" in record:
+                hex_grid = HexGrid(16, 24, record["hex_size"], window_width, window_height)
+                hex_grid.load_world(record["world"], read_manifest(record["world"]), None, None, record["visited"])
+            else:
+                hex_grid = HexGrid(record["rows"], record["cols"], record["hex_size"], window_width, window_height)
+                for row, col in record["inaccessible"]:
+                    hex_grid.grid[row][col]["accessible"] = False
+                hex_grid.occupancy_changed()
+            hex_grid.hex_size = record["hex_size"]
+            hex_grid.view_offset_x, hex_grid.view_offset_y = record["view_offset"]
+            hex_grid.card_drawing_hexes = record["card_drawing_hexes"]
+        elif section == "decks":
+            hex_grid.deck_data = record["deck_data"]
+        elif section == "game":
+            game_state = record
+        elif section == "rng":
+            rng_from_record(record)
+        elif section == "unit":
+            if hex_grid is None:
+                pending_units.append(record)
+            else:
+                restore_unit(hex_grid, unit_from_record(record), record["position"])
+    if hex_grid is None or player is None:
+        raise ValueError(f"Save file {path} is missing the grid or player section")
+    for record in pending_units:
+        restore_unit(hex_grid, unit_from_record(record), record["position"])
+    hex_grid.place_unit(player, *player_position)
+    return player, hex_grid, game_state
+
+
+class Autosaver:
+    """Writes snapshots on a background thread; only the newest pending snapshot per file is kept."""
+    def __init__(self):
+        self.pending = {}
+        self.condition = threading.Condition()
+        self.closed = False
+        self.last_error = None
+        self.thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def request(self, path, game_screen, player):
+        header, records = snapshot_game(game_screen, player)
+        with self.condition:
+            self.pending[path] = (header, records)
+            self.condition.notify()
+
+    def close(self):
+        """Write every pending snapshot and stop the thread (on exit, so a requested save is never lost)."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                path, (header, records) = self.pending.popitem()
+            try:
+                write_save(path, header, records)
+            except Exception as e:
+                self.last_error = e
+                print(f"Error writing save {path}: {e}")
@@ -0,0 +1,56 @@
+from pygame_gui.core import UIContainer
+
+# Navigation between the game's screens without tearing the UI down. Each screen builds its
+# pygame_gui elements once, into its own root, the first time it is shown; after that a screen
+# switch only hides the old root and shows the new one, then lets the screen refresh the elements
+# that display game data.
+#
+# A screen provides:
+#   build(container)   create its elements inside container; return the root to show and hide,
+#                      which is container itself or a UIWindow the screen made instead
+#   refresh(**kwargs)  bring the data-bound elements up to date; called on every show with the
+#                      arguments given to show()
+#   handle_event(event), draw()
+
+
+class ScreenManager:
+    """The registered screens, their UI roots and which one is showing."""
+    def __init__(self, ui_manager, rect):
+        self.ui_manager = ui_manager
+        self.rect = rect
+        self.screens = {}
+        self.roots = {}
+        self.current = None
+
+    def __getitem__(self, name):
+        return self.screens[name]
+
+    def __contains__(self, name):
+        return name in self.screens
+
+    def register(self, name, screen):
+        self.screens[name] = screen
+
+    def active(self):
+        return self.screens[self.current]
+
+    def show(self, name, **kwargs):
+        """Switch to screen name, building its UI on first use (or if its window was closed)."""
+        if self.current is not None and self.current != name:
+            old_root = self.roots.get(self.current)
+            if old_root is not None and old_root.alive():
+                old_root.hide()
+        root = self.roots.get(name)
+        if root is None or not root.alive():
+            self.roots[name] = self.build(name)
+        elif not root.visible:
+            root.show()
+        self.current = name
+        self.screens[name].refresh(**kwargs)
+
+    def build(self, name):
+        container = UIContainer(self.rect, self.ui_manager)
+        root = self.screens[name].build(container) or container
+        if root is not container:
+            container.kill()
+        return root
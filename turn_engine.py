@@ -0,0 +1,129 @@
+import time
+from collections import deque
+
+# Milliseconds of AI decision work allowed per frame (None: no limit)
+TURN_BUDGET_MS = 4
+
+
+class TurnEngine:
+    """Runs one allegiance's phase across frames instead of in a single call.
+
+    Units are queued at the start of a phase. Each frame, update() makes AI decisions
+    (Unit.take_turn) until the time budget is spent, but never lets two movement
+    animations play at once: it waits for the grid's AnimationManager to report the
+    active tween complete. In fast_ai mode every decision of the phase is made first
+    (over as many frames as the budget needs), with the tweens queued paused, then
+    they are started one unit at a time, in order.
+
+    resolve_unit(unit, log_entries) is called once per unit after its move has been
+    decided (fast_ai: when its animation is released). It returns False to end the
+    phase early, e.g. when the player has been defeated.
+    """
+    def __init__(self, resolve_unit, budget_ms=TURN_BUDGET_MS, fast_ai=False):
+        self.resolve_unit = resolve_unit
+        self.budget_ms = budget_ms
+        self.fast_ai = fast_ai
+        self.grid = None
+        self.queue = deque()
+        self.held = deque()
+        self.active = None  # Tween id of the animation currently being waited on
+
+    def start_phase(self, grid, allegiance):
+        if self.grid is not grid:
+            if self.grid:
+                self.grid.animations.remove_listener(self.on_animation_complete)
+            grid.animations.add_listener(self.on_animation_complete)
+            self.grid = grid
+        self.queue = deque(grid.units.of_allegiance(allegiance))
+        self.held.clear()
+        self.active = None
+
+    def on_animation_complete(self, tween_id, unit):
+        if tween_id == self.active:
+            self.active = None
+
+    @property
+    def busy(self):
+        return bool(self.queue or self.held or self.active is not None)
+
+    def cancel(self):
+        self.queue.clear()
+        for _, _, tween_id in self.held:
+            if self.grid.animations.is_active(tween_id):
+                self.grid.animations.finish(tween_id, notify=False)
+        self.held.clear()
+        self.active = None
+
+    def next_unit(self):
+        while self.queue:
+            unit = self.queue.popleft()
+            # Skip units that were defeated earlier in the phase
+            if unit in self.grid.units and unit.position:
+                return unit
+        return None
+
+    def update(self):
+        if self.active is not None:
+            return
+        if self.fast_ai:
+            self.decide_batch()
+            if not self.queue:
+                # Release only once every decision is made, so how the budget split them across
+                # frames cannot change the outcome (replays re-simulate phases in one go)
+                self.release_next()
+        else:
+            self.decide_until_animation()
+
+    def deadline(self):
+        if self.budget_ms is None:
+            return float("inf")
+        return time.perf_counter() + self.budget_ms / 1000.0
+
+    def decide_until_animation(self):
+        deadline = self.deadline()
+        while time.perf_counter() < deadline:
+            unit = self.next_unit()
+            if unit is None:
+                return
+            entries = unit.take_turn(self.grid)
+            if self.resolve_unit(unit, entries) is False:
+                self.cancel()
+                return
+            tween_id = self.grid.animations.tween_for(unit)
+            if tween_id is not None:
+                self.active = tween_id
+                return
+
+    def decide_batch(self):
+        deadline = self.deadline()
+        animations = self.grid.animations
+        animations.autostart = False
+        try:
+            while self.queue and time.perf_counter() < deadline:
+                if self.grid.player and self.grid.player.hp <= 0:
+                    self.queue.clear()
+                    return
+                unit = self.next_unit()
+                if unit is None:
+                    return
+                entries = unit.take_turn(self.grid)
+                self.held.append((unit, entries, animations.tween_for(unit)))
+        finally:
+            animations.autostart = True
+
+    def release_next(self):
+        while self.held:
+            unit, entries, tween_id = self.held.popleft()
+            if self.resolve_unit(unit, entries) is False:
+                self.cancel()
+                return
+            if self.grid.animations.is_active(tween_id):
+                self.grid.animations.start(tween_id)
+                self.active = tween_id
+                return
+
+    def run_to_completion(self):
+        """Finish the phase immediately, snapping animations to their end (headless use)."""
+        while self.busy:
+            self.grid.animations.finish_all()
+            self.update()
@@ -1,9 +1,8 @@
 import pygame
-import math
 import random
+import combat
 
 # Animation constants
-MOVE_SPEED = 5
 ATTACK_FLASH_DURATION = 500
 DAMAGE_TEXT_DURATION = 1000  # 1 second
 
@@ -52,60 +51,22 @@ class Unit:
         
         if self.allegiance == "Hostile":
             player = grid.player
-            distance_to_player = grid.hex_distance(self.position, player.position)
-            melee_possible_player = distance_to_player == 1
-            projectile_possible_player = (self.projectile_damage > 0 and
-                                          1 < distance_to_player <= self.projectile_range and
-                                          grid.is_aligned(self.position, player.position, self.projectile_range) and
-                                          grid.has_clear_line_of_sight(self.position, player.position))
-            
-            if melee_possible_player:
-                damage = self.melee_damage
-                player.hp -= damage
-                player.set_damage_text(damage)  # Set damage feedback for player
-                self.attack_flash = True
-                self.flash_start = pygame.time.get_ticks()
-                log.append(f"{self.name} attacked {player.class_name} for {damage} damage")
-                if player.hp <= 0:
-                    grid.game_over = True  # Signal game over
-                return log
-            elif projectile_possible_player:
-                damage = self.projectile_damage
-                player.hp -= damage
-                player.set_damage_text(damage)
-                self.attack_flash = True
-                self.flash_start = pygame.time.get_ticks()
-                log.append(f"{self.name} attacked {player.class_name} with projectile for {damage} damage")
-                if player.hp <= 0:
-                    grid.game_over = True
-                return log
+            if self.can_hit(grid, player, "melee"):
+                return self.attack(grid, player, "melee")
+            elif self.can_hit(grid, player, "projectile"):
+                return self.attack(grid, player, "projectile")
             else:
-                allied_units = [u for u in grid.units if u.allegiance == "Allied" and u.hp > 0]
-                allied_melee = [u for u in allied_units if grid.hex_distance(self.position, u.position) == 1]
+                allied_melee = [u for u in grid.units.within(self.position, 1, "Allied") if u.hp > 0]
                 if allied_melee:
                     target = random.choice(allied_melee)
-                    damage = self.melee_damage
-                    target.hp -= damage
-                    target.set_damage_text(damage)  # Set damage feedback for allied unit
-                    self.attack_flash = True
-                    self.flash_start = pygame.time.get_ticks()
-                    log.append(f"{self.name} attacked {target.name} for {damage} damage")
-                    return log
+                    return self.attack(grid, target, "melee")
                 
-                allied_projectile = [u for u in allied_units if
-                                     self.projectile_damage > 0 and
-                                     1 < grid.hex_distance(self.position, u.position) <= self.projectile_range and
-                                     grid.is_aligned(self.position, u.position, self.projectile_range) and
-                                     grid.has_clear_line_of_sight(self.position, u.position)]
+                nearby_allies = grid.units.within(self.position, self.projectile_range, "Allied") if self.projectile_damage > 0 else []
+                allied_projectile = combat.targets_in_range(grid, self, [u for u in nearby_allies if u.hp > 0],
+                                                            combat.Attack.of_unit(self, "projectile"))
                 if allied_projectile:
                     target = min(allied_projectile, key=lambda u: grid.hex_distance(self.position, u.position))
-                    damage = self.projectile_damage
-                    target.hp -= damage
-                    target.set_damage_text(damage)
-                    self.attack_flash = True
-                    self.flash_start = pygame.time.get_ticks()
-                    log.append(f"{self.name} attacked {target.name} with projectile for {damage} damage")
-                    return log
+                    return self.attack(grid, target, "projectile")
                 
                 path = grid.find_path(self.position, player.position)
                 if path and len(path) > 1:
@@ -113,86 +74,35 @@ class Unit:
                     for steps in range(max_steps, 0, -1):
                         new_pos = path[steps]
                         if grid.grid[new_pos[0]][new_pos[1]]["unit"] is None:
-                            success, msg = grid.move_unit(self, *new_pos)
+                            success, msg = grid.move_unit(self, *new_pos, path=path[:steps + 1])
                             if success:
                                 log.append(msg)
-                                distance_after = grid.hex_distance(self.position, player.position)
-                                if distance_after == 1:
-                                    damage = self.melee_damage
-                                    player.hp -= damage
-                                    player.set_damage_text(damage)
-                                    self.attack_flash = True
-                                    self.flash_start = pygame.time.get_ticks()
-                                    log.append(f"{self.name} attacked {player.class_name} for {damage} damage")
-                                    if player.hp <= 0:
-                                        grid.game_over = True
-                                elif (self.projectile_damage > 0 and
-                                      1 < distance_after <= self.projectile_range and
-                                      grid.is_aligned(self.position, player.position, self.projectile_range) and
-                                      grid.has_clear_line_of_sight(self.position, player.position)):
-                                    damage = self.projectile_damage
-                                    player.hp -= damage
-                                    player.set_damage_text(damage)
-                                    self.attack_flash = True
-                                    self.flash_start = pygame.time.get_ticks()
-                                    log.append(f"{self.name} attacked {player.class_name} with projectile for {damage} damage")
-                                    if player.hp <= 0:
-                                        grid.game_over = True
+                                if self.can_hit(grid, player, "melee"):
+                                    log += self.attack(grid, player, "melee")
+                                elif self.can_hit(grid, player, "projectile"):
+                                    log += self.attack(grid, player, "projectile")
                             break
         
         elif self.allegiance == "Allied":
-            hostile_units = [u for u in grid.units if u.allegiance == "Hostile" and u.hp > 0]
-            if hostile_units:
-                target = min(hostile_units, key=lambda u: grid.hex_distance(self.position, u.position))
-                distance = grid.hex_distance(self.position, target.position)
-                melee_possible = distance == 1
-                projectile_possible = (self.projectile_damage > 0 and
-                                       1 < distance <= self.projectile_range and
-                                       grid.is_aligned(self.position, target.position, self.projectile_range) and
-                                       grid.has_clear_line_of_sight(self.position, target.position))
-                if projectile_possible:
-                    damage = self.projectile_damage
-                    target.hp -= damage
-                    target.set_damage_text(damage)  # Set damage feedback for hostile unit
-                    self.attack_flash = True
-                    self.flash_start = pygame.time.get_ticks()
-                    log.append(f"{self.name} attacked {target.name} with projectile for {damage} damage")
-                    return log
-                elif melee_possible:
-                    damage = self.melee_damage
-                    target.hp -= damage
-                    target.set_damage_text(damage)
-                    self.attack_flash = True
-                    self.flash_start = pygame.time.get_ticks()
-                    log.append(f"{self.name} attacked {target.name} for {damage} damage")
-                    return log
+            target = grid.units.nearest(self.position, "Hostile", lambda u: u.hp > 0)
+            if target:
+                if self.can_hit(grid, target, "projectile"):
+                    return self.attack(grid, target, "projectile")
+                elif self.can_hit(grid, target, "melee"):
+                    return self.attack(grid, target, "melee")
                 path = grid.find_path(self.position, target.position)
                 if path and len(path) > 1:
                     max_steps = min(self.movement, len(path) - 1)
                     for steps in range(max_steps, 0, -1):
                         new_pos = path[steps]
                         if grid.grid[new_pos[0]][new_pos[1]]["unit"] is None:
-                            success, msg = grid.move_unit(self, *new_pos)
+                            success, msg = grid.move_unit(self, *new_pos, path=path[:steps + 1])
                             if success:
                                 log.append(msg)
-                                distance_after = grid.hex_distance(self.position, target.position)
-                                if distance_after == 1:
-                                    damage = self.melee_damage
-                                    target.hp -= damage
-                                    target.set_damage_text(damage)
-                                    self.attack_flash = True
-                                    self.flash_start = pygame.time.get_ticks()
-                                    log.append(f"{self.name} attacked {target.name} for {damage} damage")
-                                elif (self.projectile_damage > 0 and
-                                      1 < distance_after <= self.projectile_range and
-                                      grid.is_aligned(self.position, target.position, self.projectile_range) and
-                                      grid.has_clear_line_of_sight(self.position, target.position)):
-                                    damage = self.projectile_damage
-                                    target.hp -= damage
-                                    target.set_damage_text(damage)
-                                    self.attack_flash = True
-                                    self.flash_start = pygame.time.get_ticks()
-                                    log.append(f"{self.name} attacked {target.name} with projectile for {damage} damage")
+                                if self.can_hit(grid, target, "melee"):
+                                    log += self.attack(grid, target, "melee")
+                                elif self.can_hit(grid, target, "projectile"):
+                                    log += self.attack(grid, target, "projectile")
                             break
         
         elif self.allegiance == "Neutral":
@@ -206,6 +116,16 @@ class Unit:
         
         return log
 
+    def can_hit(self, grid, target, kind):
+        if kind == "projectile" and self.projectile_damage <= 0:
+            return False
+        return combat.in_range(grid, self.position, target.position, combat.Attack.of_unit(self, kind))
+
+    def attack(self, grid, target, kind):
+        """Hit target with the melee or projectile attack through combat.resolve; returns the log lines."""
+        events = combat.resolve(grid, [combat.Intent(self, [target], combat.Attack.of_unit(self, kind))])
+        return combat.hit_messages(events)
+
     def switch_state(self):
         if self.states == 2 and self.current_state == 1:
             self.current_state = 2
@@ -238,28 +158,16 @@ class Unit:
         self.damage_text = f"-{damage}"
         self.damage_time = pygame.time.get_ticks()
 
-    def animate_move(self, grid, new_row, new_col):
-        self.animating = True
-        old_x, old_y = grid.get_hex_center(*self.position)
-        new_x, new_y = grid.get_hex_center(new_row, new_col)
-        self.render_pos = (old_x, old_y)
-        grid.grid[self.position[0]][self.position[1]]["unit"] = None
+    def animate_move(self, grid, new_row, new_col, path=None):
+        old_pos = self.position
+        grid.grid[old_pos[0]][old_pos[1]]["unit"] = None
         grid.grid[new_row][new_col]["unit"] = self
         self.position = (new_row, new_col)
+        grid.units.reindex(self)
+        grid.animations.move(self, path or [old_pos, self.position])
 
-    def update_animation(self, grid):  # Add grid parameter
-        if self.animating and self.render_pos:
-            target_x, target_y = grid.get_hex_center(*self.position)
-            dx = target_x - self.render_pos[0]
-            dy = target_y - self.render_pos[1]
-            dist = math.sqrt(dx**2 + dy**2)
-            if dist <= MOVE_SPEED:
-                self.render_pos = None
-                self.animating = False
-            else:
-                move_x = dx / dist * MOVE_SPEED
-                move_y = dy / dist * MOVE_SPEED
-                self.render_pos = (self.render_pos[0] + move_x, self.render_pos[1] + move_y)
+    def update_animation(self, grid):
+        """Expire the attack flash and damage text; movement is driven by grid.animations."""
         if self.attack_flash and pygame.time.get_ticks() - self.flash_start > ATTACK_FLASH_DURATION:
             self.attack_flash = False
         if self.damage_text and pygame.time.get_ticks() - self.damage_time > DAMAGE_TEXT_DURATION:
@@ -274,8 +182,12 @@ class Unit:
             pygame.draw.rect(surface, (0, 255, 0), (bar_x, bar_y, health_width, bar_height))
 
     def teleport(self, grid, new_row, new_col):
+        grid.animations.cancel_unit(self)
         grid.grid[self.position[0]][self.position[1]]["unit"] = None
         self.position = (new_row, new_col)
         grid.grid[new_row][new_col]["unit"] = self
+        grid.units.reindex(self)
         self.animating = False
         self.render_pos = None
+        if grid.recorder:
+            grid.recorder.record_teleport(self, new_row, new_col)
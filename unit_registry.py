@@ -0,0 +1,163 @@
+import itertools
+
+# Side length, in hexes, of the square buckets used for radius and nearest-unit queries
+BUCKET_SIZE = 8
+
+
+class UnitRegistry:
+    """The non-player units on a HexGrid, indexed by allegiance and position.
+
+    Behaves like the list it replaces (iteration in placement order, append,
+    remove, len, in) but removal is O(1), and units are also kept in
+    per-allegiance sets, a position -> unit map and square buckets of
+    BUCKET_SIZE x BUCKET_SIZE hexes. within() and nearest() only look at the
+    buckets around a hex instead of every unit on the map.
+
+    The index records where each unit was when it was last (re)indexed, so
+    anything that moves a unit or changes its allegiance must call reindex().
+    """
+    def __init__(self, grid, bucket_size=BUCKET_SIZE):
+        self.grid = grid
+        self.bucket_size = bucket_size
+        self.order = {}          # unit -> placement number; dicts keep insertion order
+        self.by_allegiance = {}  # allegiance -> {unit: None}
+        self.positions = {}      # (row, col) -> unit
+        self.buckets = {}        # (bucket_row, bucket_col) -> {unit: None}
+        self.indexed = {}        # unit -> (position, allegiance) it is filed under
+        self.counter = itertools.count()
+
+    def __iter__(self):
+        return iter(list(self.order))
+
+    def __len__(self):
+        return len(self.order)
+
+    def __bool__(self):
+        return bool(self.order)
+
+    def __contains__(self, unit):
+        return unit in self.order
+
+    def __repr__(self):
+        return f"UnitRegistry({list(self.order)!r})"
+
+    def bucket_of(self, position):
+        return position[0] // self.bucket_size, position[1] // self.bucket_size
+
+    def append(self, unit):
+        if unit in self.order:
+            return
+        self.order[unit] = next(self.counter)
+        self.file(unit)
+        self.grid.occupancy_changed()
+
+    def remove(self, unit):
+        if unit not in self.order:
+            raise ValueError(f"{unit!r} is not in the registry")
+        self.unfile(unit)
+        del self.order[unit]
+        self.grid.occupancy_changed()
+
+    def clear(self):
+        self.order.clear()
+        self.by_allegiance.clear()
+        self.positions.clear()
+        self.buckets.clear()
+        self.indexed.clear()
+        self.grid.occupancy_changed()
+
+    def file(self, unit):
+        position = tuple(unit.position) if unit.position else None
+        self.indexed[unit] = (position, unit.allegiance)
+        self.by_allegiance.setdefault(unit.allegiance, {})[unit] = None
+        if position:
+            self.positions[position] = unit
+            self.buckets.setdefault(self.bucket_of(position), {})[unit] = None
+
+    def unfile(self, unit):
+        position, allegiance = self.indexed.pop(unit)
+        del self.by_allegiance[allegiance][unit]
+        if position:
+            if self.positions.get(position) is unit:
+                del self.positions[position]
+            bucket = self.buckets[self.bucket_of(position)]
+            del bucket[unit]
+            if not bucket:
+                del self.buckets[self.bucket_of(position)]
+
+    def reindex(self, unit):
+        """Refresh a unit's entries after its position or allegiance changed."""
+        if unit in self.order and self.indexed[unit] != (unit.position and tuple(unit.position), unit.allegiance):
+            self.unfile(unit)
+            self.file(unit)
+            self.grid.occupancy_changed()
+
+    def at(self, position):
+        return self.positions.get(tuple(position))
+
+    def of_allegiance(self, allegiance):
+        """Units of one allegiance, in placement order."""
+        return sorted(self.by_allegiance.get(allegiance, ()), key=self.order.__getitem__)
+
+    def count(self, allegiance):
+        return len(self.by_allegiance.get(allegiance, ()))
+
+    def within(self, center, radius, allegiance=None):
+        """Units within radius hexes of center (optionally of one allegiance), in placement order."""
+        center = tuple(center)
+        # In offset coordinates a hex at distance d is at most d columns and 1.5d + 1 rows away
+        row_reach, col_reach = radius + radius // 2 + 1, radius
+        size = self.bucket_size
+        found = []
+        for bucket_row in range((center[0] - row_reach) // size, (center[0] + row_reach) // size + 1):
+            for bucket_col in range((center[1] - col_reach) // size, (center[1] + col_reach) // size + 1):
+                for unit in self.buckets.get((bucket_row, bucket_col), ()):
+                    if ((allegiance is None or unit.allegiance == allegiance) and
+                            self.grid.hex_distance(center, unit.position) <= radius):
+                        found.append(unit)
+        found.sort(key=self.order.__getitem__)
+        return found
+
+    def nearest(self, center, allegiance=None, predicate=None):
+        """The closest matching unit to center, searching bucket rings outward.
+
+        Ties go to the unit placed first, which is what min() over the old list gave.
+        """
+        center = tuple(center)
+        remaining = len(self.order) if allegiance is None else self.count(allegiance)
+        if remaining == 0:
+            return None
+        size = self.bucket_size
+        center_row, center_col = self.bucket_of(center)
+        best, best_key = None, None
+        ring = 0
+        last_ring = max(self.grid.rows, self.grid.cols) // size + 1
+        while remaining > 0 and ring <= last_ring:
+            # Every hex in bucket ring k is more than (k - 1) * size rows or columns away, and a
+            # row step is worth at least 2/3 of a hex, so nothing further out can beat best
+            if best is not None and best_key[0] < ((ring - 1) * size * 2) // 3:
+                break
+            for bucket in self.ring_buckets(center_row, center_col, ring):
+                for unit in self.buckets.get(bucket, ()):
+                    if allegiance is not None and unit.allegiance != allegiance:
+                        continue
+                    remaining -= 1
+                    if predicate and not predicate(unit):
+                        continue
+                    key = (self.grid.hex_distance(center, unit.position), self.order[unit])
+                    if best_key is None or key < best_key:
+                        best, best_key = unit, key
+            ring += 1
+        return best
+
+    def ring_buckets(self, center_row, center_col, ring):
+        """Bucket keys on the square ring `ring` buckets out from (center_row, center_col)."""
+        if ring == 0:
+            return [(center_row, center_col)]
+        top, bottom = center_row - ring, center_row + ring
+        left, right = center_col - ring, center_col + ring
+        keys = [(top, col) for col in range(left, right + 1)] + [(bottom, col) for col in range(left, right + 1)]
+        for row in range(top + 1, bottom):
+            keys.append((row, left))
+            keys.append((row, right))
+        return keys
@@ -0,0 +1,123 @@
+import pygame
+import pygame_gui
+from pygame_gui.core import UIContainer
+from pygame_gui.elements import UIButton, UITextEntryLine
+
+# A scrolling list of buttons that stays fast however many items it holds. Only the rows that fit
+# the viewport (plus one for the partly scrolled-in row) exist as UIButtons; scrolling moves that
+# handful and relabels them from the current view instead of moving one button per item. The
+# view is the items sorted by label, narrowed by whatever has been typed into the filter line.
+SCROLL_STEP = 20  # Pixels per mouse wheel notch
+
+
+class VirtualList:
+    """A filterable, scrollable list of (key, label) items shown as buttons.
+
+    handle_event() returns the key of a clicked row, or None. With
+    multi_select, clicking a row toggles its key in selected (and the row
+    shows as selected) instead.
+    """
+    def __init__(self, rect, ui_manager, items=(), row_height=60, button_height=40, multi_select=False,
+                 filter_height=40, wheel_anywhere=False):
+        self.rect = pygame.Rect(rect)
+        self.ui_manager = ui_manager
+        self.row_height = row_height
+        self.button_height = button_height
+        self.multi_select = multi_select
+        self.wheel_anywhere = wheel_anywhere
+        self.selected = set()
+        self.items = []
+        self.view = []
+        self.filter_text = ""
+        self.scroll_offset = 0
+        self.filter_entry = None
+        if filter_height:
+            self.filter_entry = UITextEntryLine(pygame.Rect(self.rect.x, self.rect.y, self.rect.width, filter_height),
+                                                ui_manager, placeholder_text="Type to filter")
+        viewport = pygame.Rect(self.rect.x, self.rect.y + filter_height + 10 if filter_height else self.rect.y,
+                               self.rect.width, self.rect.height - (filter_height + 10 if filter_height else 0))
+        self.container = UIContainer(viewport, ui_manager)
+        rows = viewport.height // row_height + 2
+        self.buttons = [UIButton(pygame.Rect(0, i * row_height, viewport.width, button_height), "", ui_manager,
+                                 container=self.container) for i in range(rows)]
+        self.row_keys = [None] * rows
+        self.set_items(items)
+
+    def __len__(self):
+        return len(self.view)
+
+    @property
+    def max_scroll(self):
+        return max(0, len(self.view) * self.row_height - self.container.rect.height)
+
+    def set_items(self, items):
+        """Replace the items; the filter and, where the keys still exist, the selection are kept."""
+        self.items = sorted(items, key=lambda item: item[1].lower())
+        keys = {key for key, _ in self.items}
+        self.selected &= keys
+        self.view = self.filtered(self.items, self.filter_text)
+        self.scroll_to(self.scroll_offset)
+
+    def set_filter(self, text):
+        text = text.strip().lower()
+        # Typing more only narrows the view, so the current view is the cheaper place to look
+        source = self.view if self.filter_text and text.startswith(self.filter_text) else self.items
+        self.filter_text = text
+        self.view = self.filtered(source, text)
+        self.scroll_to(0)
+
+    @staticmethod
+    def filtered(items, text):
+        return [item for item in items if text in item[1].lower()] if text else list(items)
+
+    def scroll_to(self, offset):
+        self.scroll_offset = max(0, min(offset, self.max_scroll))
+        first = self.scroll_offset // self.row_height
+        # The buttons form a ring: item index always sits on button index % rows, so a scroll that
+        # brings one new item into view relabels the one button that just left it
+        for index in range(first, first + len(self.buttons)):
+            slot = index % len(self.buttons)
+            button = self.buttons[slot]
+            if index < len(self.view):
+                key, label = self.view[index]
+                if button.text != label:
+                    button.set_text(label)
+                if self.multi_select and key in self.selected:
+                    if not button.is_selected:
+                        button.select()
+                elif button.is_selected:
+                    button.unselect()
+                button.set_relative_position((0, index * self.row_height - self.scroll_offset))
+                if not button.visible:
+                    button.show()
+                self.row_keys[slot] = key
+            else:
+                if button.visible:
+                    button.hide()
+                self.row_keys[slot] = None
+
+    def deselect(self, keys):
+        self.selected.difference_update(keys)
+        self.scroll_to(self.scroll_offset)
+
+    def selected_in_order(self):
+        """The selected keys in the list's (label) order."""
+        return [key for key, _ in self.items if key in self.selected]
+
+    def handle_event(self, event):
+        if event.type == pygame_gui.UI_BUTTON_PRESSED and event.ui_element in self.buttons:
+            key = self.row_keys[self.buttons.index(event.ui_element)]
+            if key is not None and self.multi_select:
+                self.selected.symmetric_difference_update((key,))
+                self.scroll_to(self.scroll_offset)
+            return key
+        if event.type == pygame_gui.UI_TEXT_ENTRY_CHANGED and event.ui_element == self.filter_entry:
+            self.set_filter(self.filter_entry.get_text())
+        elif event.type == pygame.MOUSEWHEEL and (self.wheel_anywhere or self.container.rect.collidepoint(pygame.mouse.get_pos())):
+            self.scroll_to(self.scroll_offset - event.y * SCROLL_STEP)
+        return None
+
+    def kill(self):
+        self.container.kill()
+        if self.filter_entry:
+            self.filter_entry.kill()